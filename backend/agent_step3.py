@@ -10,21 +10,27 @@ import re
 import urllib.parse
 import traceback
 import base64
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
 from playwright.sync_api import sync_playwright
 
+from ttl_cache import TTLCache
+from ollama_client import OLLAMA
+from llm_scheduler import LLMOverloaded
+from result_store import RESULT_STORE
+from knowledge_index import KNOWLEDGE_INDEX
+from result_dedup import RESULT_DEDUP, url_key
+
 # -------- CONFIG --------
-OLLAMA_API = "http://127.0.0.1:11434/api/generate"
-MODEL = "mistral"
 
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).resolve().parent
 STATE_DIR = SCRIPT_DIR / "agent_state"
 STATE_DIR.mkdir(parents=True, exist_ok=True)
-RESULTS_FILE = STATE_DIR / "agent_results.json"
-STATE_FILE = STATE_DIR / "agent_state.json"
 
 # Prompt for answering questions with confidence check
 ANSWER_PROMPT = """You are Mistral 7B, a highly capable and knowledgeable AI assistant with extensive training data up to 2023.
@@ -51,124 +57,172 @@ Provide your detailed answer now:"""
 
 # -------- Helpers: LLM interaction --------
 def check_ollama_running():
-    """Check if Ollama server is running"""
-    try:
-        resp = requests.get("http://127.0.0.1:11434/api/tags", timeout=2)
-        return resp.status_code == 200
-    except Exception:
-        return False
+    """Check if Ollama server is running (cached by the shared client's health monitor)"""
+    return OLLAMA.is_alive()
+
+# Generation settings for quick answers
+QUICK_ANSWER_OPTIONS = {
+    "temperature": 0.2,  # Focused answers
+    "top_p": 0.8,
+    "top_k": 30,
+    "num_predict": 400,  # SHORTER for speed (was 600)
+    "num_gpu": 99,  # Use ALL GPU
+    "num_thread": 8,
+    "repeat_penalty": 1.1,
+    "num_batch": 512,
+    "num_ctx": 1024  # SMALLER context = FASTER (was 2048)
+}
+
+# Phrases meaning Mistral wants the web instead
+WEB_KEYWORDS = [
+    "i need to search",
+    "search the web",
+    "i don't know",
+    "i do not know",
+    "i cannot provide current",
+    "i don't have access to",
+    "beyond my knowledge",
+    "i cannot access",
+    "current information",
+    "real-time",
+    "latest",
+    "today's",
+    "recent news"
+]
+
+def build_quick_prompt(question: str):
+    """Shorter, faster prompt for quick answers"""
+    return f"""Answer this question briefly and accurately from your knowledge. If you don't know or need current information, say "I need to search the web for this."
+
+Question: {question}
+
+Answer:"""
+
+def review_ollama_answer(answer: str):
+    """Decide whether Mistral's answer can be used: (answer, True) or (None, False) to use the web"""
+    answer = answer.strip()
+
+    # Check if answer exists
+    if not answer or len(answer) < 5:
+        print("⚠️  Mistral gave very short answer, using web search...")
+        return None, False
+
+    # Check if Mistral says to use web
+    answer_lower = answer.lower()
+    for keyword in WEB_KEYWORDS:
+        if keyword in answer_lower:
+            print(f"⚠️  Mistral says to use web: '{keyword}' found")
+            return None, False
+
+    # Good answer from Mistral!
+    print(f"✅ Mistral answered! Length: {len(answer)} chars")
+    return answer, True
 
-def call_ollama_answer(question: str, timeout=30):
+def call_ollama_answer(question: str, timeout=30, cancel=None):
     """Ask Ollama Mistral - SMART MODE: Fast for simple, defer to web for complex
     
     Mistral answers simple/short questions from its knowledge.
     For complex/large questions, defers to web search.
+    Generation is streamed so it can stop at the first defer phrase
+    (see stream_ollama_answer).
+    """
+    result = (None, False)
+    for kind, value in stream_ollama_answer(question, timeout, cancel):
+        if kind == "result":
+            result = value
+    return result
+
+# Longest defer phrase - how far back a new token can complete a match
+_WEB_KEYWORD_SPAN = max(len(keyword) for keyword in WEB_KEYWORDS)
+
+def _find_web_keyword(text_lower: str, start: int = 0):
+    """First defer phrase ending after position start (scans only the new tail)"""
+    window = text_lower[max(0, start - _WEB_KEYWORD_SPAN):]
+    for keyword in WEB_KEYWORDS:
+        if keyword in window:
+            return keyword
+    return None
+
+def stream_ollama_answer(question: str, timeout=30, cancel=None):
+    """Ask Mistral with streaming - the confidence gate runs while tokens arrive
+
+    Yields ("token", text) for every token as Mistral generates it, then
+    exactly one ("result", (answer, confident)).
+    As soon as a defer/refusal phrase (WEB_KEYWORDS) appears, generation is
+    aborted (the connection is closed, so Ollama stops) and the result is
+    (None, False) - the same verdict the full answer would get, without
+    waiting for the remaining tokens. Setting cancel (a threading.Event)
+    aborts the same way, e.g. when a concurrent web search has already won.
+    When the LLM scheduler is saturated the question is shed to the web
+    straight away instead of queueing behind other generations.
     """
     # Check if Ollama is running
     if not check_ollama_running():
         print("⚠️  Ollama not running, will use web search")
-        return None, False
-    
-    print("🧠 Asking Mistral 7B (optimized for speed)...")
-    
-    # Shorter, faster prompt for quick answers
-    simple_prompt = f"""Answer this question briefly and accurately from your knowledge. If you don't know or need current information, say "I need to search the web for this."
-
-Question: {question}
+        yield "result", (None, False)
+        return
 
-Answer:"""
-    
+    print("🧠 Asking Mistral 7B (streaming)...")
+    parts = []
+    text_lower = ""
+    start = time.perf_counter()
+    stream = OLLAMA.generate_stream(build_quick_prompt(question), options=QUICK_ANSWER_OPTIONS, timeout=timeout,
+                                    cancel=cancel)
     try:
-        resp = requests.post(
-            OLLAMA_API, 
-            json={
-                "model": MODEL, 
-                "prompt": simple_prompt, 
-                "stream": False,
-                "options": {
-                    "temperature": 0.2,  # Focused answers
-                    "top_p": 0.8,
-                    "top_k": 30,
-                    "num_predict": 400,  # SHORTER for speed (was 600)
-                    "num_gpu": 99,  # Use ALL GPU
-                    "num_thread": 8,
-                    "repeat_penalty": 1.1,
-                    "num_batch": 512,
-                    "num_ctx": 1024  # SMALLER context = FASTER (was 2048)
-                }
-            }, 
-            timeout=timeout  # 30 seconds max for fast answers
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        answer = data.get("response", "").strip()
-        
-        # Check if answer exists
-        if not answer or len(answer) < 5:
-            print("⚠️  Mistral gave very short answer, using web search...")
-            return None, False
-        
-        # Check if Mistral says to use web
-        answer_lower = answer.lower()
-        web_keywords = [
-            "i need to search",
-            "search the web",
-            "i don't know",
-            "i do not know",
-            "i cannot provide current",
-            "i don't have access to",
-            "beyond my knowledge",
-            "i cannot access",
-            "current information",
-            "real-time",
-            "latest",
-            "today's",
-            "recent news"
-        ]
-        
-        for keyword in web_keywords:
-            if keyword in answer_lower:
-                print(f"⚠️  Mistral says to use web: '{keyword}' found")
-                return None, False
-        
-        # Good answer from Mistral!
-        print(f"✅ Mistral answered! Length: {len(answer)} chars")
-        return answer, True
-        
+        for chunk in stream:
+            token = chunk.get("response", "")
+            if not token:
+                continue
+            parts.append(token)
+            yield "token", token
+
+            scanned = len(text_lower)
+            text_lower += token.lower()
+            if cancel is not None and cancel.is_set():
+                stream.close()
+                print(f"✂️  Mistral cancelled after {len(parts)} tokens - another answer won")
+                yield "result", (None, False)
+                return
+
+            keyword = _find_web_keyword(text_lower, scanned)
+            if keyword:
+                stream.close()  # Stop generating - the answer is going to the web anyway
+                print(f"⚠️  Mistral says to use web: '{keyword}' found after {len(parts)} tokens "
+                      f"({(time.perf_counter() - start):.1f}s) - generation aborted")
+                yield "result", (None, False)
+                return
+    except LLMOverloaded as e:
+        print(f"🚦 Mistral busy ({e}), using web search...")
+        yield "result", (None, False)
+        return
     except requests.exceptions.Timeout:
         print("⏱️  Mistral timeout (30s), using web search...")
-        return None, False
+        yield "result", (None, False)
+        return
     except Exception as e:
         print(f"❌ Mistral error: {e}, using web search...")
-        return None, False
+        yield "result", (None, False)
+        return
+    finally:
+        stream.close()
+
+    if not parts and cancel is not None and cancel.is_set():
+        print("✂️  Mistral cancelled while waiting for a slot - another answer won")
+        yield "result", (None, False)
+        return
+    yield "result", review_ollama_answer("".join(parts))
 
 # -------- Helpers: persistence --------
-def save_results_append(new_items):
-    data = []
-    if RESULTS_FILE.exists():
-        try:
-            with RESULTS_FILE.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = []
-    data.extend(new_items)
-    with RESULTS_FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def save_results_append(new_items, question=None, run_id=None):
+    """Append search results to the result store (one INSERT, history is never re-read) and the knowledge index"""
+    RESULT_STORE.append_results(new_items, question=question, run_id=run_id)
+    KNOWLEDGE_INDEX.add_search_results(new_items, question)
 
 def save_state(obj):
-    try:
-        with STATE_FILE.open("w", encoding="utf-8") as f:
-            json.dump(obj, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print("Failed saving state:", e)
+    RESULT_STORE.save_state(obj)
 
 def load_state():
-    if STATE_FILE.exists():
-        try:
-            return json.load(STATE_FILE.open("r", encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+    return RESULT_STORE.load_state()
 
 # -------- Helpers: query cleaning & link decoding --------
 def _clean_query(instruction: str):
@@ -305,6 +359,82 @@ def optimize_query_for_wikipedia(query: str):
     
     return optimized_queries
 
+# -------- Query signals: time sensitivity, dates and ranges --------
+_MONTHS = (r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+           r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?")
+# "2019 to 2023", "2001-2006"
+_YEAR_RANGE_PATTERN = re.compile(r"(19|20)\d{2}\s*(to|-|through|till)\s*(19|20)\d{2}")
+# A day of a month: "10 oct", "october 10", "10/10/2025"
+_EXACT_DATE_PATTERN = re.compile(
+    rf"\b(\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{_MONTHS})|(?:{_MONTHS})\s+\d{{1,2}}(?:st|nd|rd|th)?)\b"
+    r"|\b\d{1,2}[/-]\d{1,2}[/-](?:19|20)\d{2}\b")
+# Years after Mistral's training data
+_RECENT_YEAR_PATTERN = re.compile(r"\b20(?:2[4-9]|[3-9]\d)\b")
+# Time-sensitive words (whole words only - "now" must not fire on "know" or "snow")
+_CURRENT_PATTERN = re.compile(
+    r"\b(today|current|currently|now|latest|weather|temperature|"
+    r"this week|this month|recent|recently|present|presently)\b"
+)
+
+def detect_query_signals(query: str):
+    """Detect the time/date/range signals that drive query rewriting, ranking and routing"""
+    q = query.lower()
+    
+    # Historical/range data (e.g., "2019 to 2023", "2001-2006")
+    is_historical_range = any(pattern in q for pattern in [
+        " to ", " - ", "from ", "between ",
+        "2019 to 2023", "2020 to 2025", "2001 to 2006",
+        "2010-2020", "1990-2000", "2000-2010"
+    ])
+    year_range = _YEAR_RANGE_PATTERN.search(q) is not None
+    
+    # User already specified a specific date
+    has_specific_date = any(pattern in q for pattern in [
+        "10 oct", "11 oct", "12 oct", "january", "february", "march",
+        "april", "may", "june", "july", "august", "september", "october",
+        "november", "december", "jan ", "feb ", "mar ", "apr ", "may ",
+        "jun ", "jul ", "aug ", "sep ", "oct ", "nov ", "dec ",
+        "/2025", "/2024", "-2025", "-2024"
+    ])
+    
+    # Time-sensitive queries (weather, current events, today's info)
+    is_current = _CURRENT_PATTERN.search(q) is not None
+    
+    return {
+        "is_historical_range": is_historical_range,
+        "year_range": year_range,
+        "has_specific_date": has_specific_date,
+        "has_exact_date": _EXACT_DATE_PATTERN.search(q) is not None,
+        "recent_year": _RECENT_YEAR_PATTERN.search(q) is not None,
+        "is_current": is_current
+    }
+
+def classify_freshness(query: str):
+    """
+    How quickly an answer to this query goes stale:
+    - "live": current/today/weather style questions
+    - "dated": tied to a specific date or period
+    - "timeless": general knowledge, history, lists
+    """
+    signals = detect_query_signals(query)
+    if signals["is_current"] and not signals["has_specific_date"]:
+        return "live"
+    if signals["is_current"] or signals["has_specific_date"]:
+        return "dated"
+    return "timeless"
+
+# Words that make a question likely to end up on the web path (whole words only)
+_WEB_BOUND_PATTERN = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|now|currently|current|latest|recent|recently|"
+    r"this (?:week|month|year)|weather|temperature|forecast|news|headlines|"
+    r"price|prices|stock|stocks|score|scores|election|upcoming)\b"
+)
+
+def is_likely_web_bound(question: str):
+    """Cheap pre-check: will Mistral probably defer this question to the web?"""
+    q = question.lower()
+    return bool(_WEB_BOUND_PATTERN.search(q) or _RECENT_YEAR_PATTERN.search(q))
+
 # -------- Playwright route handler to block heavy resources --------
 def _route_handler(route, request):
     try:
@@ -318,380 +448,706 @@ def _route_handler(route, request):
         # sometimes route.continue_ fails on closed contexts; ignore
         return
 
-# -------- Core: Web search using Chrome (DuckDuckGo - No CAPTCHA!) --------
-def run_search_with_chrome(context, query: str, limit: int = 10, timeout_ms: int = 30000):
-    """Search DuckDuckGo (no CAPTCHA!) using Chrome to get comprehensive results"""
-    results = []
-    page = None
-    
-    try:
-        page = context.new_page()
-        
-        # Enhance query for current/today information
-        enhanced_query = query.lower()
-        
-        # Check if user is asking for historical/range data (e.g., "2019 to 2023", "2001-2006")
-        is_historical_range = any(pattern in enhanced_query for pattern in [
-            " to ", " - ", "from ", "between ", 
-            "2019 to 2023", "2020 to 2025", "2001 to 2006",
-            "2010-2020", "1990-2000", "2000-2010"
-        ])
-        
-        # Extract year ranges
-        import re
-        year_range_match = re.search(r'(19|20)\d{2}\s*(to|-|through|till)\s*(19|20)\d{2}', enhanced_query)
-        
-        # Check if user already specified a specific date
-        has_specific_date = any(pattern in enhanced_query for pattern in [
-            "10 oct", "11 oct", "12 oct", "january", "february", "march", 
-            "april", "may", "june", "july", "august", "september", "october",
-            "november", "december", "jan ", "feb ", "mar ", "apr ", "may ",
-            "jun ", "jul ", "aug ", "sep ", "oct ", "nov ", "dec ",
-            "/2025", "/2024", "-2025", "-2024"
-        ])
-        
-        # Detect time-sensitive queries (weather, current events, today's info)
-        is_current = any(word in enhanced_query for word in [
-            "today", "current", "now", "latest", "weather", "temperature",
-            "this week", "this month", "recent", "present"
-        ])
-        
-        # PRIORITY 1: Historical range queries - Wikipedia is best!
-        if is_historical_range or year_range_match:
-            print(f"   📚 Historical range detected - prioritizing Wikipedia...")
-            query = f"{query} wikipedia"
-        # PRIORITY 2: Add time context for current queries (only if no specific date given)
-        elif is_current and not has_specific_date:
-            if "weather" in enhanced_query or "temperature" in enhanced_query:
-                # Only add "today" if not already specified
-                if "today" not in enhanced_query:
-                    query = f"{query} today October 10 2025"
-                else:
-                    query = f"{query} October 10 2025"
-            elif any(word in enhanced_query for word in ["current", "now", "latest", "present"]):
-                query = query  # Keep as is, DuckDuckGo prioritizes recent
+# -------- Search result cache (per engine + effective query) --------
+SEARCH_CACHE_TTLS = {
+    "live": int(os.environ.get("NEXUS_SEARCH_TTL_LIVE", "900")),  # 15 min
+    "dated": int(os.environ.get("NEXUS_SEARCH_TTL_DATED", "21600")),  # 6 h
+    "timeless": int(os.environ.get("NEXUS_SEARCH_TTL_TIMELESS", "259200"))  # 3 days
+}
+SEARCH_CACHE = TTLCache(
+    maxsize=int(os.environ.get("NEXUS_SEARCH_CACHE_SIZE", "2000")),
+    name="search_results",
+    path=STATE_DIR / "search_cache.json"
+)
+
+def _cached_engine_search(engine: str, effective_query: str, limit: int, freshness: str, fetch,
+                          backend: str = "browser"):
+    """Return cached results for backend + engine + effective query, or run fetch() and cache a non-empty result"""
+    key = f"{backend}:{engine}|{limit}|{effective_query.lower().strip()}"
+    cached = SEARCH_CACHE.get(key)
+    if cached is not None:
+        print(f"   ⚡ {engine} cache hit ({backend}): {effective_query}")
+        return [dict(r) for r in cached]
+    results = fetch()
+    if results:
+        SEARCH_CACHE.set(key, results, ttl=SEARCH_CACHE_TTLS[freshness])
+    return results
+
+def rewrite_search_query(query: str):
+    """Add the context search engines need for this query (wikipedia, 2025, forecast, ...)"""
+    # Enhance query for current/today information
+    enhanced_query = query.lower()
+    signals = detect_query_signals(query)
+
+    # Check if user is asking for historical/range data (e.g., "2019 to 2023", "2001-2006")
+    is_historical_range = signals["is_historical_range"]
+    year_range_match = signals["year_range"]
+
+    # Check if user already specified a specific date
+    has_specific_date = signals["has_specific_date"]
+
+    # Detect time-sensitive queries (weather, current events, today's info)
+    is_current = signals["is_current"]
+
+    # PRIORITY 1: Historical range queries - Wikipedia is best!
+    if is_historical_range or year_range_match:
+        print(f"   📚 Historical range detected - prioritizing Wikipedia...")
+        query = f"{query} wikipedia"
+    # PRIORITY 2: Add time context for current queries (only if no specific date given)
+    elif is_current and not has_specific_date:
+        if "weather" in enhanced_query or "temperature" in enhanced_query:
+            # Only add "today" if not already specified
+            if "today" not in enhanced_query:
+                query = f"{query} today October 10 2025"
             else:
-                query = f"{query} 2025"
-        elif has_specific_date and "weather" in enhanced_query:
-            # User specified date, just ensure we get that specific day
-            query = f"{query} forecast"
-        
-        q = urllib.parse.quote_plus(_clean_query(query))
-        
-        # Use DuckDuckGo - NO CAPTCHA!
-        url = f"https://duckduckgo.com/?q={q}"
-        
-        print(f"   Searching DuckDuckGo (no CAPTCHA!): {query}")
+                query = f"{query} October 10 2025"
+        elif any(word in enhanced_query for word in ["current", "now", "latest", "present"]):
+            query = query  # Keep as is, DuckDuckGo prioritizes recent
+        else:
+            query = f"{query} 2025"
+    elif has_specific_date and "weather" in enhanced_query:
+        # User specified date, just ensure we get that specific day
+        query = f"{query} forecast"
+
+    return query
+
+# -------- Navigation: readiness signals instead of fixed sleeps --------
+RESULT_WAIT_MS = int(os.environ.get("NEXUS_RESULT_WAIT_MS", "8000"))  # Max wait for a result selector
+NETWORK_IDLE_WAIT_MS = int(os.environ.get("NEXUS_NETWORK_IDLE_WAIT_MS", "3000"))  # Fallback when selector never shows
+# Minimum time on a page before reading it - only where anti-bot checks punish instant scraping
+ENGINE_MIN_DWELL_MS = {
+    "duckduckgo": int(os.environ.get("NEXUS_DWELL_DUCKDUCKGO_MS", "0")),
+    "bing": int(os.environ.get("NEXUS_DWELL_BING_MS", "500")),
+    "wikipedia": int(os.environ.get("NEXUS_DWELL_WIKIPEDIA_MS", "0"))
+}
+
+# Rolling per-phase timings across all searches (navigate / ready / extract per engine)
+SEARCH_PHASE_STATS = {}
+_PHASE_LOCK = threading.Lock()
 
-        # Navigate with human-like behavior
+def _record_phase(timings, phase: str, started: float):
+    """Store one phase duration in the per-search timings and the rolling stats"""
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if timings is not None:
+        timings[phase] = round(elapsed_ms, 1)
+    with _PHASE_LOCK:
+        stat = SEARCH_PHASE_STATS.setdefault(phase, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stat["count"] += 1
+        stat["total_ms"] += elapsed_ms
+        stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+
+def search_phase_stats():
+    """Average/max duration of every recorded search phase"""
+    with _PHASE_LOCK:
+        return {
+            phase: {
+                "count": stat["count"],
+                "avg_ms": round(stat["total_ms"] / stat["count"], 1),
+                "max_ms": round(stat["max_ms"], 1)
+            }
+            for phase, stat in SEARCH_PHASE_STATS.items()
+        }
+
+def _navigate_and_wait(page, engine: str, url: str, ready_selector: str, timeout_ms: int, timings=None):
+    """
+    Go to url and return as soon as results are readable:
+    the result selector appears, or (fallback) the network goes idle.
+    Engines with a minimum dwell are held on the page at least that long.
+    Returns True if the result selector was seen.
+    """
+    nav_start = time.perf_counter()
+    try:
+        page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+    except Exception as e:
+        print(f"   Page load issue: {e}")
+    _record_phase(timings, f"{engine}_navigate", nav_start)
+
+    ready_start = time.perf_counter()
+    ready = True
+    try:
+        page.wait_for_selector(ready_selector, timeout=RESULT_WAIT_MS)
+    except Exception:
+        ready = False
+        print("   Waiting for results to load...")
         try:
-            page.goto(url, timeout=timeout_ms)
-            time.sleep(2)  # Human-like pause
-            
-            # Wait for results
-            page.wait_for_load_state("domcontentloaded", timeout=10000)
-            time.sleep(1)
-            
+            page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_WAIT_MS)
+        except Exception:
+            pass
+
+    dwell_ms = ENGINE_MIN_DWELL_MS.get(engine, 0)
+    remaining_ms = dwell_ms - (time.perf_counter() - nav_start) * 1000
+    if remaining_ms > 0:
+        page.wait_for_timeout(remaining_ms)
+    _record_phase(timings, f"{engine}_ready", ready_start)
+    return ready
+
+# -------- In-page extraction scripts (one evaluate() per results page) --------
+DUCKDUCKGO_EXTRACT_JS = """
+(opts) => {
+    let items = [];
+    let used = null;
+    for (const selector of opts.resultSelectors) {
+        const found = document.querySelectorAll(selector);
+        if (found.length > 0) {
+            items = Array.from(found);
+            used = selector;
+            break;
+        }
+    }
+    if (!used) {
+        items = Array.from(document.querySelectorAll(opts.fallbackSelector));
+    }
+    const count = items.length;
+    const rows = items.slice(0, opts.limit).map(item => {
+        let title = "";
+        for (const sel of opts.titleSelectors) {
+            const el = item.querySelector(sel);
+            if (el) {
+                title = (el.innerText || "").trim();
+                if (title) break;
+            }
+        }
+        let link = "";
+        for (const sel of opts.linkSelectors) {
+            const el = item.querySelector(sel);
+            if (el) {
+                link = el.getAttribute("href") || "";
+                if (link && link.startsWith("http")) break;
+            }
+        }
+        let snippet = "";
+        for (const sel of opts.snippetSelectors) {
+            const el = item.querySelector(sel);
+            if (el) {
+                snippet = (el.innerText || "").trim();
+                if (snippet && snippet.length > 20) break;
+            }
+        }
+        return {title, link, snippet};
+    });
+    return {selector: used, count, items: rows};
+}
+"""
+
+BING_EXTRACT_JS = """
+(opts) => Array.from(document.querySelectorAll("li.b_algo")).slice(0, opts.limit).map(item => {
+    const titleEl = item.querySelector("h2 a, h2");
+    const linkEl = item.querySelector("a");
+    const snippetEl = item.querySelector("p, .b_caption p");
+    return {
+        title: titleEl ? (titleEl.innerText || "").trim() : "",
+        link: linkEl ? linkEl.getAttribute("href") : "",
+        snippet: snippetEl ? (snippetEl.innerText || "").trim() : null
+    };
+})
+"""
+
+WIKIPEDIA_EXTRACT_JS = """
+(opts) => {
+    let items = Array.from(document.querySelectorAll(".mw-search-result, .searchresult"));
+    if (items.length === 0) {
+        // Maybe we're on the article directly
+        items = Array.from(document.querySelectorAll("#mw-content-text p"));
+    }
+    return items.slice(0, opts.limit).map(item => {
+        const linkEl = item.querySelector("a");
+        return {
+            text: (item.innerText || "").trim(),
+            link: linkEl ? (linkEl.getAttribute("href") || "") : null
+        };
+    });
+}
+"""
+
+def _search_duckduckgo(page, query: str, limit: int, timeout_ms: int, timings=None):
+    """Extract DuckDuckGo results for an already-rewritten query"""
+    results = []
+    q = urllib.parse.quote_plus(_clean_query(query))
+
+    # Use DuckDuckGo - NO CAPTCHA!
+    url = f"https://duckduckgo.com/?q={q}"
+
+    print(f"   Searching DuckDuckGo (no CAPTCHA!): {query}")
+
+    # Navigate and wait for the search results container
+    _navigate_and_wait(page, "duckduckgo", url, "[data-testid='result'], .result, #links", timeout_ms, timings)
+    extract_start = time.perf_counter()
+
+    # Extract every result in one in-page call (no per-element round trips / handles)
+    extracted = page.evaluate(DUCKDUCKGO_EXTRACT_JS, {
+        "resultSelectors": [
+            "[data-testid='result']",
+            "article[data-testid='result']",
+            ".result",
+            "#links .result"
+        ],
+        "fallbackSelector": "div[data-result-index], .results_links",
+        "titleSelectors": ["h2", "[data-testid='result-title']", ".result__title", "a.result__a"],
+        "linkSelectors": ["a[href]", "[data-testid='result-title-a']", ".result__url"],
+        "snippetSelectors": [
+            "[data-testid='result-snippet']",
+            ".result__snippet",
+            "[data-result='snippet']",
+            "div[data-testid='result-extras']"
+        ],
+        "limit": limit
+    })
+
+    if extracted["selector"]:
+        print(f"   Found {extracted['count']} results using selector: {extracted['selector']}")
+    else:
+        print("   Trying fallback extraction...")
+
+    # Build result records from the plain JSON rows
+    for item in extracted["items"]:
+        try:
+            title = item["title"]
+            link = item["link"]
+            snippet = item["snippet"]
+
+            # Use title as snippet if no snippet found
+            if not snippet and title:
+                snippet = title
+
+            # Validate and add result
+            if title and link and link.startswith("http"):
+                # Skip DuckDuckGo's own links
+                if "duckduckgo.com" not in link:
+                    results.append(_annotate_duckduckgo_result(title, link, snippet))
+                    print(f"   ✓ Result {len(results)}: {_result_marker_prefix(results[-1])}{title[:60]}...")
+
         except Exception as e:
-            print(f"   Page load issue: {e}")
-            print(f"   Trying alternative method...")
-            time.sleep(1)
+            continue
+
+    _record_phase(timings, "duckduckgo_extract", extract_start)
+    return results
+
+def _annotate_duckduckgo_result(title: str, link: str, snippet: str):
+    """Build a result record with Wikipedia/recency flags for ranking"""
+    # Check if Wikipedia
+    is_wikipedia = "wikipedia.org" in link
+
+    # Detect date indicators for recency scoring
+    is_recent = False
+    has_exact_date = False
+    lower_text = (snippet + title).lower()
+
+    # Check for exact date match (October 10, Oct 10, 10 October, etc.)
+    exact_date_patterns = [
+        "october 10", "oct 10", "10 october", "10 oct",
+        "10th october", "october 10th", "10/10/2025",
+        "2025-10-10", "10-10-2025"
+    ]
+    for pattern in exact_date_patterns:
+        if pattern in lower_text:
+            has_exact_date = True
+            is_recent = True
+            break
+
+    # Check for recent time indicators
+    if not has_exact_date:
+        recent_indicators = [
+            "today", "yesterday", "hours ago", "minutes ago",
+            "this morning", "this evening", "tonight",
+            "october 2025", "oct 2025", "2025",
+            "this week", "this month", "latest", "breaking"
+        ]
+
+        for indicator in recent_indicators:
+            if indicator in lower_text:
+                is_recent = True
+                break
 
-        # Extract DuckDuckGo search results
+    # Detect OLD date indicators (to deprioritize)
+    is_old = False
+    old_indicators = [
+        "days ago", "weeks ago", "months ago", "years ago",
+        "2024", "2023", "2022", "2021", "2020",
+        "last year", "last month"
+    ]
+
+    for indicator in old_indicators:
+        if indicator in lower_text:
+            is_old = True
+            break
+
+    return {
+        "title": title,
+        "link": link,
+        "snippet": snippet,
+        "is_wikipedia": is_wikipedia,
+        "is_recent": is_recent,
+        "is_old": is_old,
+        "has_exact_date": has_exact_date
+    }
+
+def _result_marker_prefix(result):
+    """Visual indicators for a logged result line"""
+    markers = []
+    if result.get("has_exact_date"):
+        markers.append("📅 Oct 10")
+    if result.get("is_wikipedia"):
+        markers.append("📚 Wikipedia")
+    if result.get("is_recent") and not result.get("has_exact_date"):
+        markers.append("🔥 Recent")
+    if result.get("is_old"):
+        markers.append("⏳ Old")
+
+    marker_text = " | ".join(markers) if markers else ""
+    return f"[{marker_text}] " if marker_text else ""
+
+def _search_bing(page, query: str, limit: int, timeout_ms: int, timings=None):
+    """Extract Bing results for an already-rewritten query"""
+    results = []
+    q = urllib.parse.quote_plus(_clean_query(query))
+    bing_url = f"https://www.bing.com/search?q={q}"
+    _navigate_and_wait(page, "bing", bing_url, "li.b_algo", timeout_ms, timings)
+    extract_start = time.perf_counter()
+
+    # One in-page call returns plain {title, link, snippet} rows
+    bing_results = page.evaluate(BING_EXTRACT_JS, {"limit": limit})
+
+    for item in bing_results:
         try:
-            # Wait for search results container
-            try:
-                page.wait_for_selector("[data-testid='result'], .result, #links", timeout=8000)
-            except:
-                print("   Waiting for results to load...")
-                time.sleep(2)
-            
-            # DuckDuckGo uses different selectors
-            result_selectors = [
-                "[data-testid='result']",
-                "article[data-testid='result']",
-                ".result",
-                "#links .result"
-            ]
-            
-            result_items = []
-            for selector in result_selectors:
-                try:
-                    items = page.query_selector_all(selector)
-                    if items and len(items) > 0:
-                        result_items = items
-                        print(f"   Found {len(result_items)} results using selector: {selector}")
+            title = item["title"]
+            link = item["link"]
+            link = _maybe_base64_decode(link)
+            snippet = item["snippet"] if item["snippet"] is not None else title
+
+            if title and link and link.startswith("http"):
+                if "bing.com" not in link and "microsoft.com" not in link:
+                    results.append(_annotate_bing_result(title, link, snippet))
+                    print(f"   ✓ Bing result {len(results)}: {title[:60]}...")
+
+                    if len(results) >= limit:
                         break
-                except:
-                    continue
-            
-            if not result_items:
-                print("   Trying fallback extraction...")
-                result_items = page.query_selector_all("div[data-result-index], .results_links")
-            
-            # Extract information from each result
-            for item in result_items[:limit]:
-                try:
-                    # Get title
-                    title = ""
-                    title_selectors = ["h2", "[data-testid='result-title']", ".result__title", "a.result__a"]
-                    
-                    for sel in title_selectors:
-                        try:
-                            title_elem = item.query_selector(sel)
-                            if title_elem:
-                                title = title_elem.inner_text().strip()
-                                if title:
-                                    break
-                        except:
-                            continue
-                    
-                    # Get link
-                    link = ""
-                    link_selectors = ["a[href]", "[data-testid='result-title-a']", ".result__url"]
-                    
-                    for sel in link_selectors:
-                        try:
-                            link_elem = item.query_selector(sel)
-                            if link_elem:
-                                link = link_elem.get_attribute("href") or ""
-                                if link and link.startswith("http"):
-                                    break
-                        except:
-                            continue
-                    
-                    # Get snippet
-                    snippet = ""
-                    snippet_selectors = [
-                        "[data-testid='result-snippet']",
-                        ".result__snippet",
-                        "[data-result='snippet']",
-                        "div[data-testid='result-extras']"
-                    ]
-                    
-                    for sel in snippet_selectors:
-                        try:
-                            snippet_elem = item.query_selector(sel)
-                            if snippet_elem:
-                                snippet = snippet_elem.inner_text().strip()
-                                if snippet and len(snippet) > 20:
-                                    break
-                        except:
-                            continue
-                    
-                    # Use title as snippet if no snippet found
-                    if not snippet and title:
-                        snippet = title
-                    
-                    # Validate and add result
-                    if title and link and link.startswith("http"):
-                        # Skip DuckDuckGo's own links
-                        if "duckduckgo.com" not in link:
-                            # Check if Wikipedia
-                            is_wikipedia = "wikipedia.org" in link
-                            
-                            # Detect date indicators for recency scoring
-                            is_recent = False
-                            has_exact_date = False
-                            lower_text = (snippet + title).lower()
-                            
-                            # Check for exact date match (October 10, Oct 10, 10 October, etc.)
-                            exact_date_patterns = [
-                                "october 10", "oct 10", "10 october", "10 oct",
-                                "10th october", "october 10th", "10/10/2025",
-                                "2025-10-10", "10-10-2025"
-                            ]
-                            for pattern in exact_date_patterns:
-                                if pattern in lower_text:
-                                    has_exact_date = True
-                                    is_recent = True
-                                    break
-                            
-                            # Check for recent time indicators
-                            if not has_exact_date:
-                                recent_indicators = [
-                                    "today", "yesterday", "hours ago", "minutes ago",
-                                    "this morning", "this evening", "tonight",
-                                    "october 2025", "oct 2025", "2025",
-                                    "this week", "this month", "latest", "breaking"
-                                ]
-                                
-                                for indicator in recent_indicators:
-                                    if indicator in lower_text:
-                                        is_recent = True
-                                        break
-                            
-                            # Detect OLD date indicators (to deprioritize)
-                            is_old = False
-                            old_indicators = [
-                                "days ago", "weeks ago", "months ago", "years ago",
-                                "2024", "2023", "2022", "2021", "2020",
-                                "last year", "last month"
-                            ]
-                            
-                            for indicator in old_indicators:
-                                if indicator in lower_text:
-                                    is_old = True
-                                    break
-                            
-                            results.append({
-                                "title": title,
-                                "link": link,
-                                "snippet": snippet,
-                                "is_wikipedia": is_wikipedia,
-                                "is_recent": is_recent,
-                                "is_old": is_old,
-                                "has_exact_date": has_exact_date
-                            })
-                            
-                            # Visual indicators
-                            markers = []
-                            if has_exact_date:
-                                markers.append("📅 Oct 10")
-                            if is_wikipedia:
-                                markers.append("📚 Wikipedia")
-                            if is_recent and not has_exact_date:
-                                markers.append("🔥 Recent")
-                            if is_old:
-                                markers.append("⏳ Old")
-                            
-                            marker_text = " | ".join(markers) if markers else ""
-                            prefix = f"   [{marker_text}] " if marker_text else "   "
-                            
-                            print(f"   ✓ Result {len(results)}: {prefix}{title[:60]}...")
-                
-                except Exception as e:
-                    continue
-            
-            # If still no results, try Bing as ultimate fallback
-            if len(results) < 2:
-                print("   Few results from DuckDuckGo, trying Bing...")
-                
-                try:
-                    bing_url = f"https://www.bing.com/search?q={q}"
-                    page.goto(bing_url, timeout=timeout_ms)
-                    time.sleep(3)
-                    
-                    bing_results = page.query_selector_all("li.b_algo")
-                    
-                    for item in bing_results[:limit]:
-                        try:
-                            title_elem = item.query_selector("h2 a, h2")
-                            title = title_elem.inner_text().strip() if title_elem else ""
-                            
-                            link_elem = item.query_selector("a")
-                            link = link_elem.get_attribute("href") if link_elem else ""
-                            link = _maybe_base64_decode(link)
-                            
-                            snippet_elem = item.query_selector("p, .b_caption p")
-                            snippet = snippet_elem.inner_text().strip() if snippet_elem else title
-                            
-                            if title and link and link.startswith("http"):
-                                if "bing.com" not in link and "microsoft.com" not in link:
-                                    is_wikipedia = "wikipedia.org" in link
-                                    
-                                    # Detect recency for Bing results too
-                                    is_recent = any(ind in (snippet + title).lower() for ind in [
-                                        "today", "hours ago", "minutes ago", "october 2025", "2025", "latest"
-                                    ])
-                                    is_old = any(ind in (snippet + title).lower() for ind in [
-                                        "days ago", "weeks ago", "months ago", "2024", "2023"
-                                    ])
-                                    
-                                    results.append({
-                                        "title": title,
-                                        "link": link,
-                                        "snippet": snippet,
-                                        "is_wikipedia": is_wikipedia,
-                                        "is_recent": is_recent,
-                                        "is_old": is_old
-                                    })
-                                    print(f"   ✓ Result {len(results)}: {title[:60]}...")
-                                    
-                                    if len(results) >= limit:
-                                        break
-                        except:
-                            continue
-                except Exception as bing_error:
-                    print(f"   Bing fallback failed: {bing_error}")
-            
-            # Check if this is a historical/range query
-            import re
-            is_historical_range = any(pattern in query.lower() for pattern in [
-                " to ", " - ", "from ", "between "
-            ])
-            year_range_match = re.search(r'(19|20)\d{2}\s*(to|-|through|till)\s*(19|20)\d{2}', query.lower())
-            
-            # If STILL no good results, OR if historical range query, try Wikipedia directly
-            if len(results) < 3 or is_historical_range or year_range_match:
-                if is_historical_range or year_range_match:
-                    print("   📚 Historical range query - fetching comprehensive Wikipedia data...")
-                else:
-                    print("   Trying Wikipedia directly for better context...")
-                try:
-                    # Extract key terms from query
-                    wiki_query = query.replace("today", "").replace("current", "").replace("latest", "").replace("wikipedia", "").strip()
-                    wiki_q = urllib.parse.quote_plus(wiki_query)
-                    wiki_url = f"https://en.wikipedia.org/wiki/Special:Search?search={wiki_q}"
-                    
-                    page.goto(wiki_url, timeout=timeout_ms)
-                    time.sleep(2)
-                    
-                    # Try to get first search result or main article
-                    wiki_results = page.query_selector_all(".mw-search-result, .searchresult")
-                    
-                    if not wiki_results:
-                        # Maybe we're on the article directly
-                        wiki_results = page.query_selector_all("#mw-content-text p")
-                    
-                    for i, item in enumerate(wiki_results[:3]):
-                        try:
-                            # Get text content
-                            text = item.inner_text().strip()
-                            
-                            # Get link if available
-                            link_elem = item.query_selector("a")
-                            if link_elem:
-                                wiki_link = link_elem.get_attribute("href") or ""
-                                if wiki_link.startswith("/"):
-                                    wiki_link = f"https://en.wikipedia.org{wiki_link}"
-                            else:
-                                wiki_link = wiki_url
-                            
-                            if text and len(text) > 50:
-                                results.append({
-                                    "title": f"Wikipedia: {query}",
-                                    "link": wiki_link,
-                                    "snippet": text[:500],
-                                    "is_wikipedia": True,
-                                    "is_recent": False,
-                                    "is_old": False
-                                })
-                                print(f"   ✓ Wikipedia result added: {text[:60]}...")
-                                
-                        except:
-                            continue
-                            
-                except Exception as wiki_error:
-                    print(f"   Wikipedia fallback note: {wiki_error}")
-            
-            print(f"   ✓ Total results extracted: {len(results)}")
-            
+        except:
+            continue
+
+    _record_phase(timings, "bing_extract", extract_start)
+    return results
+
+def _annotate_bing_result(title: str, link: str, snippet: str):
+    """Build a Bing result record with Wikipedia/recency flags"""
+    is_wikipedia = "wikipedia.org" in link
+
+    # Detect recency for Bing results too
+    is_recent = any(ind in (snippet + title).lower() for ind in [
+        "today", "hours ago", "minutes ago", "october 2025", "2025", "latest"
+    ])
+    is_old = any(ind in (snippet + title).lower() for ind in [
+        "days ago", "weeks ago", "months ago", "2024", "2023"
+    ])
+
+    return {
+        "title": title,
+        "link": link,
+        "snippet": snippet,
+        "is_wikipedia": is_wikipedia,
+        "is_recent": is_recent,
+        "is_old": is_old
+    }
+
+def _search_wikipedia(page, query: str, timeout_ms: int, timings=None):
+    """Wikipedia search (or the article it redirects to) for an already-rewritten query"""
+    results = []
+
+    # Extract key terms from query
+    wiki_query = query.replace("today", "").replace("current", "").replace("latest", "").replace("wikipedia", "").strip()
+    wiki_q = urllib.parse.quote_plus(wiki_query)
+    wiki_url = f"https://en.wikipedia.org/wiki/Special:Search?search={wiki_q}"
+
+    # Search results page, or the article itself when Wikipedia redirects
+    _navigate_and_wait(page, "wikipedia", wiki_url, ".mw-search-result, .searchresult, #mw-content-text p", timeout_ms, timings)
+    extract_start = time.perf_counter()
+
+    # Try to get first search result or main article (one in-page call)
+    wiki_results = page.evaluate(WIKIPEDIA_EXTRACT_JS, {"limit": 3})
+
+    for item in wiki_results:
+        try:
+            # Get text content
+            text = item["text"]
+
+            # Get link if available
+            wiki_link = item["link"]
+            if wiki_link is not None:
+                if wiki_link.startswith("/"):
+                    wiki_link = f"https://en.wikipedia.org{wiki_link}"
+            else:
+                wiki_link = wiki_url
+
+            if text and len(text) > 50:
+                results.append({
+                    "title": f"Wikipedia: {query}",
+                    "link": wiki_link,
+                    "snippet": text[:500],
+                    "is_wikipedia": True,
+                    "is_recent": False,
+                    "is_old": False
+                })
+                print(f"   ✓ Wikipedia result added: {text[:60]}...")
+
+        except:
+            continue
+
+    _record_phase(timings, "wikipedia_extract", extract_start)
+    return results
+
+# -------- Core: Web search using Chrome (DuckDuckGo - No CAPTCHA!) --------
+# -------- Engine chain: sequential fallback or hedged --------
+# Hedged: secondary engines start after a short delay (at once for range
+# queries) instead of after the previous engine has fully finished/timed out
+SEARCH_HEDGED = os.environ.get("NEXUS_SEARCH_HEDGED", "1") == "1"
+HEDGE_DELAY_MS = int(os.environ.get("NEXUS_HEDGE_DELAY_MS", "1500"))
+CANCEL_POLL_SECONDS = 0.1  # How often a cancellable hedged search checks its cancel event
+
+def _is_range_search(query: str):
+    """Historical/range query (e.g. "2019 to 2023") - Wikipedia is always wanted"""
+    is_historical_range = any(pattern in query.lower() for pattern in [
+        " to ", " - ", "from ", "between "
+    ])
+    year_range_match = _YEAR_RANGE_PATTERN.search(query.lower())
+    return bool(is_historical_range or year_range_match)
+
+def _merge_engine_results(web_results: list, wiki_results: list, limit: int):
+    """Web results (deduplicated by canonical link, capped at limit) followed by Wikipedia"""
+    merged = []
+    seen = set()
+    for r in web_results:
+        link = url_key(r.get("link", ""))
+        if link in seen:
+            continue
+        seen.add(link)
+        merged.append(r)
+        if len(merged) >= limit:
+            break
+    for r in wiki_results:
+        if url_key(r.get("link", "")) not in seen:
+            seen.add(url_key(r.get("link", "")))
+            merged.append(r)
+    return merged
+
+def run_engine_search(query: str, limit: int, engines: dict, backend: str = "browser",
+                      hedged=None, stop=None, cancel=None):
+    """Run the engine chain for one query
+
+    engines maps "duckduckgo" / "bing" to fn(query, limit) and "wikipedia" to
+    fn(query); each returns annotated result records. The same chain is used by
+    the browser and the plain-HTTP search backends (see search_backends.py).
+
+    Uses Bing when DuckDuckGo returns fewer than 2 results and adds Wikipedia
+    for range queries or when fewer than 3 results were found.
+    hedged (default SEARCH_HEDGED) runs the engines concurrently instead of as a
+    fallback chain - engine functions must then be safe to call from other
+    threads. stop (a threading.Event) is set once no more results are wanted.
+    cancel (a threading.Event the caller sets) abandons the search early with
+    whatever results have arrived.
+    Each engine's results are cached per backend and effective query (SEARCH_CACHE).
+    """
+    freshness = classify_freshness(query)
+    query = rewrite_search_query(query)
+    hedged = SEARCH_HEDGED if hedged is None else hedged
+
+    if hedged:
+        return _run_engines_hedged(query, limit, engines, backend, freshness,
+                                   stop if stop is not None else threading.Event(), cancel)
+
+    results = []
+
+    def cancelled():
+        if cancel is not None and cancel.is_set():
+            print(f"   ✂️  Search cancelled ({backend}) with {len(results)} result(s)")
+            return True
+        return False
+
+    # Extract DuckDuckGo search results
+    try:
+        results.extend(_cached_engine_search(
+            "duckduckgo", query, limit, freshness,
+            lambda: engines["duckduckgo"](query, limit), backend
+        ))
+    except Exception as e:
+        print(f"   Error during extraction: {e}")
+        traceback.print_exc()
+
+    # If still no results, try Bing as ultimate fallback
+    if len(results) < 2 and not cancelled():
+        print("   Few results from DuckDuckGo, trying Bing...")
+        remaining = limit - len(results)
+
+        try:
+            results.extend(_cached_engine_search(
+                "bing", query, remaining, freshness,
+                lambda: engines["bing"](query, remaining), backend
+            ))
+        except Exception as bing_error:
+            print(f"   Bing fallback failed: {bing_error}")
+
+    # If STILL no good results, OR if historical range query, try Wikipedia directly
+    is_range = _is_range_search(query)
+    if (len(results) < 3 or is_range) and not cancelled():
+        if is_range:
+            print("   📚 Historical range query - fetching comprehensive Wikipedia data...")
+        else:
+            print("   Trying Wikipedia directly for better context...")
+        try:
+            results.extend(_cached_engine_search(
+                "wikipedia", query, 3, freshness,
+                lambda: engines["wikipedia"](query), backend
+            ))
+        except Exception as wiki_error:
+            print(f"   Wikipedia fallback note: {wiki_error}")
+
+    print(f"   ✓ Total results extracted ({backend}): {len(results)}")
+    return results
+
+def _run_engines_hedged(query: str, limit: int, engines: dict, backend: str, freshness: str, stop, cancel=None):
+    """
+    DuckDuckGo starts at once; Bing and Wikipedia start when DuckDuckGo finishes
+    short of results or after HEDGE_DELAY_MS, whichever comes first (immediately
+    for range queries). Results are merged as engines finish; once the quota
+    (limit results, plus Wikipedia for range queries) is met or nothing else is
+    needed, stop is set and slower engines are abandoned. Setting cancel
+    ends the search early the same way.
+    """
+    is_range = _is_range_search(query)
+    if is_range:
+        print("   📚 Historical range query - fetching comprehensive Wikipedia data...")
+
+    calls = {
+        "duckduckgo": (limit, lambda: engines["duckduckgo"](query, limit)),
+        "bing": (limit, lambda: engines["bing"](query, limit)),
+        "wikipedia": (3, lambda: engines["wikipedia"](query))
+    }
+    finished = {}  # engine -> results
+    launched = set()
+    done = queue.Queue()
+    executor = ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix=f"hedge-{backend}")
+
+    def run(engine):
+        engine_limit, fetch = calls[engine]
+        results = []
+        try:
+            if not stop.is_set():
+                results = _cached_engine_search(engine, query, engine_limit, freshness, fetch, backend)
         except Exception as e:
-            print(f"   Error during extraction: {e}")
-            import traceback
-            traceback.print_exc()
-    
+            print(f"   {engine} search failed: {e}")
+        done.put((engine, results))
+
+    def launch(engine, reason):
+        if engine not in launched:
+            launched.add(engine)
+            print(f"   🚀 Starting {engine} ({reason})")
+            executor.submit(run, engine)
+
+    def counts():
+        web = sum(len(finished.get(e, [])) for e in ("duckduckgo", "bing"))
+        return web, web + len(finished.get("wikipedia", []))
+
+    def needed():
+        """Secondary engines still worth starting, given what has finished"""
+        web, total = counts()
+        wanted = []
+        if web < 2:
+            wanted.append("bing")
+        if total < 3 or is_range:
+            wanted.append("wikipedia")
+        return wanted
+
+    start = time.perf_counter()
+    hedge_at = start + HEDGE_DELAY_MS / 1000.0
+    launch("duckduckgo", "primary")
+    if is_range:
+        launch("bing", "range query")
+        launch("wikipedia", "range query")
+
+    try:
+        while True:
+            web, total = counts()
+            quota_met = total >= limit and (not is_range or "wikipedia" in finished)
+            if quota_met:
+                break
+            if cancel is not None and cancel.is_set():
+                print(f"   ✂️  Search cancelled ({backend}) with {total} result(s)")
+                break
+            if "duckduckgo" in finished or time.perf_counter() >= hedge_at:
+                for engine in needed():
+                    launch(engine, "hedge" if "duckduckgo" not in finished else "too few results")
+                running = launched - set(finished)
+                # Nothing running that could still change the outcome
+                if not any(e == "duckduckgo" or e in needed() for e in running):
+                    break
+            wait = None if time.perf_counter() >= hedge_at or "duckduckgo" in finished \
+                else max(0.0, hedge_at - time.perf_counter())
+            if cancel is not None:
+                wait = CANCEL_POLL_SECONDS if wait is None else min(wait, CANCEL_POLL_SECONDS)
+            try:
+                engine, results = done.get(timeout=wait)
+            except queue.Empty:
+                continue
+            finished[engine] = results
+            print(f"   ⏱️  {engine} finished with {len(results)} result(s) after "
+                  f"{(time.perf_counter() - start) * 1000:.0f}ms")
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    abandoned = sorted(launched - set(finished))
+    if abandoned:
+        print(f"   ✂️  Abandoned: {', '.join(abandoned)}")
+
+    results = _merge_engine_results(
+        finished.get("duckduckgo", []) + finished.get("bing", []),
+        finished.get("wikipedia", []), limit
+    )
+    print(f"   ✓ Total results extracted ({backend}, hedged): {len(results)}")
+    return results
+
+def run_search_with_chrome(context, query: str, limit: int = 10, timeout_ms: int = 30000, timings=None,
+                           cancel=None):
+    """Search DuckDuckGo (no CAPTCHA!) using Chrome to get comprehensive results
+
+    Runs the run_engine_search() fallback chain (sequentially - one page,
+    one browser thread) on a page of the given browser context; the page is
+    only opened when some engine actually has to be driven (cache misses).
+    Pass a dict as timings to get per-phase durations (ms) for this search.
+    cancel (a threading.Event) stops the chain before the next engine starts.
+    """
+    results = []
+    page = None
+    timings = {} if timings is None else timings
+    search_start = time.perf_counter()
+
+    def get_page():
+        nonlocal page
+        if page is None:
+            page = context.new_page()
+        return page
+
+    if cancel is not None and cancel.is_set():
+        return results
+
+    try:
+        results = run_engine_search(query, limit, {
+            "duckduckgo": lambda q, n: _search_duckduckgo(get_page(), q, n, timeout_ms, timings),
+            "bing": lambda q, n: _search_bing(get_page(), q, n, timeout_ms, timings),
+            "wikipedia": lambda q: _search_wikipedia(get_page(), q, timeout_ms, timings)
+        }, backend="browser", hedged=False, cancel=cancel)
+
+        _record_phase(timings, "search_total", search_start)
+        print(f"   ⏱️  Phases: " + ", ".join(f"{phase}={ms:.0f}ms" for phase, ms in timings.items()))
+
     except Exception as e:
         print(f"   Browser error: {e}")
-    
+
     finally:
         if page:
             try:
                 page.close()
             except:
                 pass
-    
+
     return results
 
 def extract_answer_from_results(question: str, results: list) -> str:
@@ -1059,6 +1515,7 @@ def main():
                     # Search with Chrome (DuckDuckGo - No CAPTCHA!)
                     # Reduced to 5 for faster, focused results
                     results = run_search_with_chrome(context, question, limit=5, timeout_ms=30000)
+                    results = RESULT_DEDUP.dedupe(results)
                     
                     if results:
                         # Extract ONE BEST natural answer from results
@@ -1076,7 +1533,7 @@ def main():
                                     print(f"   {i}. {r['title'][:80]}")
                         
                         # Save results
-                        save_results_append(results)
+                        save_results_append(results, question)
                     else:
                         final_answer = "I searched the web but couldn't find reliable information. Please try rephrasing your question."
                         method = "web"
@@ -1107,21 +1564,8 @@ def main():
 
     elapsed = round(time.time() - start_time, 2)
     
-    # Save result for logging (still keep JSON for records)
-    output = {
-        "question": question,
-        "answer": final_answer,
-        "sources": sources if sources else [],
-        "method": method,
-        "timestamp": time.time()
-    }
-    
-    try:
-        result_file = STATE_DIR / f"result_{int(time.time())}.json"
-        with result_file.open("w", encoding="utf-8") as f:
-            json.dump(output, f, indent=2, ensure_ascii=False)
-    except Exception:
-        pass
+    # Save result for logging
+    RESULT_STORE.append_answer(question, final_answer, method, sources)
     
     print(f"\n⏱️  Answered in {elapsed}s")
     print("=" * 70)
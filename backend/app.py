@@ -8,33 +8,139 @@ from flask_cors import CORS
 import sys
 import os
 import json
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 # Import from agent_step3
-from agent_step3 import call_ollama_answer, run_search_with_chrome, extract_answer_from_results
-from playwright.sync_api import sync_playwright
+from agent_step3 import (call_ollama_answer, stream_ollama_answer, extract_answer_from_results,
+                         classify_freshness, SEARCH_CACHE, search_phase_stats)
+
+# Shared warm browser pool
+from browser_pool import BROWSER_POOL
+
+# Shared Ollama connection + cached health
+from ollama_client import OLLAMA
+from llm_scheduler import LLM_SCHEDULER
+
+# Web search: plain HTTP first, browser when needed
+from search_backends import SEARCH_BACKEND
+
+# Picks Mistral / web / both before Mistral is tried
+from query_router import QUERY_ROUTER
 
 # Import web scraper
-from web_scraper import scrape_search_results, extract_structured_data
+from web_scraper import scrape_search_results, extract_structured_data, resolve_extractors
+from http_cache import HTTP_CACHE
+from scrape_archive import SCRAPE_ARCHIVE
+
+# Everything scraped/searched so far, answerable without a new search
+from knowledge_index import KNOWLEDGE_INDEX
+
+# Collapses the same article returned by several optimized queries
+from result_dedup import RESULT_DEDUP
+
+# Answer cache
+from ttl_cache import TTLCache, normalize_question
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
 
+# Max optimized-query searches running at once (browser escalations are also capped by the pool size)
+SEARCH_FANOUT = int(os.environ.get("NEXUS_SEARCH_FANOUT", "4"))
+
+# /ask answer cache - TTL depends on how time-sensitive the question is
+ANSWER_TTLS = {
+    'live': int(os.environ.get("NEXUS_ANSWER_TTL_LIVE", "600")),  # 10 min: weather, today, latest
+    'dated': int(os.environ.get("NEXUS_ANSWER_TTL_DATED", "21600")),  # 6 h: specific dates
+    'timeless': int(os.environ.get("NEXUS_ANSWER_TTL_TIMELESS", "604800"))  # 7 days: general knowledge
+}
+ANSWER_CACHE = TTLCache(maxsize=int(os.environ.get("NEXUS_ANSWER_CACHE_SIZE", "512")), name='answers')
+
+# Oldest indexed page the knowledge index may answer from, by freshness (0 = always search)
+KNOWLEDGE_MAX_AGE = {
+    'live': int(os.environ.get("NEXUS_KNOWLEDGE_AGE_LIVE", "0")),
+    'dated': int(os.environ.get("NEXUS_KNOWLEDGE_AGE_DATED", "86400")),  # 1 day
+    'timeless': int(os.environ.get("NEXUS_KNOWLEDGE_AGE_TIMELESS", "2592000"))  # 30 days
+}
+
+# Questions routed to "race" run Mistral and the web search side by side
+SPECULATIVE_SEARCH = os.environ.get("NEXUS_SPECULATIVE_SEARCH", "1") == "1"
+SPECULATIVE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative")
+
+
+def cache_answer(question, payload):
+    """Store a successful /ask payload under the question's freshness TTL"""
+    freshness = classify_freshness(question)
+    ANSWER_CACHE.set(normalize_question(question), payload, ttl=ANSWER_TTLS[freshness])
+
+
+def result_sources(search_results):
+    """Source links shown under a web answer (top 5)"""
+    sources = []
+    for r in search_results[:5]:
+        if r.get('link') and r.get('title'):
+            sources.append({
+                'title': r['title'],
+                'link': r['link'],
+                'snippet': r.get('snippet', '')[:200]
+            })
+    return sources
+
+
+def knowledge_lookup(question):
+    """Indexed pages that answer the question and are fresh enough for it ([] = search the web)"""
+    known = KNOWLEDGE_INDEX.lookup(question, KNOWLEDGE_MAX_AGE[classify_freshness(question)])
+    if known:
+        print(f"📚 Knowledge index: {len(known)} relevant indexed pages - skipping web search")
+    return known
+
+
+NO_RESULTS_ANSWER = "I searched the web but couldn't find reliable information. Please try rephrasing your question."
+
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
-    return jsonify({'status': 'ok', 'message': 'Nexus AI Backend is running'}), 200
+    """Health check endpoint (model residency tells whether the next answer pays a model load)"""
+    return jsonify({
+        'status': 'ok',
+        'message': 'Nexus AI Backend is running',
+        'ollama': OLLAMA.residency()
+    }), 200
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Runtime statistics for the backend subsystems"""
+    return jsonify({
+        'ollama': OLLAMA.stats(),
+        'llm_scheduler': LLM_SCHEDULER.stats(),
+        'browser_pool': BROWSER_POOL.stats(),
+        'search_backend': SEARCH_BACKEND.stats(),
+        'query_router': QUERY_ROUTER.stats(),
+        'answer_cache': ANSWER_CACHE.stats(),
+        'search_cache': SEARCH_CACHE.stats(),
+        'http_cache': HTTP_CACHE.stats(),
+        'scrape_archive': SCRAPE_ARCHIVE.stats(),
+        'knowledge_index': KNOWLEDGE_INDEX.stats(),
+        'result_dedup': RESULT_DEDUP.stats(),
+        'search_phases': search_phase_stats()
+    }), 200
 
 
 @app.route('/ask', methods=['POST', 'OPTIONS'])
 def ask():
-    """Main question answering endpoint - Optimized for speed"""
+    """
+    Main question answering endpoint - Optimized for speed
+    Pass "stream": true to receive Mistral tokens and search stages as Server-Sent Events
+    """
     if request.method == 'OPTIONS':
         return '', 200
     
+    decision = None
     try:
         data = request.get_json()
         question = data.get('question', '').strip()
@@ -42,92 +148,104 @@ def ask():
         if not question:
             return jsonify({'error': 'Question is required'}), 400
         
+        if data.get('stream'):
+            return Response(
+                stream_with_context(stream_ask(question)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         print(f"\n{'='*60}")
         print(f"🔵 Question: {question}")
         print(f"{'='*60}")
         
-        # SMART MODE: Mistral for simple/fast, Web for complex/large
-        print("🧠 Step 1: Trying Mistral 7B first (fast for simple questions)...")
-        ollama_answer, ollama_confident = call_ollama_answer(question)
+        # Step 0: Repeat/near-identical question answered recently?
+        cached = ANSWER_CACHE.get(normalize_question(question))
+        if cached is not None:
+            print(f"⚡ Answer cache hit ({cached['method']})")
+            return jsonify(dict(cached, cached=True)), 200
+        
+        # Step 1: Route - obviously web-bound questions skip Mistral entirely
+        decision = QUERY_ROUTER.route(question)
+        search_results = None
+        ollama_answer, ollama_confident, mistral_verdict = None, False, None
+        
+        # Headed for the web anyway: answer from pages we already have if we can
+        known = knowledge_lookup(question) if decision['route'] != 'llm' else None
+        if known:
+            return jsonify(knowledge_payload(question, decision, known, mistral_verdict)), 200
+        
+        if decision['route'] == 'web':
+            print("🧭 Step 1: Web-bound question - skipping Mistral")
+        elif decision['route'] == 'race' and SPECULATIVE_SEARCH:
+            # Likely needs the web: don't wait for Mistral before searching
+            print("🏁 Step 1: Likely web-bound - racing Mistral 7B against web search...")
+            ollama_answer, search_results, mistral_verdict = race_mistral_and_web(question)
+            ollama_confident = ollama_answer is not None
+        else:
+            # SMART MODE: Mistral for simple/fast, Web for complex/large
+            print("🧠 Step 1: Trying Mistral 7B first (fast for simple questions)...")
+            ollama_answer, ollama_confident = call_ollama_answer(question)
+            mistral_verdict = 'answered' if ollama_confident and ollama_answer else 'deferred'
         
         if ollama_confident and ollama_answer:
-            print("✅ Mistral answered from its knowledge base!")
-            print(f"   Answer length: {len(ollama_answer)} characters")
-            return jsonify({
-                'answer': ollama_answer,
-                'method': 'mistral_7b',
-                'sources': []
-            }), 200
+            return jsonify(mistral_payload(question, decision, ollama_answer, mistral_verdict)), 200
         
         # Step 2: Use web search for complex/large queries
-        print("🌐 Step 2: Using web search for detailed/current information...")
-
-        
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                channel="chrome",
-                headless=True,  # Faster in headless mode
-                args=[
-                    '--disable-gpu',  # Safe GPU usage
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled'
-                ]
-            )
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            )
+        if search_results is None:
+            known = knowledge_lookup(question) if known is None else known
+            if known:
+                return jsonify(knowledge_payload(question, decision, known, mistral_verdict)), 200
             
-            # Anti-detection
-            context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                window.navigator.chrome = {runtime: {}};
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3]});
-            """)
+            print("🌐 Step 2: Using web search for detailed/current information...")
             
-            try:
-                # Reduced to 5 results for speed (was 10)
-                search_results = run_search_with_chrome(context, question, limit=5)
-            finally:
-                context.close()
-                browser.close()
+            # Reduced to 5 results for speed (was 10) - HTTP search, pooled browser only if needed
+            search_results = SEARCH_BACKEND.search(question, limit=5)
         
         if search_results and len(search_results) > 0:
             print(f"✅ Found {len(search_results)} search results")
+            KNOWLEDGE_INDEX.add_search_results(search_results, question)
+            search_results = RESULT_DEDUP.dedupe(search_results)
             
             # Extract the final formatted answer (same as terminal version)
             final_answer = extract_answer_from_results(question, search_results)
             
             # Get source links
-            sources = []
-            for r in search_results[:5]:
-                if r.get('link') and r.get('title'):
-                    sources.append({
-                        'title': r['title'],
-                        'link': r['link'],
-                        'snippet': r.get('snippet', '')[:200]
-                    })
+            sources = result_sources(search_results)
             
             print("✅ Web search completed")
             print(f"\n💡 Answer:\n{final_answer[:200]}...")
             
-            return jsonify({
+            payload = {
                 'answer': final_answer,
                 'method': 'web',
                 'sources': sources
-            }), 200
-        else:
-            return jsonify({
-                'answer': "I searched the web but couldn't find reliable information. Please try rephrasing your question.",
-                'method': 'none',
-                'sources': []
-            }), 200
+            }
+            cache_answer(question, payload)
+            QUERY_ROUTER.record(question, decision, 'web', mistral_verdict)
+            return jsonify(payload), 200
+        
+        if decision['route'] == 'web':
+            # The router skipped Mistral but the web came up empty - ask it after all
+            print("🧭 No web results - falling back to Mistral 7B...")
+            ollama_answer, ollama_confident = call_ollama_answer(question)
+            mistral_verdict = 'answered' if ollama_confident and ollama_answer else 'deferred'
+            if ollama_confident and ollama_answer:
+                return jsonify(mistral_payload(question, decision, ollama_answer, mistral_verdict)), 200
+        
+        QUERY_ROUTER.record(question, decision, 'none', mistral_verdict)
+        return jsonify({
+            'answer': NO_RESULTS_ANSWER,
+            'method': 'none',
+            'sources': []
+        }), 200
         
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
         import traceback
         traceback.print_exc()
+        if decision is not None:
+            QUERY_ROUTER.record(question, decision, 'error')
         return jsonify({
             'answer': f"I encountered an error: {str(e)}. Please try again or rephrase your question.",
             'method': 'error',
@@ -135,12 +253,300 @@ def ask():
         }), 200  # Return 200 so frontend can display the error message
 
 
+def mistral_payload(question, decision, answer, mistral_verdict):
+    """/ask payload for a Mistral answer (cached and logged with the routing decision)"""
+    print("✅ Mistral answered from its knowledge base!")
+    print(f"   Answer length: {len(answer)} characters")
+    payload = {
+        'answer': answer,
+        'method': 'mistral_7b',
+        'sources': []
+    }
+    cache_answer(question, payload)
+    QUERY_ROUTER.record(question, decision, 'mistral_7b', mistral_verdict)
+    return payload
+
+
+def knowledge_payload(question, decision, known, mistral_verdict):
+    """/ask payload answered from the knowledge index (cached and logged like a web answer)"""
+    known = RESULT_DEDUP.dedupe(known)
+    payload = {
+        'answer': extract_answer_from_results(question, known),
+        'method': 'knowledge',
+        'sources': result_sources(known)
+    }
+    cache_answer(question, payload)
+    QUERY_ROUTER.record(question, decision, 'knowledge', mistral_verdict)
+    return payload
+
+
+def start_speculative_search(question):
+    """Start the web search in the background; returns (future, cancel event)"""
+    cancel = threading.Event()
+    return SPECULATIVE_EXECUTOR.submit(SEARCH_BACKEND.search, question, limit=5, cancel=cancel), cancel
+
+
+def race_mistral_and_web(question):
+    """
+    Speculative execution: Mistral and the web search start together
+    The first acceptable answer wins - a confident Mistral answer, or any
+    search results - and the other side is cancelled.
+    Returns (mistral_answer, None, verdict) or (None, search_results, verdict);
+    verdict is Mistral's "answered" / "deferred", or None if it was cancelled.
+    """
+    llm_cancel = threading.Event()
+    llm = SPECULATIVE_EXECUTOR.submit(call_ollama_answer, question, cancel=llm_cancel)
+    web, web_cancel = start_speculative_search(question)
+    
+    search_results = []
+    verdict = None
+    for future in as_completed([llm, web]):
+        if future is llm:
+            answer, confident = future.result()
+            if confident and answer:
+                print("🏁 Mistral answered first - cancelling web search")
+                web_cancel.set()
+                return answer, None, 'answered'
+            verdict = 'deferred'
+        else:
+            try:
+                search_results = future.result()
+            except Exception as e:
+                print(f"⚠️  Speculative search failed: {e}")
+                search_results = []
+            if search_results:
+                print("🏁 Web search finished first - cancelling Mistral")
+                llm_cancel.set()
+                return None, search_results, verdict
+    return None, search_results, verdict
+
+
+def _sse(event, data):
+    """Serialize one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_ask(question):
+    """
+    Streaming variant of /ask (Server-Sent Events)
+      stage  {stage, message}  thinking / searching / extracting / ranking
+      token  {text}            Mistral tokens as they are generated
+      reset  {reason}          discard streamed tokens (Mistral deferred to the web)
+      answer {answer, method, sources[, cached]}  the final /ask payload
+      done   {}
+    """
+    yield from _ask_events(question)
+    yield _sse('done', {})
+
+
+def _ask_events(question):
+    print(f"\n{'='*60}")
+    print(f"🔵 Question (stream): {question}")
+    print(f"{'='*60}")
+    
+    decision = None
+    try:
+        cached = ANSWER_CACHE.get(normalize_question(question))
+        if cached is not None:
+            print(f"⚡ Answer cache hit ({cached['method']})")
+            yield _sse('answer', dict(cached, cached=True))
+            return
+        
+        decision = QUERY_ROUTER.route(question)
+        
+        known = knowledge_lookup(question) if decision['route'] != 'llm' else None
+        if known:
+            yield _sse('answer', knowledge_payload(question, decision, known, None))
+            return
+        
+        # Routed to "race": search in the background while Mistral streams;
+        # search results arriving first stop Mistral
+        web, web_cancel = None, None
+        llm_cancel = threading.Event()
+        if decision['route'] == 'race' and SPECULATIVE_SEARCH:
+            print("🏁 Likely web-bound - searching while Mistral answers...")
+            web, web_cancel = start_speculative_search(question)
+            web.add_done_callback(lambda f: llm_cancel.set() if not f.exception() and f.result() else None)
+        
+        mistral_verdict = None
+        if decision['route'] != 'web':
+            ollama_answer, ollama_confident, streamed = yield from _mistral_events(question, llm_cancel)
+            if ollama_confident and ollama_answer:
+                if web_cancel is not None:
+                    web_cancel.set()
+                yield _sse('answer', mistral_payload(question, decision, ollama_answer, 'answered'))
+                return
+            # Deferred, unless the web search won the race and cancelled it
+            mistral_verdict = None if llm_cancel.is_set() else 'deferred'
+            if streamed:
+                yield _sse('reset', {'reason': 'web_search'})
+        
+        if web is None:
+            known = knowledge_lookup(question) if known is None else known
+            if known:
+                yield _sse('answer', knowledge_payload(question, decision, known, mistral_verdict))
+                return
+        
+        yield _sse('stage', {'stage': 'searching', 'message': '🌐 Searching the web...'})
+        if web is not None:
+            try:
+                search_results = web.result()
+            except Exception as e:
+                print(f"⚠️  Speculative search failed: {e}")
+                search_results = []
+        else:
+            search_results = SEARCH_BACKEND.search(question, limit=5)
+        
+        if not search_results:
+            if decision['route'] == 'web':
+                # The router skipped Mistral but the web came up empty - ask it after all
+                print("🧭 No web results - falling back to Mistral 7B...")
+                ollama_answer, ollama_confident, _ = yield from _mistral_events(question)
+                mistral_verdict = 'answered' if ollama_confident and ollama_answer else 'deferred'
+                if ollama_confident and ollama_answer:
+                    yield _sse('answer', mistral_payload(question, decision, ollama_answer, mistral_verdict))
+                    return
+            QUERY_ROUTER.record(question, decision, 'none', mistral_verdict)
+            yield _sse('answer', {'answer': NO_RESULTS_ANSWER, 'method': 'none', 'sources': []})
+            return
+        
+        KNOWLEDGE_INDEX.add_search_results(search_results, question)
+        search_results = RESULT_DEDUP.dedupe(search_results)
+        yield _sse('stage', {'stage': 'extracting', 'message': f'📄 Reading {len(search_results)} results...'})
+        sources = result_sources(search_results)
+        
+        yield _sse('stage', {'stage': 'ranking', 'message': '⚖️ Ranking sources...'})
+        final_answer = extract_answer_from_results(question, search_results)
+        
+        payload = {
+            'answer': final_answer,
+            'method': 'web',
+            'sources': sources
+        }
+        cache_answer(question, payload)
+        QUERY_ROUTER.record(question, decision, 'web', mistral_verdict)
+        yield _sse('answer', payload)
+    
+    except Exception as e:
+        print(f"\n❌ Streaming Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        if decision is not None:
+            QUERY_ROUTER.record(question, decision, 'error')
+        yield _sse('answer', {
+            'answer': f"I encountered an error: {str(e)}. Please try again or rephrase your question.",
+            'method': 'error',
+            'sources': []
+        })
+
+
+def _mistral_events(question, cancel=None):
+    """
+    Stream Mistral's tokens as SSE events
+    Returns (answer, confident, streamed) to the delegating generator.
+    """
+    yield _sse('stage', {'stage': 'thinking', 'message': '🧠 Asking Mistral...'})
+    streamed = False
+    ollama_answer, ollama_confident = None, False
+    for kind, value in stream_ollama_answer(question, cancel=cancel):
+        if kind == 'token':
+            streamed = True
+            yield _sse('token', {'text': value})
+        else:
+            ollama_answer, ollama_confident = value
+    return ollama_answer, ollama_confident, streamed
+
+
+def search_optimized_queries(optimized_queries, parallelism=SEARCH_FANOUT):
+    """
+    Run the web search for each optimized query and merge the results
+    Queries fan out in parallel (capped by parallelism); the merged list keeps
+    the optimized-query order no matter which search finishes first, and the
+    same article found by several queries is only scraped once.
+    """
+    def search_one(opt_query):
+        print(f"  🔎 Searching: {opt_query}")
+        try:
+            return SEARCH_BACKEND.search(opt_query, limit=5)  # Get top 5 per query
+        except Exception as e:
+            print(f"  ⚠️  Search failed for '{opt_query}': {e}")
+            return []
+    
+    queries = optimized_queries[:10]  # Limit to 10 queries max
+    if not queries:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(queries))), thread_name_prefix="search-fanout") as executor:
+        per_query = list(executor.map(search_one, queries))
+    
+    all_search_results = []
+    for results in per_query:
+        if results:
+            all_search_results.extend(results)
+    return RESULT_DEDUP.dedupe(all_search_results)
+
+
+def _ndjson(event):
+    """Serialize one streaming event as a newline-delimited JSON line"""
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def stream_scrape_products(query, batch_size, extractors=None):
+    """
+    Streaming variant of /scrape_products (NDJSON)
+    Emits one JSON object per line as soon as it is available:
+      start -> search_complete -> batch (one per scraped batch) -> done
+    Batches are never accumulated, so memory stays flat regardless of limit.
+    """
+    from agent_step3 import optimize_query_for_wikipedia
+    
+    try:
+        optimized_queries = optimize_query_for_wikipedia(query)
+        print(f"🔍 Optimized queries: {optimized_queries}")
+        yield _ndjson({
+            'type': 'start',
+            'query': query,
+            'optimized_queries': optimized_queries
+        })
+        
+        all_search_results = search_optimized_queries(optimized_queries)
+        if not all_search_results:
+            yield _ndjson({'type': 'error', 'error': 'No search results found'})
+            return
+        
+        print(f"✅ Found {len(all_search_results)} total search results from {len(optimized_queries)} queries")
+        total_batches = (len(all_search_results) + batch_size - 1) // batch_size
+        yield _ndjson({
+            'type': 'search_complete',
+            'total_items': len(all_search_results),
+            'total_batches': total_batches
+        })
+        
+        sent_batches = 0
+        for batch_result in scrape_search_results(all_search_results, batch_size, extractors=extractors, query=query):
+            sent_batches += 1
+            yield _ndjson(dict(batch_result, type='batch'))
+        
+        yield _ndjson({
+            'type': 'done',
+            'success': True,
+            'total_items': len(all_search_results),
+            'total_batches': sent_batches
+        })
+    
+    except Exception as e:
+        print(f"\n❌ Streaming Scrape Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        yield _ndjson({'type': 'error', 'error': str(e)})
+
+
 @app.route('/scrape_products', methods=['POST', 'OPTIONS'])
 def scrape_products():
     """
     Scrape product data from search results in batches
     Progressive loading: Returns batches of products
     For Wikipedia: Extracts ALL tables with structured data
+    Pass "stream": true to receive batches as NDJSON while they are scraped
     """
     if request.method == 'OPTIONS':
         return '', 200
@@ -150,15 +556,30 @@ def scrape_products():
         query = data.get('query', '').strip()
         limit = int(data.get('limit', 100))  # Increased default: 100 results to get MORE data
         batch_size = int(data.get('batch_size', 10))  # Increased batch: 10 per batch
+        stream = bool(data.get('stream', False))
+        extractors = data.get('extractors')  # Optional: only run these extractors per page
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
+        if extractors is not None:
+            try:
+                extractors = resolve_extractors(extractors)
+            except ValueError as e:
+                return jsonify({'error': str(e), 'batches': []}), 400
+        
         print(f"\n{'='*60}")
         print(f"🛍️ Product Scrape Request: {query}")
-        print(f"📊 Limit: {limit} | Batch: {batch_size}")
+        print(f"📊 Limit: {limit} | Batch: {batch_size} | Stream: {stream}")
         print(f"{'='*60}")
         
+        if stream:
+            return Response(
+                stream_with_context(stream_scrape_products(query, batch_size, extractors)),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         # Import query optimizer
         from agent_step3 import optimize_query_for_wikipedia
         
@@ -167,41 +588,7 @@ def scrape_products():
         print(f"🔍 Optimized queries: {optimized_queries}")
         
         # Collect all search results from all optimized queries
-        all_search_results = []
-        
-        # Get search results first
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                channel="chrome",
-                headless=True,
-                args=[
-                    '--disable-gpu',
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled'
-                ]
-            )
-            context = browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            )
-            
-            context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                window.navigator.chrome = {runtime: {}};
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3]});
-            """)
-            
-            try:
-                # Search for each optimized query
-                for opt_query in optimized_queries[:10]:  # Limit to 10 queries max
-                    print(f"  🔎 Searching: {opt_query}")
-                    results = run_search_with_chrome(context, opt_query, limit=5)  # Get top 5 per query
-                    if results:
-                        all_search_results.extend(results)
-            finally:
-                context.close()
-                browser.close()
+        all_search_results = search_optimized_queries(optimized_queries)
         
         if not all_search_results:
             return jsonify({
@@ -213,7 +600,7 @@ def scrape_products():
         
         # Scrape in batches and collect all results
         all_batches = []
-        for batch_result in scrape_search_results(all_search_results, batch_size):
+        for batch_result in scrape_search_results(all_search_results, batch_size, extractors=extractors, query=query):
             all_batches.append(batch_result)
         
         return jsonify({
@@ -246,14 +633,21 @@ def scrape_single():
     try:
         data = request.get_json()
         url = data.get('url', '').strip()
+        extractors = data.get('extractors')  # Optional: e.g. ["metadata", "price", "rating"]
         
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
+        if extractors is not None:
+            try:
+                extractors = resolve_extractors(extractors, url)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
         print(f"\n🌐 Scraping single URL: {url}")
         
-        # Extract structured data
-        structured_data = extract_structured_data(url)
+        # Extract structured data (page is fetched and parsed once)
+        structured_data = extract_structured_data(url, extractors=extractors)
         
         return jsonify({
             'success': True,
@@ -267,6 +661,30 @@ def scrape_single():
         }), 500
 
 
+@app.route('/scrape_archive', methods=['GET'])
+def scrape_archive():
+    """
+    Stored scrape batches as NDJSON, one batch per line
+    ?run_id=... and/or ?url=... filter them; with neither, lists the recent runs
+    """
+    run_id = request.args.get('run_id') or None
+    url = request.args.get('url') or None
+    if run_id is None and url is None:
+        try:
+            limit = int(request.args.get('limit', 20))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+        return jsonify({'runs': SCRAPE_ARCHIVE.runs(limit=limit)}), 200
+    
+    def generate():
+        for batch in SCRAPE_ARCHIVE.iter_batches(run_id=run_id, url=url):
+            yield _ndjson(batch)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("🚀 Nexus AI Backend Starting...")
@@ -274,7 +692,16 @@ if __name__ == '__main__':
     print("📍 Server: http://localhost:5000")
     print("🔧 Health: http://localhost:5000/health")
     print("💬 Endpoint: POST /ask")
+    print("📊 Stats:  http://localhost:5000/stats")
     print("="*60 + "\n")
     
+    # Load Mistral now and keep it resident so the first question skips the model load
+    OLLAMA.start_warm_up()
+    # Watch Ollama in the background so /ask never waits on a health check
+    OLLAMA.start_monitor()
+    # Pre-launch the browser pool so the first web answer skips cold start
+    BROWSER_POOL.start()
+    atexit.register(BROWSER_POOL.shutdown)
+    
     # Use Flask with proper settings
     app.run(host='0.0.0.0', port=5000, debug=False, threaded=True, use_reloader=False)
@@ -0,0 +1,283 @@
+"""
+Browser Pool - Long-lived, pre-launched Chrome instances shared by every request
+Each worker owns one Playwright driver + browser + context on its own thread
+(the sync Playwright API is bound to the thread that started it), so requests
+lease a worker and hand it a function to run against the warm context.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from playwright.sync_api import sync_playwright
+
+try:
+    import psutil  # Optional: enables the RSS ceiling
+except ImportError:
+    psutil = None
+
+# -------- CONFIG --------
+POOL_SIZE = int(os.environ.get("NEXUS_BROWSER_POOL_SIZE", "2"))
+MAX_PAGES_PER_BROWSER = int(os.environ.get("NEXUS_BROWSER_MAX_PAGES", "200"))
+MAX_BROWSER_RSS_MB = int(os.environ.get("NEXUS_BROWSER_MAX_RSS_MB", "1024"))
+LEASE_TIMEOUT = float(os.environ.get("NEXUS_BROWSER_LEASE_TIMEOUT", "60"))
+
+LAUNCH_ARGS = [
+    '--disable-gpu',  # Safe GPU usage
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-blink-features=AutomationControlled'
+]
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Anti-detection
+INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    window.navigator.chrome = {runtime: {}};
+    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3]});
+"""
+
+# Serialises driver launches so each worker can tell which child processes are its own
+_LAUNCH_LOCK = threading.Lock()
+
+
+def _child_pids():
+    if psutil is None:
+        return set()
+    try:
+        return {p.pid for p in psutil.Process().children(recursive=True)}
+    except Exception:
+        return set()
+
+
+class BrowserWorker:
+    """One browser + context living on a dedicated thread"""
+
+    def __init__(self, worker_id, headless=True):
+        self.worker_id = worker_id
+        self.headless = headless
+        self.jobs = queue.Queue()
+        self.pages_served = 0
+        self.jobs_served = 0
+        self.launches = 0
+        self.recycles = 0
+        self.last_rss_mb = 0.0
+        self.ready = threading.Event()
+        self.launch_error = None
+        self._pids = set()
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._thread = threading.Thread(target=self._loop, name=f"browser-pool-{worker_id}", daemon=True)
+        self._thread.start()
+
+    # ---- runs on the worker thread ----
+    def _launch(self):
+        with _LAUNCH_LOCK:
+            before = _child_pids()
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(
+                channel="chrome",
+                headless=self.headless,
+                args=LAUNCH_ARGS
+            )
+            self._pids = _child_pids() - before
+        self._context = self._browser.new_context(**CONTEXT_OPTIONS)
+        self._context.add_init_script(INIT_SCRIPT)
+        self._context.on("page", self._on_page)
+        self.pages_served = 0
+        self.launches += 1
+        print(f"   🟢 Browser worker {self.worker_id} ready (launch #{self.launches})")
+
+    def _teardown(self):
+        for closer in (
+            lambda: self._context.close(),
+            lambda: self._browser.close(),
+            lambda: self._playwright.stop()
+        ):
+            try:
+                closer()
+            except Exception:
+                pass
+        self._context = self._browser = self._playwright = None
+        self._pids = set()
+
+    def _on_page(self, page):
+        self.pages_served += 1
+
+    def _rss_mb(self):
+        if psutil is None or not self._pids:
+            return 0.0
+        total = 0
+        for pid in self._pids:
+            try:
+                proc = psutil.Process(pid)
+                total += proc.memory_info().rss
+                for child in proc.children(recursive=True):
+                    try:
+                        total += child.memory_info().rss
+                    except Exception:
+                        continue
+            except Exception:
+                continue
+        return total / (1024 * 1024)
+
+    def _maybe_recycle(self):
+        reason = None
+        if self.pages_served >= MAX_PAGES_PER_BROWSER:
+            reason = f"{self.pages_served} pages served"
+        else:
+            self.last_rss_mb = self._rss_mb()
+            if MAX_BROWSER_RSS_MB and self.last_rss_mb > MAX_BROWSER_RSS_MB:
+                reason = f"RSS {self.last_rss_mb:.0f} MB"
+        if reason:
+            print(f"   ♻️  Recycling browser worker {self.worker_id} ({reason})")
+            self._teardown()
+            self.recycles += 1
+            self._launch()
+
+    def _loop(self):
+        try:
+            self._launch()
+        except Exception as e:
+            self.launch_error = e
+            print(f"   ❌ Browser worker {self.worker_id} failed to launch: {e}")
+        finally:
+            self.ready.set()
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self._context is None:
+                    self._launch()
+                future.set_result(fn(self._context, *args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+                # A crashed browser leaves a dead context behind - start fresh next time
+                if self._browser is not None and not self._browser.is_connected():
+                    self._teardown()
+            finally:
+                self.jobs_served += 1
+            try:
+                if self._context is not None:
+                    self._maybe_recycle()
+            except Exception as e:
+                print(f"   ⚠️  Browser worker {self.worker_id} recycle failed: {e}")
+                self._teardown()
+
+        self._teardown()
+
+    # ---- called from request threads ----
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.jobs.put((future, fn, args, kwargs))
+        return future
+
+    def stop(self):
+        self.jobs.put(None)
+        self._thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            'worker_id': self.worker_id,
+            'alive': self._context is not None,
+            'launches': self.launches,
+            'recycles': self.recycles,
+            'jobs_served': self.jobs_served,
+            'pages_since_launch': self.pages_served,
+            'rss_mb': round(self.last_rss_mb, 1)
+        }
+
+
+class BrowserPool:
+    """
+    Keeps N warm browser contexts and leases one per call
+
+    Usage:
+        results = BROWSER_POOL.run(run_search_with_chrome, query, limit=5)
+
+    The function receives the leased context as its first argument and runs on
+    the worker's thread. Pages it opens count towards the recycle threshold.
+    """
+
+    def __init__(self, size=POOL_SIZE, headless=True):
+        self.size = max(1, size)
+        self.headless = headless
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self.leases = 0
+        self.lease_wait_total = 0.0
+        self.lease_timeouts = 0
+
+    def start(self, wait=False):
+        """Launch the workers (idempotent). Browsers start in the background."""
+        with self._lock:
+            if self._started:
+                return
+            print(f"🌐 Starting browser pool ({self.size} workers)...")
+            for i in range(self.size):
+                worker = BrowserWorker(i + 1, headless=self.headless)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._started = True
+        if wait:
+            for worker in self._workers:
+                worker.ready.wait()
+
+    def run(self, fn, *args, lease_timeout=LEASE_TIMEOUT, **kwargs):
+        """Lease a warm context, run fn(context, *args, **kwargs) on it and return the result"""
+        self.start()
+        wait_start = time.time()
+        try:
+            worker = self._idle.get(timeout=lease_timeout)
+        except queue.Empty:
+            self.lease_timeouts += 1
+            raise TimeoutError(f"No browser available after {lease_timeout}s")
+        waited = time.time() - wait_start
+        with self._lock:
+            self.leases += 1
+            self.lease_wait_total += waited
+        try:
+            return worker.submit(fn, *args, **kwargs).result()
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._started = False
+            self._idle = queue.Queue()
+        for worker in workers:
+            worker.stop()
+
+    def stats(self):
+        workers = list(self._workers)
+        return {
+            'size': self.size,
+            'started': self._started,
+            'idle': self._idle.qsize(),
+            'busy': len(workers) - self._idle.qsize() if self._started else 0,
+            'leases': self.leases,
+            'avg_lease_wait_ms': round(self.lease_wait_total / self.leases * 1000, 1) if self.leases else 0.0,
+            'lease_timeouts': self.lease_timeouts,
+            'max_pages_per_browser': MAX_PAGES_PER_BROWSER,
+            'max_rss_mb': MAX_BROWSER_RSS_MB if psutil is not None else None,
+            'workers': [w.stats() for w in workers]
+        }
+
+
+# Shared pool used by the Flask app
+BROWSER_POOL = BrowserPool()
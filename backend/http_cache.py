@@ -0,0 +1,319 @@
+"""
+HTTP Cache - Disk-backed cache for the scraper's page downloads
+Stores response bodies with their ETag / Last-Modified validators and
+revalidates stale entries with conditional requests (304 = reuse the body).
+Honours Cache-Control (no-store, no-cache, max-age), Expires and Age, and
+keeps the cache under a size budget by evicting the least recently used pages.
+Entries are keyed by URL; for responses that Vary on request headers the
+request's values are stored with the entry, and the entry is only served or
+revalidated for a request that sends the same values (MediaWiki's
+"Vary: Accept-Encoding,Cookie,Authorization" matches any request without
+cookies or credentials). Accept-Encoding is ignored - requests decodes the body.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# -------- CONFIG --------
+SCRIPT_DIR = Path(__file__).resolve().parent
+HTTP_CACHE_DIR = SCRIPT_DIR / "agent_state" / "http_cache"
+HTTP_CACHE_MAX_MB = int(os.environ.get("NEXUS_HTTP_CACHE_MAX_MB", "256"))
+HEURISTIC_MAX_SECONDS = 24 * 3600  # Cap for Last-Modified based freshness
+# Response headers kept with an entry (served back, and needed to recompute freshness after a 304)
+STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "expires", "date")
+
+
+def _parse_cache_control(value):
+    directives = {}
+    for part in (value or "").split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip()] = arg.strip().strip('"')
+    return directives
+
+
+def _vary_fields(headers):
+    """Request headers the response depends on (lowercase, sorted), beyond Accept-Encoding"""
+    fields = {field.strip().lower() for field in (headers.get("Vary") or "").split(",")}
+    return sorted(fields - {"", "accept-encoding"})
+
+
+def _vary_values(fields, request_headers):
+    """The request's value for each varied header (None = not sent)"""
+    return {field: request_headers.get(field) for field in fields}
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except Exception:
+        return None
+
+
+def _freshness_lifetime(headers, now):
+    """Seconds the response may be served without revalidation (RFC 9111 rules, simplified)"""
+    directives = _parse_cache_control(headers.get("Cache-Control"))
+    if "no-cache" in directives:
+        return 0
+    if "max-age" in directives:
+        try:
+            return max(0, int(directives["max-age"]))
+        except ValueError:
+            return 0
+    expires = _http_date(headers.get("Expires", ""))
+    if expires is not None:
+        date = _http_date(headers.get("Date", "")) or now
+        return max(0, expires - date)
+    last_modified = _http_date(headers.get("Last-Modified", ""))
+    if last_modified is not None:
+        # Heuristic: 10% of the document's age, like browsers do
+        date = _http_date(headers.get("Date", "")) or now
+        return min(HEURISTIC_MAX_SECONDS, max(0, (date - last_modified) * 0.1))
+    return 0
+
+
+def _age(headers, now):
+    """Seconds the response had already spent in caches upstream (Age, or time since Date)"""
+    try:
+        age = max(0, int(headers.get("Age", 0)))
+    except ValueError:
+        age = 0
+    date = _http_date(headers.get("Date", ""))
+    if date is not None:
+        age = max(age, now - date)
+    return age
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response served from the cache"""
+
+    def __init__(self, url, content, headers, cache_status):
+        self.url = url
+        self.status_code = 200
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.cache_status = cache_status  # "hit" or "revalidated"
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        return None
+
+
+class HTTPCache:
+    """
+    GET-only cache keyed by URL
+
+    Usage:
+        response = HTTP_CACHE.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        soup = BeautifulSoup(response.content, 'html.parser')
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / "index.json"
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    # ---- index / storage ----
+    def _load_index(self):
+        if not self.index_path.exists():
+            return {}
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                index = json.load(f)
+        except Exception as e:
+            print(f"⚠️  HTTP cache index unreadable, starting fresh: {e}")
+            return {}
+        return {key: meta for key, meta in index.items() if self._body_path(key).exists()}
+
+    def _save_index_locked(self):
+        tmp_path = self.index_path.with_name(f"index.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"⚠️  Could not save HTTP cache index: {e}")
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key):
+        return self.directory / f"{key}.body"
+
+    def _read_body(self, key):
+        try:
+            return self._body_path(key).read_bytes()
+        except OSError:
+            return None
+
+    def _store(self, key, url, response, request_headers, now):
+        directives = _parse_cache_control(response.headers.get("Cache-Control"))
+        vary = _vary_fields(response.headers)
+        if "no-store" in directives or "*" in vary:
+            self.uncacheable += 1
+            return
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        lifetime = _freshness_lifetime(response.headers, now) - _age(response.headers, now)
+        if lifetime <= 0 and not etag and not last_modified:
+            # Could never be reused without a full download
+            self.uncacheable += 1
+            return
+        body = response.content
+        body_path = self._body_path(key)
+        tmp_path = body_path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, body_path)
+        except OSError as e:
+            print(f"⚠️  Could not store {url} in HTTP cache: {e}")
+            return
+        with self._lock:
+            self._index[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fresh_until": now + lifetime,
+                "size": len(body),
+                "last_access": now,
+                "vary": _vary_values(vary, request_headers),
+                "headers": {k: v for k, v in response.headers.items() if k.lower() in STORED_HEADERS}
+            }
+            self._evict_locked()
+            self._save_index_locked()
+
+    def _refresh(self, key, response, now):
+        """Apply a 304's headers to the stored entry"""
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return
+            merged = CaseInsensitiveDict(meta["headers"])
+            for name in ("Cache-Control", "Expires", "Date", "ETag", "Last-Modified"):
+                if name in response.headers:
+                    merged[name] = response.headers[name]
+            meta["fresh_until"] = now + _freshness_lifetime(merged, now) - _age(response.headers, now)
+            meta["etag"] = response.headers.get("ETag", meta["etag"])
+            meta["last_modified"] = response.headers.get("Last-Modified", meta["last_modified"])
+            meta["headers"] = {k: v for k, v in merged.items() if k.lower() in STORED_HEADERS}
+            meta["last_access"] = now
+            self._save_index_locked()
+
+    def _evict_locked(self):
+        total = sum(meta["size"] for meta in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, meta in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                self._body_path(key).unlink()
+            except OSError:
+                pass
+            total -= meta["size"]
+            del self._index[key]
+            self.evictions += 1
+
+    # ---- public API ----
+    def get(self, url, headers=None, timeout=10):
+        key = self._key(url)
+        now = time.time()
+        with self._lock:
+            meta = dict(self._index[key]) if key in self._index else None
+
+        # What the session will actually send (its default headers and cookies included)
+        sent_headers = self.session.prepare_request(requests.Request("GET", url, headers=headers)).headers
+        if meta is not None and meta.get("vary") and _vary_values(meta["vary"], sent_headers) != meta["vary"]:
+            meta = None  # Stored for a different variant - fetch and replace it
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            if now < meta["fresh_until"]:
+                body = self._read_body(key)
+                if body is not None:
+                    with self._lock:
+                        if key in self._index:
+                            self._index[key]["last_access"] = now
+                        self.hits += 1
+                    return CachedResponse(url, body, meta["headers"], "hit")
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self.session.get(url, headers=request_headers, timeout=timeout)
+
+        if response.status_code == 304 and meta is not None:
+            body = self._read_body(key)
+            if body is not None:
+                self._refresh(key, response, now)
+                with self._lock:
+                    self.revalidated += 1
+                return CachedResponse(url, body, meta["headers"], "revalidated")
+            # Body vanished from disk - fetch it again unconditionally
+            response = self.session.get(url, headers=headers or {}, timeout=timeout)
+
+        with self._lock:
+            self.misses += 1
+        if response.status_code == 200:
+            self._store(key, url, response, sent_headers, now)
+        response.cache_status = "miss"
+        return response
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    self._body_path(key).unlink()
+                except OSError:
+                    pass
+            self._index = {}
+            self._save_index_locked()
+
+    def stats(self):
+        with self._lock:
+            size = sum(meta["size"] for meta in self._index.values())
+            entries = len(self._index)
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            'entries': entries,
+            'size_mb': round(size / (1024 * 1024), 2),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'uncacheable': self.uncacheable,
+            'evictions': self.evictions,
+            'reuse_rate': round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0
+        }
+
+
+# Shared cache used by web_scraper.py
+HTTP_CACHE = HTTPCache()
@@ -0,0 +1,319 @@
+"""
+Knowledge Index - Local full-text index over everything we have scraped
+Scraped pages (title, description, headings, paragraphs, search snippet,
+Wikipedia tables, product fields) and stored search results are indexed in
+SQLite FTS5 as they come in, so /ask can answer questions about data we
+already fetched without searching the web again.
+
+A lookup only counts as an answer when enough pages are relevant (they
+contain most of the question's content words and every number in it) and
+fresh enough for the question (the caller passes the maximum age).
+
+The database is created on first use; on SQLite builds without FTS5 the
+index turns itself off and every lookup misses. Connections come from a
+small pool shared by the request threads (Flask starts a thread per
+request, so one connection per thread would never be closed).
+
+Usage:
+    from knowledge_index import KNOWLEDGE_INDEX
+    KNOWLEDGE_INDEX.add_pages(batch_items)                       # web_scraper
+    KNOWLEDGE_INDEX.add_search_results(results, question)        # save_results_append
+    results = KNOWLEDGE_INDEX.lookup(question, max_age=86400)    # [] = not answerable locally
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from ttl_cache import question_terms
+
+# -------- CONFIG --------
+STATE_DIR = Path(__file__).resolve().parent / "agent_state"
+KNOWLEDGE_DB = Path(os.environ.get("NEXUS_KNOWLEDGE_DB", str(STATE_DIR / "knowledge.db")))
+KNOWLEDGE_ENABLED = os.environ.get("NEXUS_KNOWLEDGE_INDEX", "1") == "1"
+# Share of the question's content words a page must contain to count as relevant
+MIN_COVERAGE = float(os.environ.get("NEXUS_KNOWLEDGE_MIN_COVERAGE", "0.8"))
+MIN_HITS = int(os.environ.get("NEXUS_KNOWLEDGE_MIN_HITS", "2"))  # Relevant pages needed to answer
+CANDIDATES = 20  # Best-ranked pages checked for coverage
+MAX_RESULTS = 5
+BODY_CHARS = 20000  # Text indexed per page
+SNIPPET_TOKENS = 48
+BUSY_TIMEOUT_MS = 5000
+POOL_SIZE = 4  # Idle connections kept open
+
+# Years, quantities, model numbers - a page must contain every one of them
+_NUMBER_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT,
+    source TEXT NOT NULL,
+    question TEXT,
+    is_wikipedia INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pages_indexed ON pages(indexed_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(title, body, tokenize = 'porter unicode61');
+"""
+
+
+def _table_text(table):
+    """One Wikipedia table as text lines ("Column: value; Column: value")"""
+    lines = [table.get("table_title", "")]
+    for row in table.get("data", []):
+        lines.append("; ".join(f"{key}: {value}" for key, value in row.items() if value))
+    return "\n".join(lines)
+
+
+def page_text(page):
+    """Searchable body of a scraped page (structured_data from web_scraper)"""
+    parts = [page.get("meta_description", ""), page.get("search_snippet", "")]
+    for level in ("h1", "h2", "h3"):
+        parts.extend(page.get("headings", {}).get(level, []))
+    parts.extend(page.get("paragraphs", []))
+    for key, value in (page.get("product_info") or {}).items():
+        parts.append(f"{key}: {value}")
+    if page.get("price"):
+        parts.append(f"Price: {page['price']}")
+    if page.get("rating"):
+        parts.append(f"Rating: {page['rating']}")
+    for table in page.get("wikipedia_tables", []):
+        parts.append(_table_text(table))
+    return "\n".join(str(part) for part in parts if part)[:BODY_CHARS]
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '') + '"'
+
+
+class KnowledgeIndex:
+    """SQLite FTS5 index; writes go through one background thread"""
+
+    def __init__(self, path=KNOWLEDGE_DB, enabled=KNOWLEDGE_ENABLED):
+        self.path = Path(path)
+        self.enabled = enabled
+        self._pool = queue.LifoQueue(maxsize=POOL_SIZE)
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._opened = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="knowledge-index")
+        # Counters
+        self.pages_indexed = 0
+        self.results_indexed = 0
+        self.index_errors = 0
+        self.lookups = 0
+        self.answered = 0
+
+    def _available(self):
+        """Enabled and set up (the database is created on first use)"""
+        if self.enabled and not self._opened:
+            with self._open_lock:
+                if not self._opened:
+                    self._open()
+        return self.enabled
+
+    def _open(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn, conn:
+                conn.executescript(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            # e.g. "no such module: fts5", "file is not a database"
+            self.enabled = False
+            print(f"⚠️  Knowledge index disabled: {e}")
+        self._opened = True
+
+    @contextmanager
+    def _connect(self):
+        """A pooled connection for the body of a with-block"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            except sqlite3.Error:
+                conn.close()
+                raise
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    # ---- indexing (background) ----
+    def add_pages(self, pages):
+        """Queue scraped pages for indexing (returns immediately)"""
+        if pages and self._available():
+            self._writer.submit(self._index, "scrape", [
+                (page.get("url", ""), page.get("title", "") or page.get("search_title", ""), page_text(page),
+                 'wikipedia.org' in page.get("url", "").lower(), None)
+                for page in pages if not page.get("error")
+            ])
+
+    def add_search_results(self, results, question=None):
+        """Queue search results (title + snippet) for indexing (returns immediately)"""
+        if results and self._available():
+            self._writer.submit(self._index, "search", [
+                (r.get("link", ""), r.get("title", ""), r.get("snippet", ""), bool(r.get("is_wikipedia")), question)
+                for r in results
+            ])
+
+    def flush(self, timeout=10):
+        """Wait until every queued document is indexed"""
+        try:
+            self._writer.submit(lambda: None).result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    def _index(self, source, docs):
+        now = time.time()
+        indexed = 0
+        try:
+            with self._connect() as conn, conn:
+                for url, title, body, is_wikipedia, question in docs:
+                    if not url or not (title or body):
+                        continue
+                    row = conn.execute("SELECT id, source FROM pages WHERE url = ?", (url,)).fetchone()
+                    if row and row["source"] == "scrape" and source == "search":
+                        continue  # Keep the full page over a search snippet
+                    if row:
+                        page_id = row["id"]
+                        conn.execute("DELETE FROM pages_fts WHERE rowid = ?", (page_id,))
+                        conn.execute(
+                            "UPDATE pages SET title = ?, source = ?, question = ?, is_wikipedia = ?, indexed_at = ? "
+                            "WHERE id = ?", (title, source, question, int(is_wikipedia), now, page_id))
+                    else:
+                        page_id = conn.execute(
+                            "INSERT INTO pages (url, title, source, question, is_wikipedia, indexed_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (url, title, source, question, int(is_wikipedia), now)).lastrowid
+                    conn.execute("INSERT INTO pages_fts (rowid, title, body) VALUES (?, ?, ?)",
+                                 (page_id, title, body))
+                    indexed += 1
+        except sqlite3.Error as e:
+            with self._lock:
+                self.index_errors += 1
+            print(f"⚠️  Knowledge index write failed: {e}")
+            return
+        with self._lock:
+            if source == "scrape":
+                self.pages_indexed += indexed
+            else:
+                self.results_indexed += indexed
+
+    # ---- lookup ----
+    def lookup(self, question, max_age, min_coverage=MIN_COVERAGE, min_hits=MIN_HITS):
+        """
+        Pages indexed within max_age seconds that answer the question, as
+        search-result records for extract_answer_from_results; [] unless at
+        least min_hits pages contain min_coverage of the question's words
+        and all of its numbers
+        """
+        if max_age <= 0 or not self._available():
+            return []
+        terms = question_terms(question)
+        numbers = list(dict.fromkeys(_NUMBER_PATTERN.findall(question)))
+        if not terms:
+            return []
+        with self._lock:
+            self.lookups += 1
+
+        try:
+            with self._connect() as conn:
+                candidates = conn.execute(
+                    "SELECT pages.id, pages.url, pages.title, pages.is_wikipedia, pages.indexed_at, "
+                    f"snippet(pages_fts, -1, '', '', '…', {SNIPPET_TOKENS}) AS snippet "
+                    "FROM pages_fts JOIN pages ON pages.id = pages_fts.rowid "
+                    "WHERE pages_fts MATCH ? AND pages.indexed_at >= ? "
+                    "ORDER BY bm25(pages_fts, 5.0, 1.0) LIMIT ?",
+                    (" OR ".join(map(_fts_phrase, terms + numbers)), time.time() - max_age, CANDIDATES)).fetchall()
+                if len(candidates) < min_hits:
+                    return []
+
+                # Coverage: how many of the question's words each candidate contains (stemmed, like the match)
+                ids = [row["id"] for row in candidates]
+                placeholders = ",".join("?" * len(ids))
+                matched = {page_id: 0 for page_id in ids}
+                for term in terms:
+                    for page_id in self._matching(conn, term, ids, placeholders):
+                        matched[page_id] += 1
+                for number in numbers:
+                    has_number = self._matching(conn, number, ids, placeholders)
+                    matched = {page_id: count for page_id, count in matched.items() if page_id in has_number}
+        except sqlite3.Error as e:
+            print(f"⚠️  Knowledge index lookup failed: {e}")
+            return []
+
+        hits = []
+        for row in candidates:
+            if row["id"] not in matched:
+                continue
+            coverage = matched[row["id"]] / len(terms)
+            if coverage >= min_coverage:
+                hits.append({
+                    "title": row["title"] or row["url"],
+                    "link": row["url"],
+                    "snippet": row["snippet"],
+                    "is_wikipedia": bool(row["is_wikipedia"]),
+                    "is_recent": False,
+                    "is_old": False,
+                    "has_exact_date": False,
+                    "indexed_at": row["indexed_at"],
+                    "coverage": round(coverage, 2)
+                })
+        if len(hits) < min_hits:
+            return []
+        with self._lock:
+            self.answered += 1
+        return hits[:MAX_RESULTS]
+
+    @staticmethod
+    def _matching(conn, term, ids, placeholders):
+        """Which of the candidate pages contain a term"""
+        return {page_id for (page_id,) in conn.execute(
+            f"SELECT rowid FROM pages_fts WHERE pages_fts MATCH ? AND rowid IN ({placeholders})",
+            [_fts_phrase(term)] + ids)}
+
+    def stats(self):
+        pages = 0
+        if self.enabled and self._opened:
+            try:
+                with self._connect() as conn:
+                    pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            except sqlite3.Error as e:
+                pages = None
+                print(f"⚠️  Knowledge index stats failed: {e}")
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'path': str(self.path),
+                'pages': pages,
+                'pages_indexed': self.pages_indexed,
+                'results_indexed': self.results_indexed,
+                'index_errors': self.index_errors,
+                'lookups': self.lookups,
+                'answered': self.answered,
+                'min_coverage': MIN_COVERAGE,
+                'min_hits': MIN_HITS
+            }
+
+
+# Shared index used by web_scraper.py, agent_step3.py and app.py
+KNOWLEDGE_INDEX = KnowledgeIndex()
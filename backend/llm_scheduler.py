@@ -0,0 +1,149 @@
+"""
+LLM Scheduler - Admission control for Ollama generations
+Caps the generations in flight to the number Ollama runs in parallel
+(OLLAMA_NUM_PARALLEL); everything else waits in a bounded FIFO queue.
+Every generation is an /ask answer (warm-ups bypass the scheduler), so
+there is nothing to rank them by.
+
+When the queue is full, or a request has waited longer than Mistral would
+be useful, it is shed with LLMOverloaded right away - callers fall back to
+the web search instead of piling up behind Ollama's own queue and timing
+out after 30 s.
+
+Usage:
+    from llm_scheduler import LLM_SCHEDULER, LLMOverloaded
+    try:
+        with LLM_SCHEDULER.slot():
+            ...generate...
+    except LLMOverloaded:
+        ...fast fallback...
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# -------- CONFIG --------
+# Generations sent to Ollama at once - match Ollama's parallel slots
+LLM_SLOTS = int(os.environ.get("NEXUS_LLM_SLOTS", os.environ.get("OLLAMA_NUM_PARALLEL", "1")))
+LLM_QUEUE_SIZE = int(os.environ.get("NEXUS_LLM_QUEUE_SIZE", "8"))  # Waiting generations before shedding
+LLM_MAX_WAIT = float(os.environ.get("NEXUS_LLM_MAX_WAIT", "8"))  # Seconds a request may wait for a slot
+CANCEL_POLL_SECONDS = 0.1  # How often a queued request checks its cancel event
+
+WAIT_SAMPLES = 200  # Recent queue waits kept for the percentiles
+
+
+class LLMOverloaded(Exception):
+    """No generation slot - queue full or waited too long"""
+
+
+class LLMScheduler:
+    """Slot limiter with a bounded FIFO queue"""
+
+    def __init__(self, slots=LLM_SLOTS, queue_size=LLM_QUEUE_SIZE, max_wait=LLM_MAX_WAIT):
+        self.slots = max(1, slots)
+        self.queue_size = max(0, queue_size)
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queue = deque()  # Waiting tickets, oldest first
+        self.in_flight = 0
+        # Metrics
+        self.admitted = 0
+        self.admitted_immediately = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.cancelled = 0
+        self.peak_queue_depth = 0
+        self.peak_in_flight = 0
+        self._waits_ms = deque(maxlen=WAIT_SAMPLES)
+
+    def acquire(self, max_wait=None, cancel=None):
+        """
+        Wait for a generation slot
+        Returns True once admitted (call release() when done), False if cancel
+        was set while queued; raises LLMOverloaded when the request is shed.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._cond:
+            if self.in_flight < self.slots and not self._queue:
+                self._admit_locked(0.0)
+                self.admitted_immediately += 1
+                return True
+
+            if len(self._queue) >= self.queue_size:
+                self.shed_queue_full += 1
+                raise LLMOverloaded(f"LLM queue full ({len(self._queue)} waiting)")
+
+            entry = object()
+            self._queue.append(entry)
+            self.peak_queue_depth = max(self.peak_queue_depth, len(self._queue))
+            start = time.perf_counter()
+            deadline = start + max_wait
+            while True:
+                if self._queue[0] is entry and self.in_flight < self.slots:
+                    self._queue.popleft()
+                    self._admit_locked((time.perf_counter() - start) * 1000)
+                    self._cond.notify_all()  # The next waiter may fit too
+                    return True
+                if cancel is not None and cancel.is_set():
+                    self._remove_locked(entry)
+                    self.cancelled += 1
+                    return False
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._remove_locked(entry)
+                    self.shed_timeout += 1
+                    raise LLMOverloaded(f"No LLM slot within {max_wait:g}s")
+                self._cond.wait(min(remaining, CANCEL_POLL_SECONDS) if cancel is not None else remaining)
+
+    def release(self):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, max_wait=None, cancel=None):
+        """Hold a slot for the body of a with-block; yields False if cancelled while queued"""
+        admitted = self.acquire(max_wait, cancel)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release()
+
+    def _admit_locked(self, waited_ms):
+        self.in_flight += 1
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self._waits_ms.append(waited_ms)
+
+    def _remove_locked(self, entry):
+        if entry in self._queue:
+            self._queue.remove(entry)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits_ms)
+            return {
+                'slots': self.slots,
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._queue),
+                'queue_size': self.queue_size,
+                'max_wait_seconds': self.max_wait,
+                'admitted': self.admitted,
+                'admitted_immediately': self.admitted_immediately,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_timeout': self.shed_timeout,
+                'cancelled': self.cancelled,
+                'peak_queue_depth': self.peak_queue_depth,
+                'peak_in_flight': self.peak_in_flight,
+                'queue_wait_ms_p50': round(waits[len(waits) // 2], 1) if waits else None,
+                'queue_wait_ms_p95': round(waits[int(len(waits) * 0.95)], 1) if waits else None
+            }
+
+
+# Shared scheduler used by ollama_client.py
+LLM_SCHEDULER = LLMScheduler()
@@ -0,0 +1,392 @@
+"""
+Ollama Client - Shared keep-alive connection to the local Ollama server
+One pooled requests.Session for every generation, plus a background health
+monitor that caches liveness (/api/tags) and which models are loaded
+(/api/ps), so answering a question never waits on a separate health check.
+
+Every generation first takes a slot from the LLM scheduler (llm_scheduler.py),
+which caps how many run at once and sheds the excess with LLMOverloaded.
+Warm-ups don't: they generate nothing, and a question arriving during a
+cold load waits on that same load inside Ollama either way.
+
+Model lifecycle: every request carries keep_alive so Ollama keeps the model
+in memory between questions; warm_up() loads it ahead of the first question,
+and with keep-warm on the monitor reloads it when it drops out (Ollama
+restart, another model evicted it) and refreshes keep_alive before it expires.
+
+Usage:
+    from ollama_client import OLLAMA
+    OLLAMA.start_warm_up()            # preload the model without blocking
+    OLLAMA.start_monitor()            # long-running processes (Flask app)
+    if OLLAMA.is_alive():
+        data = OLLAMA.generate(prompt, options={...}, timeout=30)
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_scheduler import LLM_SCHEDULER
+
+# -------- CONFIG --------
+OLLAMA_HOST = os.environ.get("NEXUS_OLLAMA_HOST", "http://127.0.0.1:11434").rstrip("/")
+MODEL = os.environ.get("NEXUS_OLLAMA_MODEL", "mistral")
+OLLAMA_POOL_SIZE = int(os.environ.get("NEXUS_OLLAMA_POOL_SIZE", "8"))
+HEALTH_INTERVAL = float(os.environ.get("NEXUS_OLLAMA_HEALTH_INTERVAL", "10"))  # Seconds between checks while up
+HEALTH_RETRY_INTERVAL = float(os.environ.get("NEXUS_OLLAMA_HEALTH_RETRY", "3"))  # ... while down
+HEALTH_TIMEOUT = 2
+# A successful generation this recent counts as "alive" even if a health
+# check timed out (Ollama busy generating answers /api/tags slowly)
+HEALTH_GRACE = 30
+# How long Ollama keeps the model loaded after a request ("30m", "2h", seconds, "-1" = until Ollama stops)
+KEEP_ALIVE = os.environ.get("NEXUS_OLLAMA_KEEP_ALIVE", "30m")
+KEEP_WARM = os.environ.get("NEXUS_OLLAMA_KEEP_WARM", "1") == "1"  # Monitor reloads / refreshes the model
+KEEP_WARM_MARGIN = 120  # Refresh keep_alive when the model would unload within this many seconds
+WARMUP_TIMEOUT = int(os.environ.get("NEXUS_OLLAMA_WARMUP_TIMEOUT", "120"))  # Cold load of a 7B model
+
+
+def _keep_alive_value(value):
+    """Plain numbers are seconds and must be sent as JSON numbers; durations ("30m") as strings"""
+    value = str(value).strip()
+    return int(value) if re.fullmatch(r"-?\d+", value) else value
+
+
+def _parse_expires_at(value):
+    """Ollama's /api/ps expires_at (RFC 3339, nanoseconds) -> epoch seconds"""
+    if not value:
+        return None
+    match = re.match(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})?$", value)
+    if not match:
+        return None
+    stamp, fraction, zone = match.groups()
+    zone = "+00:00" if zone in (None, "Z") else zone
+    try:
+        expires_at = datetime.fromisoformat(f"{stamp}.{(fraction or '0')[:6].ljust(6, '0')}{zone}").timestamp()
+    except ValueError:
+        return None
+    return expires_at if expires_at > 0 else None  # Zero time = no expiry scheduled
+
+
+class OllamaClient:
+    """Pooled Ollama HTTP client with cached health state"""
+
+    def __init__(self, host=OLLAMA_HOST, model=MODEL, pool_size=OLLAMA_POOL_SIZE,
+                 keep_alive=KEEP_ALIVE, keep_warm=KEEP_WARM, scheduler=LLM_SCHEDULER):
+        self.host = host
+        self.model = model
+        self.keep_alive = _keep_alive_value(keep_alive)
+        self.keep_warm = keep_warm
+        self.scheduler = scheduler
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._monitor = None
+        self._stop = threading.Event()
+        # Cached health
+        self.alive = None  # None = never checked
+        self.models = []
+        self.loaded_models = []
+        self.model_expires_at = None  # When Ollama will unload self.model (per /api/ps)
+        self.checked_at = 0.0
+        self.check_latency_ms = None
+        self.last_error = None
+        self.last_success = 0.0
+        # Counters
+        self.generations = 0
+        self.failures = 0
+        self.aborted = 0
+        self.health_checks = 0
+        # Warm-up
+        self.warming = False
+        self.warmups = 0
+        self.warmup_failures = 0
+        self.last_warmup_ms = None
+        self.last_warmup_at = 0.0
+
+    # ---- health ----
+    def check_health(self):
+        """Query /api/tags and /api/ps now and update the cached state"""
+        start = time.perf_counter()
+        try:
+            tags = self.session.get(f"{self.host}/api/tags", timeout=HEALTH_TIMEOUT)
+            tags.raise_for_status()
+            models = [m.get("name", "") for m in tags.json().get("models", [])]
+            loaded = []
+            expires_at = None
+            try:
+                ps = self.session.get(f"{self.host}/api/ps", timeout=HEALTH_TIMEOUT)
+                if ps.status_code == 200:
+                    for m in ps.json().get("models", []):
+                        loaded.append(m.get("name", ""))
+                        if self._is_our_model(loaded[-1]):
+                            expires_at = _parse_expires_at(m.get("expires_at"))
+            except Exception:
+                pass  # Older Ollama without /api/ps
+            with self._lock:
+                self.alive = True
+                self.models = models
+                self.loaded_models = loaded
+                self.model_expires_at = expires_at
+                self.last_error = None
+        except Exception as e:
+            with self._lock:
+                # Busy, not dead: a generation just succeeded
+                self.alive = time.time() - self.last_success < HEALTH_GRACE
+                self.last_error = str(e)
+        with self._lock:
+            self.health_checks += 1
+            self.checked_at = time.time()
+            self.check_latency_ms = round((time.perf_counter() - start) * 1000, 1)
+            return self.alive
+
+    def is_alive(self):
+        """
+        Cached liveness - no network call while the monitor keeps it fresh;
+        without a monitor (CLI, scripts) the state is refreshed when stale
+        """
+        with self._lock:
+            alive = self.alive
+            age = time.time() - self.checked_at
+        monitored = self._monitor is not None and self._monitor.is_alive()
+        if alive is None or (not monitored and age > HEALTH_INTERVAL):
+            return self.check_health()
+        return alive
+
+    def _is_our_model(self, name, model=None):
+        model = model or self.model
+        return name == model or name.split(":")[0] == model
+
+    def is_model_loaded(self, model=None):
+        """Whether the model is resident in memory (per the last /api/ps)"""
+        with self._lock:
+            return any(self._is_our_model(name, model) for name in self.loaded_models)
+
+    def residency(self):
+        """Model-resident state for /health"""
+        with self._lock:
+            loaded = any(self._is_our_model(name) for name in self.loaded_models)
+            expires_in = None
+            if loaded and self.model_expires_at:
+                expires_in = max(0, round(self.model_expires_at - time.time()))
+            return {
+                'alive': self.alive,
+                'model': self.model,
+                'model_loaded': loaded,
+                'unloads_in_seconds': expires_in,
+                'keep_alive': self.keep_alive,
+                'warming': self.warming
+            }
+
+    # ---- model lifecycle ----
+    def warm_up(self, timeout=WARMUP_TIMEOUT):
+        """
+        Load the model (or refresh its keep_alive) with an empty prompt
+        Blocks until Ollama has it in memory; returns True on success.
+        Takes no scheduler slot - holding one through a cold load (up to
+        timeout) would shed every question that arrives meanwhile.
+        """
+        start = time.perf_counter()
+        payload = {"model": self.model, "prompt": "", "stream": False, "keep_alive": self.keep_alive}
+        try:
+            resp = self.session.post(f"{self.host}/api/generate", json=payload, timeout=timeout)
+            resp.raise_for_status()
+        except Exception as e:
+            with self._lock:
+                self.warmup_failures += 1
+                self.last_error = str(e)
+            print(f"⚠️  Could not warm up {self.model}: {e}")
+            return False
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        with self._lock:
+            self.warmups += 1
+            self.last_warmup_ms = elapsed_ms
+            self.last_warmup_at = time.time()
+            self.last_success = time.time()
+            self.alive = True
+            if not any(self._is_our_model(name) for name in self.loaded_models):
+                self.loaded_models.append(self.model)
+            self.model_expires_at = None  # Unknown until the next /api/ps
+        return True
+
+    def start_warm_up(self):
+        """Warm up in a background thread (no-op while one is running); returns immediately"""
+        with self._lock:
+            if self.warming:
+                return
+            self.warming = True
+
+        def run():
+            try:
+                was_loaded = self.is_model_loaded()
+                if self.warm_up() and not was_loaded:
+                    print(f"🔥 {self.model} loaded and kept warm (keep_alive={self.keep_alive}, "
+                          f"{self.last_warmup_ms / 1000:.1f}s)")
+            finally:
+                with self._lock:
+                    self.warming = False
+
+        threading.Thread(target=run, name="ollama-warmup", daemon=True).start()
+
+    def _needs_warm_up(self):
+        """Model dropped out of memory, or keep_alive is about to run out"""
+        with self._lock:
+            if not self.alive or self.warming:
+                return False
+            if not any(self._is_our_model(name) for name in self.loaded_models):
+                return self.model in self.models or f"{self.model}:latest" in self.models
+            return self.model_expires_at is not None and self.model_expires_at - time.time() < KEEP_WARM_MARGIN
+
+    def _monitor_loop(self):
+        while not self._stop.is_set():
+            alive = self.check_health()
+            if alive and self.keep_warm and self._needs_warm_up():
+                self.start_warm_up()
+            self._stop.wait(HEALTH_INTERVAL if alive else HEALTH_RETRY_INTERVAL)
+
+    def start_monitor(self):
+        """Start the background health monitor (idempotent)"""
+        with self._lock:
+            if self._monitor is not None and self._monitor.is_alive():
+                return
+            self._stop.clear()
+            self._monitor = threading.Thread(target=self._monitor_loop, name="ollama-health", daemon=True)
+            self._monitor.start()
+
+    def stop_monitor(self):
+        self._stop.set()
+
+    # ---- generation ----
+    def generate(self, prompt, options=None, timeout=30, model=None, **fields):
+        """
+        Non-streaming /api/generate on a pooled keep-alive connection
+        Returns the response JSON; raises requests exceptions like requests.post,
+        or LLMOverloaded when the scheduler sheds the request.
+        """
+        payload = {"model": model or self.model, "prompt": prompt, "stream": False, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        payload.update(fields)
+        with self.scheduler.slot():
+            return self._post_generate(payload, timeout)
+
+    def _post_generate(self, payload, timeout):
+        try:
+            resp = self.session.post(f"{self.host}/api/generate", json=payload, timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except requests.exceptions.ConnectionError as e:
+            with self._lock:
+                self.failures += 1
+                self.alive = False  # Don't wait for the monitor to notice
+                self.last_error = str(e)
+            raise
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        with self._lock:
+            self.generations += 1
+            self.last_success = time.time()
+            self.alive = True
+        return data
+
+    def generate_stream(self, prompt, options=None, timeout=30, model=None, cancel=None, **fields):
+        """
+        Streaming /api/generate: yields Ollama's chunks ({"response": token, "done": ...})
+        as they arrive. timeout bounds the whole generation, not just each read.
+        Closing the generator early closes the connection, which stops Ollama generating.
+        The scheduler slot is held until the generator finishes or is closed; if
+        cancel is set while waiting for one, nothing is yielded.
+        """
+        payload = {"model": model or self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        payload.update(fields)
+        with self.scheduler.slot(cancel=cancel) as admitted:
+            if admitted:
+                yield from self._stream_generate(payload, timeout)
+
+    def _stream_generate(self, payload, timeout):
+        deadline = time.time() + timeout
+        try:
+            resp = self.session.post(f"{self.host}/api/generate", json=payload, stream=True, timeout=timeout)
+            resp.raise_for_status()
+        except requests.exceptions.ConnectionError as e:
+            with self._lock:
+                self.failures += 1
+                self.alive = False
+                self.last_error = str(e)
+            raise
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+
+        finished = False
+        try:
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    finished = True
+                    break
+                if time.time() > deadline:
+                    raise requests.exceptions.Timeout(f"Generation exceeded {timeout}s")
+        except GeneratorExit:
+            # Caller stopped reading (e.g. the answer deferred to the web)
+            with self._lock:
+                self.aborted += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            resp.close()
+            if finished:
+                with self._lock:
+                    self.generations += 1
+                    self.last_success = time.time()
+                    self.alive = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'host': self.host,
+                'model': self.model,
+                'alive': self.alive,
+                'models': list(self.models),
+                'loaded_models': list(self.loaded_models),
+                'keep_alive': self.keep_alive,
+                'keep_warm': self.keep_warm,
+                'model_unloads_in_seconds': (max(0, round(self.model_expires_at - time.time()))
+                                             if self.model_expires_at else None),
+                'checked_seconds_ago': round(time.time() - self.checked_at, 1) if self.checked_at else None,
+                'check_latency_ms': self.check_latency_ms,
+                'last_error': self.last_error,
+                'monitor_running': self._monitor is not None and self._monitor.is_alive(),
+                'health_checks': self.health_checks,
+                'generations': self.generations,
+                'failures': self.failures,
+                'aborted': self.aborted,
+                'warmups': self.warmups,
+                'warmup_failures': self.warmup_failures,
+                'last_warmup_ms': self.last_warmup_ms
+            }
+
+
+# Shared client used by agent_step3.py, app.py and test_mistral_speed.py
+OLLAMA = OllamaClient()
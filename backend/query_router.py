@@ -0,0 +1,230 @@
+"""
+Query Router - Pick the answering pipeline before Mistral is tried
+Fast lexical rules plus word statistics learned from past outcomes send
+each question to one of:
+  - "web"   straight to the web search (no Mistral generation at all)
+  - "race"  Mistral and the web search side by side (see app.race_mistral_and_web)
+  - "llm"   Mistral first, web search only if it defers
+
+Every decision is appended, with its outcome, to agent_state/router_log.jsonl
+so the rules can be tuned; the log is replayed on start to rebuild the
+statistics.
+
+Learned routes can be unlearned: a small share of the questions a learned
+rule would keep from Mistral go to Mistral first anyway ("explore:<word>"),
+so the word keeps getting verdicts, and each word's counts are halved once
+they pass MAX_TERM_SAMPLES, so recent verdicts outweigh old ones.
+
+Usage:
+    from query_router import QUERY_ROUTER
+    decision = QUERY_ROUTER.route(question)      # {'route': 'web', 'rule': 'live', ...}
+    ...
+    QUERY_ROUTER.record(question, decision, method='web', mistral=None)
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from agent_step3 import STATE_DIR, detect_query_signals, is_likely_web_bound
+from ttl_cache import question_terms
+
+# -------- CONFIG --------
+ROUTER_ENABLED = os.environ.get("NEXUS_QUERY_ROUTER", "1") == "1"  # 0: every question goes to Mistral first
+ROUTER_LOG_FILE = Path(os.environ.get("NEXUS_ROUTER_LOG", str(STATE_DIR / "router_log.jsonl")))
+ROUTER_REPLAY_LINES = int(os.environ.get("NEXUS_ROUTER_REPLAY_LINES", "10000"))  # Log lines replayed on start
+# Learned routing: a word needs this many Mistral verdicts before it counts
+MIN_TERM_SAMPLES = int(os.environ.get("NEXUS_ROUTER_MIN_SAMPLES", "5"))
+LEARNED_WEB_RATE = float(os.environ.get("NEXUS_ROUTER_WEB_RATE", "0.85"))  # Defer rate -> skip Mistral
+LEARNED_RACE_RATE = float(os.environ.get("NEXUS_ROUTER_RACE_RATE", "0.6"))  # Defer rate -> race
+# Share of learned web/race decisions sent to Mistral first anyway, to keep verdicts coming
+EXPLORE_RATE = float(os.environ.get("NEXUS_ROUTER_EXPLORE_RATE", "0.05"))
+MAX_TERM_SAMPLES = int(os.environ.get("NEXUS_ROUTER_MAX_SAMPLES", "50"))  # Past this, a word's counts are halved
+
+# Ordered (name, route, pattern or detect_query_signals key) - the first matching rule wins
+ROUTING_RULES = [
+    # Live data Mistral cannot know
+    ("live", "web", re.compile(
+        r"\b(today|today's|tonight|tomorrow|yesterday|right now|weather|temperature|forecast|"
+        r"news|headlines|live score|stock price|share price|exchange rate)\b")),
+    # After Mistral's training data (2023)
+    ("recent_year", "web", "recent_year"),
+    # "10 oct", "october 10", "10/10/2025"
+    ("specific_date", "web", "has_exact_date"),
+    # "2019 to 2023" - Wikipedia tables, see _is_range_search
+    ("year_range", "web", "year_range"),
+    # Shopping: prices and specs change faster than the model
+    ("product", "web", re.compile(
+        r"\b(price|prices|cost|costs|buy|cheapest|deals?|discount|lakh|crore|rs\.?|inr|usd)\b"
+        r"|[₹$€£]\s*\d|\bunder\s+\d")),
+    # Long lists are better served by Wikipedia than a 400-token answer
+    ("list", "web", re.compile(r"\b(list of|top \d+|all (?:the )?(?:movies|films|songs|countries|players))\b")),
+]
+
+
+class QueryRouter:
+    """Rule + statistics router with a JSONL decision log"""
+
+    def __init__(self, log_path=ROUTER_LOG_FILE, enabled=ROUTER_ENABLED, explore_rate=EXPLORE_RATE):
+        self.log_path = Path(log_path) if log_path else None
+        self.enabled = enabled
+        self.explore_rate = explore_rate
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        # word -> [mistral deferred, mistral answered]
+        self.term_stats = {}
+        self.routes = Counter()
+        self.rules = Counter()
+        self.outcomes = Counter()  # "route:method"
+        self.verdicts = Counter()  # "route:answered" / "route:deferred"
+        self.log_errors = 0
+        if self.log_path:
+            self._replay()
+
+    # ---- decisions ----
+    def route(self, question: str):
+        """
+        Decide how to answer a question; cheap enough to run on every request
+        Returns {'route', 'rule', 'defer_rate', 'started'}.
+        """
+        q = question.lower()
+        route, rule, defer_rate = "llm", "default" if self.enabled else "disabled", None
+
+        if self.enabled:
+            signals = detect_query_signals(q)
+            for name, rule_route, test in ROUTING_RULES:
+                if signals[test] if isinstance(test, str) else test.search(q):
+                    route, rule = rule_route, name
+                    break
+
+        if route == "llm" and self.enabled and is_likely_web_bound(q):
+            route, rule = "race", "maybe_current"
+
+        if route == "llm" and self.enabled:
+            defer_rate, term = self.learned_defer_rate(question)
+            if defer_rate is not None and defer_rate >= LEARNED_RACE_RATE:
+                if self._random.random() < self.explore_rate:
+                    rule = f"explore:{term}"  # Mistral first, so the word gets a fresh verdict
+                elif defer_rate >= LEARNED_WEB_RATE:
+                    route, rule = "web", f"learned:{term}"
+                else:
+                    route, rule = "race", f"learned:{term}"
+
+        with self._lock:
+            self.routes[route] += 1
+            self.rules[rule.split(":")[0]] += 1
+        print(f"🧭 Route: {route} ({rule})")
+        return {"route": route, "rule": rule, "defer_rate": defer_rate, "started": time.perf_counter()}
+
+    def learned_defer_rate(self, question: str):
+        """
+        Highest smoothed Mistral defer rate among the question's words that
+        have enough history; returns (rate, word) or (None, None)
+        """
+        best_rate, best_term = None, None
+        with self._lock:
+            for term in question_terms(question):
+                counts = self.term_stats.get(term)
+                if not counts or counts[0] + counts[1] < MIN_TERM_SAMPLES:
+                    continue
+                rate = (counts[0] + 1) / (counts[0] + counts[1] + 2)
+                if best_rate is None or rate > best_rate:
+                    best_rate, best_term = rate, term
+        return best_rate, best_term
+
+    # ---- outcomes ----
+    def record(self, question: str, decision: dict, method: str, mistral=None):
+        """
+        Log a decision with its outcome
+        method: the /ask method that answered (mistral_7b / knowledge / web / none / error)
+        mistral: Mistral's verdict when it ran to one - "answered" / "deferred",
+                 None when it was skipped or cancelled (only verdicts are learned)
+        """
+        entry = {
+            "ts": round(time.time(), 3),
+            "question": question,
+            "route": decision["route"],
+            "rule": decision["rule"],
+            "defer_rate": None if decision["defer_rate"] is None else round(decision["defer_rate"], 3),
+            "method": method,
+            "mistral": mistral,
+            "latency_ms": round((time.perf_counter() - decision["started"]) * 1000, 1)
+        }
+        with self._lock:
+            self.outcomes[f"{entry['route']}:{method}"] += 1
+            if mistral:
+                self.verdicts[f"{entry['route']}:{mistral}"] += 1
+            self._learn_locked(entry)
+            self._append_locked(entry)
+
+    def _learn_locked(self, entry):
+        verdict = entry.get("mistral")
+        if verdict not in ("answered", "deferred"):
+            return
+        slot = 0 if verdict == "deferred" else 1
+        for term in question_terms(entry["question"]):
+            counts = self.term_stats.setdefault(term, [0, 0])
+            counts[slot] += 1
+            if counts[0] + counts[1] > MAX_TERM_SAMPLES:
+                counts[0], counts[1] = counts[0] / 2, counts[1] / 2
+
+    def _append_locked(self, entry):
+        if not self.log_path:
+            return
+        try:
+            with self.log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except Exception as e:
+            self.log_errors += 1
+            print(f"⚠️  Could not write router log: {e}")
+
+    def _replay(self):
+        """Rebuild the word statistics from the tail of the decision log"""
+        if not self.log_path.exists():
+            return
+        try:
+            with self.log_path.open("r", encoding="utf-8") as f:
+                lines = deque(f, maxlen=ROUTER_REPLAY_LINES)
+        except Exception as e:
+            print(f"⚠️  Could not load router log: {e}")
+            return
+        with self._lock:
+            for line in lines:
+                try:
+                    self._learn_locked(json.loads(line))
+                except Exception:
+                    continue  # Torn last line after a crash
+
+    def stats(self):
+        with self._lock:
+            learned = [
+                (term, counts[0] / (counts[0] + counts[1]), counts[0] + counts[1])
+                for term, counts in self.term_stats.items()
+                if counts[0] + counts[1] >= MIN_TERM_SAMPLES
+            ]
+            learned.sort(key=lambda item: (-item[1], -item[2]))
+            return {
+                'enabled': self.enabled,
+                'explore_rate': self.explore_rate,
+                'log': str(self.log_path) if self.log_path else None,
+                'routes': dict(self.routes),
+                'rules': dict(self.rules),
+                'outcomes': dict(self.outcomes),
+                'mistral_verdicts': dict(self.verdicts),
+                'terms_tracked': len(self.term_stats),
+                'terms_learned': len(learned),
+                'top_deferring_terms': [
+                    {'term': term, 'defer_rate': round(rate, 2), 'samples': round(samples, 1)}
+                    for term, rate, samples in learned[:10]
+                ],
+                'log_errors': self.log_errors
+            }
+
+
+# Shared router used by app.py
+QUERY_ROUTER = QueryRouter()
@@ -0,0 +1,226 @@
+"""
+Result Dedup - Collapse duplicate search results before they are scraped or ranked
+Merging the results of several optimized queries returns the same article
+more than once - as en.m.wikipedia.org and en.wikipedia.org, with utm_*/
+tracking parameters, with and without www or a trailing slash - and the
+same page of one site under different URLs (print views, pagination and
+category paths).
+
+- URL canonicalization: results whose canonical URL matches are one result
+- Near-duplicate snippets: MinHash over word shingles of title + snippet,
+  with LSH banding so only likely pairs are compared; pairs on the same
+  host whose estimated Jaccard similarity passes the threshold (and that
+  mention the same numbers, so "Galaxy S23" and "Galaxy S24" pages stay
+  apart) are one result. Different hosts are never merged - the same
+  product listed by two stores is two prices.
+
+The first result of each group is kept as it was (the merged lists are
+ranked; its link is not rewritten), with the other copies' flags and
+snippet merged in. The canonical URL is only a comparison key.
+
+Usage:
+    from result_dedup import RESULT_DEDUP, url_key
+    results = RESULT_DEDUP.dedupe(results)
+    url_key("https://en.m.wikipedia.org/wiki/Foo?utm_source=x")  # en.wikipedia.org/wiki/Foo
+"""
+
+import os
+import random
+import re
+import threading
+import zlib
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+# -------- CONFIG --------
+DEDUP_ENABLED = os.environ.get("NEXUS_RESULT_DEDUP", "1") == "1"
+NEAR_DUP_SIMILARITY = float(os.environ.get("NEXUS_DEDUP_SIMILARITY", "0.8"))  # Estimated Jaccard to collapse
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 6  # Shorter texts are only deduplicated by URL
+NUM_HASHES = 64
+LSH_BANDS = 16  # NUM_HASHES / LSH_BANDS rows per band
+
+# Query parameters that only track the click
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "spm", "srsltid", "_ga", "_gl", "si", "feature"
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "trk_")
+
+# Mobile hosts that serve the same page as the desktop site
+_MOBILE_HOST = re.compile(r"^(?:(?P<lang>[a-z\-]+)\.)?(?:m|mobile)\.(?P<site>"
+                          r"wikipedia\.org|wiktionary\.org|wikimedia\.org|wikivoyage\.org|"
+                          r"twitter\.com|x\.com|facebook\.com|youtube\.com|imdb\.com|reddit\.com)$")
+_ESCAPED_SLASH = re.compile(r"%2f", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_NUMBER_PATTERN = re.compile(r"\d+")
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x5EED)  # Fixed seed: the same text always gets the same signature
+_HASH_PARAMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_HASHES)]
+
+
+def canonical_url(url):
+    """
+    Comparison form of a URL: lowercase host, no default port, no fragment,
+    no tracking parameters, sorted query, desktop host for known mobile
+    sites, no trailing slash, one spelling of percent-escapes
+    Not for fetching - it can change what the server sees (e.g. %2F -> /).
+    """
+    if not url:
+        return url
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip(".")
+    mobile = _MOBILE_HOST.match(host)
+    if mobile:
+        host = f"{mobile.group('lang')}.{mobile.group('site')}" if mobile.group("lang") else mobile.group("site")
+    if parts.port and str(parts.port) != _DEFAULT_PORTS[parts.scheme]:
+        host = f"{host}:{parts.port}"
+
+    # One spelling of percent-escapes (an escaped "/" stays escaped); Wikipedia titles use "_" for spaces
+    path = "%2F".join(quote(unquote(piece), safe="/:@!$&'()*+,;=-._~")
+                      for piece in _ESCAPED_SLASH.split(parts.path))
+    if host.endswith("wikipedia.org"):
+        path = path.replace("%20", "_")
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((parts.scheme, host, path or "/", query, ""))
+
+
+def url_key(url):
+    """Dedup key: the canonical URL without scheme and www."""
+    canonical = canonical_url(url or "")
+    key = canonical.split("://", 1)[-1]
+    return key[4:] if key.startswith("www.") else key
+
+
+def _host(key):
+    """Host part of a url_key"""
+    return key.split("/", 1)[0]
+
+
+def _shingles(text):
+    words = _WORD_PATTERN.findall(text.lower())
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(shingles):
+    """MinHash signature of a set of shingle hashes"""
+    return tuple(min((a * h + b) % _MERSENNE for h in shingles) for a, b in _HASH_PARAMS)
+
+
+def _similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_HASHES
+
+
+def _merge_into(kept, duplicate):
+    """Keep the first result, but don't lose what its copies knew"""
+    for flag in ("is_wikipedia", "is_recent", "has_exact_date"):
+        if duplicate.get(flag):
+            kept[flag] = True
+    if len(duplicate.get("snippet", "")) > len(kept.get("snippet", "")):
+        kept["snippet"] = duplicate["snippet"]
+    if kept.get("is_old") and not duplicate.get("is_old", True):
+        kept["is_old"] = False
+
+
+class ResultDeduplicator:
+    """URL + MinHash near-duplicate collapsing for search result lists"""
+
+    def __init__(self, enabled=DEDUP_ENABLED, similarity=NEAR_DUP_SIMILARITY):
+        self.enabled = enabled
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        # Counters
+        self.runs = 0
+        self.results_in = 0
+        self.url_duplicates = 0
+        self.near_duplicates = 0
+
+    def dedupe(self, results):
+        """
+        Results with duplicates collapsed, in their original order
+        Returns new dicts; the input list is left alone.
+        """
+        if not self.enabled or not results:
+            return results
+
+        kept = []
+        by_url = {}  # url_key -> kept result
+        signatures = []  # (signature, numbers, kept result)
+        buckets = {}  # (host, band, band hash) -> indexes into signatures
+        rows = NUM_HASHES // LSH_BANDS
+        url_dups = near_dups = 0
+
+        for result in results:
+            result = dict(result)
+            key = url_key(result.get("link", ""))
+            if key and key in by_url:
+                _merge_into(by_url[key], result)
+                url_dups += 1
+                continue
+
+            text = f"{result.get('title', '')} {result.get('snippet', '')}"
+            shingles = _shingles(text)
+            if len(shingles) >= MIN_SHINGLES:
+                signature = minhash(shingles)
+                numbers = frozenset(_NUMBER_PATTERN.findall(text))
+                host = _host(key)
+                bands = [(host, band, hash(signature[band * rows:(band + 1) * rows])) for band in range(LSH_BANDS)]
+                candidates = {index for band in bands for index in buckets.get(band, ())}
+                original = next((
+                    signatures[index][2] for index in sorted(candidates)
+                    if signatures[index][1] == numbers
+                    and _similarity(signature, signatures[index][0]) >= self.similarity
+                ), None)
+                if original is not None:
+                    _merge_into(original, result)
+                    if key:
+                        by_url[key] = original
+                    near_dups += 1
+                    continue
+                for band in bands:
+                    buckets.setdefault(band, []).append(len(signatures))
+                signatures.append((signature, numbers, result))
+
+            if key:
+                by_url[key] = result
+            kept.append(result)
+
+        with self._lock:
+            self.runs += 1
+            self.results_in += len(results)
+            self.url_duplicates += url_dups
+            self.near_duplicates += near_dups
+        if url_dups or near_dups:
+            print(f"🧹 Dedup: {len(results)} results -> {len(kept)} "
+                  f"({url_dups} same URL, {near_dups} near-duplicate snippets)")
+        return kept
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'similarity': self.similarity,
+                'runs': self.runs,
+                'results_in': self.results_in,
+                'url_duplicates': self.url_duplicates,
+                'near_duplicates': self.near_duplicates
+            }
+
+
+# Shared deduplicator used by agent_step3.py and app.py
+RESULT_DEDUP = ResultDeduplicator()
@@ -0,0 +1,336 @@
+"""
+Result Store - Append-only SQLite store for answers, search results and agent state
+Replaces agent_results.json (rewritten in full on every append),
+agent_state.json and the per-run result_<ts>.json files.
+
+- O(1) appends: one INSERT per record, no reading back the history
+- Safe concurrent writers: WAL journal, one connection per thread, busy timeout
+- Indexed by question, timestamp and source URL
+
+The database is created on first use (importing this module touches no
+files). The legacy agent_state files are imported then, once (tracked in
+the imports table; the files themselves are left alone).
+
+Usage:
+    from result_store import RESULT_STORE
+    RESULT_STORE.append_results(results, question="who won the 2011 world cup")
+    RESULT_STORE.append_answer(question, answer, method="web", sources=[...])
+    RESULT_STORE.results_for_link("https://en.wikipedia.org/wiki/...")
+
+CLI:
+    python result_store.py import   # import legacy agent_state files now
+    python result_store.py stats
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from ttl_cache import normalize_question
+
+# -------- CONFIG --------
+STATE_DIR = Path(__file__).resolve().parent / "agent_state"
+RESULT_DB = Path(os.environ.get("NEXUS_RESULT_DB", str(STATE_DIR / "results.db")))
+AUTO_IMPORT = os.environ.get("NEXUS_RESULT_IMPORT", "1") == "1"  # Import legacy files on first open
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_results (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    run_id TEXT,
+    question TEXT,
+    question_norm TEXT,
+    title TEXT,
+    link TEXT,
+    snippet TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_results_question ON search_results(question_norm);
+CREATE INDEX IF NOT EXISTS idx_search_results_created ON search_results(created_at);
+CREATE INDEX IF NOT EXISTS idx_search_results_link ON search_results(link);
+
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    run_id TEXT,
+    question TEXT NOT NULL,
+    question_norm TEXT NOT NULL,
+    answer TEXT,
+    method TEXT,
+    sources TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_answers_question ON answers(question_norm);
+CREATE INDEX IF NOT EXISTS idx_answers_created ON answers(created_at);
+
+CREATE TABLE IF NOT EXISTS answer_sources (
+    answer_id INTEGER NOT NULL REFERENCES answers(id),
+    link TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answer_sources_link ON answer_sources(link);
+
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    records INTEGER,
+    imported_at REAL NOT NULL
+);
+"""
+
+
+def _source_link(source):
+    """Sources are stored either as links or as {'title', 'link', ...} dicts"""
+    return source.get("link") if isinstance(source, dict) else source
+
+
+class ResultStore:
+    """SQLite (WAL) store shared by every thread and process"""
+
+    def __init__(self, path=RESULT_DB, auto_import=AUTO_IMPORT):
+        self.path = Path(path)
+        self.auto_import = auto_import
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._opened = False
+        self.writes = 0
+        self.write_errors = 0
+
+    def _open(self):
+        """Create the database and run the legacy import (first use only)"""
+        with self._open_lock:
+            if self._opened:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect(opening=True) as conn:
+                conn.executescript(SCHEMA)
+            self._opened = True
+        if self.auto_import:
+            self.import_legacy(self.path.parent)
+
+    def _connect(self, opening=False):
+        """This thread's connection (sqlite3 connections must not be shared across threads)"""
+        if not self._opened and not opening:
+            self._open()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; fine for a result log
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql, rows):
+        """Run one INSERT/UPSERT for every row in a single transaction"""
+        return self._transaction(lambda conn: conn.executemany(sql, rows))
+
+    def _transaction(self, apply):
+        """Run apply(conn) in one transaction; False (and a warning) if it fails"""
+        try:
+            with self._connect() as conn:
+                apply(conn)
+        except sqlite3.Error as e:
+            with self._lock:
+                self.write_errors += 1
+            print(f"⚠️  Could not write results to {self.path.name}: {e}")
+            return False
+        with self._lock:
+            self.writes += 1
+        return True
+
+    # ---- writes ----
+    def append_results(self, items, question=None, run_id=None, created_at=None):
+        """Append search result records ({'title', 'link', 'snippet', ...})"""
+        created_at = created_at or time.time()
+        question_norm = normalize_question(question) if question else None
+        rows = [
+            (created_at, run_id, question, question_norm, item.get("title", ""), item.get("link", ""),
+             item.get("snippet", ""), json.dumps(item, ensure_ascii=False))
+            for item in items
+        ]
+        if not rows:
+            return True
+        return self._write(
+            "INSERT INTO search_results (created_at, run_id, question, question_norm, title, link, snippet, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def append_answer(self, question, answer, method, sources=None, run_id=None, created_at=None):
+        """Append one answered question (its source links are indexed too)"""
+        sources = sources or []
+
+        def insert(conn):
+            cursor = conn.execute(
+                "INSERT INTO answers (created_at, run_id, question, question_norm, answer, method, sources) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (created_at or time.time(), run_id, question, normalize_question(question), answer, method,
+                 json.dumps(sources, ensure_ascii=False)))
+            links = {_source_link(source) for source in sources} - {None, ""}
+            conn.executemany("INSERT INTO answer_sources (answer_id, link) VALUES (?, ?)",
+                             [(cursor.lastrowid, link) for link in sorted(links)])
+
+        return self._transaction(insert)
+
+    def save_state(self, obj, key="agent"):
+        return self._write(
+            "INSERT INTO state (key, value, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            [(key, json.dumps(obj, ensure_ascii=False), time.time())])
+
+    # ---- reads ----
+    def load_state(self, key="agent"):
+        row = self._connect().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else {}
+
+    def results_for_question(self, question, limit=50):
+        """Search results stored for a question (normalized, newest first)"""
+        rows = self._connect().execute(
+            "SELECT data, created_at FROM search_results WHERE question_norm = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT ?",
+            (normalize_question(question), limit)).fetchall()
+        return [dict(json.loads(row["data"]), stored_at=row["created_at"]) for row in rows]
+
+    def results_for_link(self, link, limit=50):
+        """Every stored search result pointing at a source URL (newest first)"""
+        rows = self._connect().execute(
+            "SELECT data, question, created_at FROM search_results WHERE link = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT ?", (link, limit)).fetchall()
+        return [dict(json.loads(row["data"]), question=row["question"], stored_at=row["created_at"])
+                for row in rows]
+
+    def results_since(self, since, limit=500):
+        """Search results stored at or after a timestamp (oldest first)"""
+        rows = self._connect().execute(
+            "SELECT data, question, created_at FROM search_results WHERE created_at >= ? "
+            "ORDER BY created_at, id LIMIT ?", (since, limit)).fetchall()
+        return [dict(json.loads(row["data"]), question=row["question"], stored_at=row["created_at"])
+                for row in rows]
+
+    def answers_for_question(self, question, limit=20):
+        rows = self._connect().execute(
+            "SELECT * FROM answers WHERE question_norm = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (normalize_question(question), limit)).fetchall()
+        return [self._answer_dict(row) for row in rows]
+
+    def recent_answers(self, since=None, limit=50):
+        rows = self._connect().execute(
+            "SELECT * FROM answers WHERE created_at >= ? ORDER BY created_at DESC, id DESC LIMIT ?",
+            (since or 0, limit)).fetchall()
+        return [self._answer_dict(row) for row in rows]
+
+    def answers_citing(self, link, limit=20):
+        """Answers whose sources include a URL"""
+        rows = self._connect().execute(
+            "SELECT DISTINCT answers.* FROM answer_sources JOIN answers ON answers.id = answer_sources.answer_id "
+            "WHERE answer_sources.link = ? ORDER BY answers.created_at DESC, answers.id DESC LIMIT ?",
+            (link, limit)).fetchall()
+        return [self._answer_dict(row) for row in rows]
+
+    @staticmethod
+    def _answer_dict(row):
+        return {
+            "question": row["question"],
+            "answer": row["answer"],
+            "method": row["method"],
+            "sources": json.loads(row["sources"]),
+            "timestamp": row["created_at"],
+            "run_id": row["run_id"]
+        }
+
+    # ---- legacy import ----
+    def import_legacy(self, state_dir=STATE_DIR):
+        """
+        One-time import of agent_results.json, agent_state.json, result_<ts>.json
+        and <run_id>_result.json; files already imported (same size and mtime)
+        are skipped. Returns the number of records imported.
+        """
+        state_dir = Path(state_dir)
+        files = [state_dir / "agent_results.json", state_dir / "agent_state.json"]
+        files += sorted(state_dir.glob("result_*.json")) + sorted(state_dir.glob("*_result.json"))
+        conn = self._connect()
+        imported = 0
+        for path in files:
+            if not path.exists():
+                continue
+            stat = path.stat()
+            done = conn.execute("SELECT size, mtime FROM imports WHERE path = ?", (path.name,)).fetchone()
+            if done and done["size"] == stat.st_size and done["mtime"] == stat.st_mtime:
+                continue
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+                records = self._import_file(path.name, data, stat.st_mtime)
+            except Exception as e:
+                print(f"⚠️  Could not import {path.name}: {e}")
+                continue
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO imports (path, size, mtime, records, imported_at) VALUES (?, ?, ?, ?, ?)",
+                    (path.name, stat.st_size, stat.st_mtime, records, time.time()))
+            imported += records
+        if imported:
+            print(f"📦 Imported {imported} legacy records into {self.path.name}")
+        return imported
+
+    def _import_file(self, name, data, mtime):
+        if name == "agent_results.json":
+            # Plain list of search results, no question recorded
+            items = [item for item in data if isinstance(item, dict)]
+            ok = self.append_results(items, created_at=mtime)
+            records = len(items)
+        elif name == "agent_state.json":
+            ok = self.save_state(data)
+            records = 1
+        elif name.endswith("_result.json"):
+            # <run_id>_result.json: {"task", "query", "results"}
+            run_id = name[:-len("_result.json")]
+            items = [item for item in data.get("results", []) if isinstance(item, dict)]
+            ok = self.append_results(items, question=data.get("task") or data.get("query"), run_id=run_id,
+                                     created_at=mtime)
+            records = len(items)
+        else:
+            # result_<ts>.json: one answered question
+            ok = self.append_answer(data.get("question", ""), data.get("answer", ""), data.get("method"),
+                                    data.get("sources", []), created_at=data.get("timestamp") or mtime)
+            records = 1
+        if not ok:
+            raise RuntimeError("write failed")  # Leave it unmarked so the next start retries
+        return records
+
+    def stats(self):
+        conn = self._connect()
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("search_results", "answers", "imports")}
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'size_bytes': self.path.stat().st_size if self.path.exists() else 0,
+                'search_results': counts["search_results"],
+                'answers': counts["answers"],
+                'imported_files': counts["imports"],
+                'writes': self.writes,
+                'write_errors': self.write_errors
+            }
+
+
+# Shared store used by agent_step3.py
+RESULT_STORE = ResultStore()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "import":
+        print(f"Imported {RESULT_STORE.import_legacy()} records")
+    print(json.dumps(RESULT_STORE.stats(), indent=2))
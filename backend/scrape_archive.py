@@ -0,0 +1,371 @@
+"""
+Scrape Archive - Compressed, retention-managed storage for scraped batches
+Replaces the pretty-printed scrape_batch_<n>_<ts>.json files.
+
+- Write-behind: archive_batch() only queues the batch; a background writer
+  thread does the compression and disk I/O off the request thread
+- Compact segments: each batch is one gzip member appended to
+  scrape_archive/segment_<ts>.jsonl.gz (a valid gzip/JSONL file), and its
+  offset is recorded in index.jsonl so one batch can be read without
+  decompressing the whole segment
+- Retention: whole segments are dropped once not written to for longer
+  than the age limit, or when the archive exceeds its size limit (oldest first)
+- Read API: iter_batches(run_id=..., url=...) streams stored batches
+- The archive directory is created and its index loaded on first use
+  (importing this module touches no files)
+- Legacy import: each scrape_batch_*.json file is archived once (tracked
+  by name, size and mtime in imports.jsonl), so re-running it is safe
+
+Usage:
+    from scrape_archive import SCRAPE_ARCHIVE
+    SCRAPE_ARCHIVE.archive_batch(run_id, batch_number, items, query=query)
+    for batch in SCRAPE_ARCHIVE.iter_batches(url="https://example.com/item"):
+        ...
+
+CLI:
+    python scrape_archive.py import [--delete]   # move legacy scrape_batch_*.json files in
+    python scrape_archive.py stats
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+# -------- CONFIG --------
+STATE_DIR = Path(__file__).resolve().parent / "agent_state"
+ARCHIVE_DIR = Path(os.environ.get("NEXUS_SCRAPE_ARCHIVE_DIR", str(STATE_DIR / "scrape_archive")))
+SEGMENT_MAX_BYTES = int(float(os.environ.get("NEXUS_SCRAPE_SEGMENT_MB", "16")) * 1024 * 1024)
+ARCHIVE_MAX_BYTES = int(float(os.environ.get("NEXUS_SCRAPE_ARCHIVE_MAX_MB", "256")) * 1024 * 1024)
+ARCHIVE_MAX_AGE = float(os.environ.get("NEXUS_SCRAPE_ARCHIVE_MAX_DAYS", "30")) * 86400
+ARCHIVE_QUEUE_SIZE = int(os.environ.get("NEXUS_SCRAPE_ARCHIVE_QUEUE", "64"))  # Batches waiting for the writer
+COMPRESS_LEVEL = 6
+RETENTION_INTERVAL = 300  # Seconds between retention passes while writing
+
+_LEGACY_BATCH_FILE = re.compile(r"scrape_batch_(\d+)_(\d+)\.json$")
+
+
+def _batch_urls(items):
+    return [item.get("url") for item in items if isinstance(item, dict) and item.get("url")]
+
+
+class ScrapeArchive:
+    """Write-behind gzip segment archive with an offset index"""
+
+    def __init__(self, directory=ARCHIVE_DIR, segment_max_bytes=SEGMENT_MAX_BYTES,
+                 max_bytes=ARCHIVE_MAX_BYTES, max_age=ARCHIVE_MAX_AGE, queue_size=ARCHIVE_QUEUE_SIZE):
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.jsonl"
+        self.imports_path = self.directory / "imports.jsonl"
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()  # Guards the in-memory index and counters
+        self._write_lock = threading.Lock()  # One writer of segments and index.jsonl at a time
+        self._open_lock = threading.Lock()
+        self._opened = False
+        self._index = []  # {"segment", "offset", "length", "run_id", "batch_number", "ts", "query", "urls"}
+        self._writer = None
+        self._segment = None  # Active segment path (under _write_lock)
+        self._last_retention = 0.0
+        # Counters
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.segments_removed = 0
+
+    def _ensure_open(self):
+        """Create the directory and load the index on first use"""
+        if self._opened:
+            return
+        with self._open_lock:
+            if not self._opened:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._load_index()
+                self._opened = True
+
+    # ---- writes ----
+    def archive_batch(self, run_id, batch_number, items, query=None):
+        """
+        Queue one scraped batch for the background writer (never blocks)
+        Returns False if the writer is backed up and the batch was dropped.
+        """
+        record = {
+            "run_id": run_id,
+            "batch_number": batch_number,
+            "ts": time.time(),
+            "query": query,
+            "items": items
+        }
+        self._ensure_open()
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            print(f"⚠️  Scrape archive writer backed up - batch {batch_number} of {run_id} not archived")
+            return False
+        with self._lock:
+            self.queued += 1
+        return True
+
+    def flush(self, timeout=10):
+        """Wait until every queued batch is on disk (tests, shutdown)"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.02)
+        return not self._queue.unfinished_tasks
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._writer_loop, name="scrape-archive", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self._write_record(record)
+                if time.time() - self._last_retention > RETENTION_INTERVAL:
+                    self.apply_retention()
+            except Exception as e:
+                with self._lock:
+                    self.write_errors += 1
+                print(f"⚠️  Could not archive scrape batch: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write_record(self, record):
+        raw = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        member = gzip.compress(raw, compresslevel=COMPRESS_LEVEL)
+        with self._write_lock:
+            self._append_member(record, raw, member)
+
+    def _append_member(self, record, raw, member):
+        segment = self._active_segment(len(member))
+        with segment.open("ab") as f:
+            offset = f.tell()
+            f.write(member)
+        entry = {
+            "segment": segment.name,
+            "offset": offset,
+            "length": len(member),
+            "run_id": record["run_id"],
+            "batch_number": record["batch_number"],
+            "ts": record["ts"],
+            "query": record["query"],
+            "urls": _batch_urls(record["items"])
+        }
+        with self.index_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        with self._lock:
+            self._index.append(entry)
+            self.written += 1
+            self.bytes_in += len(raw)
+            self.bytes_out += len(member)
+
+    def _active_segment(self, incoming):
+        """Current segment, rolled over once it would pass the size limit"""
+        if self._segment is None:
+            existing = sorted(self.directory.glob("segment_*.jsonl.gz"))
+            self._segment = existing[-1] if existing else None
+        if (self._segment is None or not self._segment.exists()
+                or self._segment.stat().st_size + incoming > self.segment_max_bytes):
+            self._segment = self.directory / f"segment_{time.time_ns()}.jsonl.gz"
+        return self._segment
+
+    # ---- retention ----
+    def apply_retention(self):
+        """Drop whole segments past the age limit, then the oldest until under the size limit"""
+        self._ensure_open()
+        with self._write_lock:
+            return self._apply_retention()
+
+    def _apply_retention(self):
+        self._last_retention = time.time()
+        segments = sorted(self.directory.glob("segment_*.jsonl.gz"))
+        if not segments:
+            return 0
+        # Age = time since the segment was last written to
+        stats = {path.name: path.stat() for path in segments}
+        sizes = {name: stat.st_size for name, stat in stats.items()}
+        total = sum(sizes.values())
+        cutoff = time.time() - self.max_age
+        removed = []
+        for path in segments:
+            if path == self._segment:
+                continue  # Never the one being written
+            if stats[path.name].st_mtime < cutoff or total > self.max_bytes:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= sizes[path.name]
+                removed.append(path.name)
+        if removed:
+            self._drop_index_entries(set(removed))
+            print(f"🧹 Scrape archive: removed {len(removed)} old segment(s), {total / (1024 * 1024):.1f} MB kept")
+        return len(removed)
+
+    def _drop_index_entries(self, segment_names):
+        with self._lock:
+            self._index = [entry for entry in self._index if entry["segment"] not in segment_names]
+            self.segments_removed += len(segment_names)
+            tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                for entry in self._index:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.index_path)
+
+    def _load_index(self):
+        if not self.index_path.exists():
+            return
+        with self.index_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                if (self.directory / entry["segment"]).exists():
+                    self._index.append(entry)
+
+    # ---- reads ----
+    def iter_batches(self, run_id=None, url=None, since=None):
+        """
+        Stream stored batches (oldest first) filtered by run, page URL and/or
+        time; each batch is {run_id, batch_number, ts, query, items}.
+        Only the matching gzip members are read and decompressed.
+        """
+        self._ensure_open()
+        with self._lock:
+            entries = [
+                entry for entry in self._index
+                if (run_id is None or entry["run_id"] == run_id)
+                and (url is None or url in entry["urls"])
+                and (since is None or entry["ts"] >= since)
+            ]
+        for entry in entries:
+            try:
+                with (self.directory / entry["segment"]).open("rb") as f:
+                    f.seek(entry["offset"])
+                    member = f.read(entry["length"])
+            except FileNotFoundError:
+                continue  # Removed by retention since the index snapshot
+            batch = json.loads(gzip.decompress(member))
+            if url is not None:
+                batch["items"] = [item for item in batch["items"] if item.get("url") == url]
+            yield batch
+
+    def runs(self, limit=20):
+        """Most recent runs: run_id, query, batch count, item count, first/last batch time"""
+        self._ensure_open()
+        summary = {}
+        with self._lock:
+            for entry in self._index:
+                run = summary.setdefault(entry["run_id"], {
+                    "run_id": entry["run_id"], "query": entry["query"], "batches": 0, "items": 0,
+                    "started": entry["ts"], "finished": entry["ts"]
+                })
+                run["batches"] += 1
+                run["items"] += len(entry["urls"])
+                run["started"] = min(run["started"], entry["ts"])
+                run["finished"] = max(run["finished"], entry["ts"])
+        return sorted(summary.values(), key=lambda run: run["finished"], reverse=True)[:limit]
+
+    # ---- legacy import ----
+    def import_legacy(self, state_dir=STATE_DIR, delete=False):
+        """
+        Archive the old scrape_batch_<n>_<ts>.json files (one run per file, as
+        the old files don't record which batches belong together); files
+        already imported with the same size and mtime are skipped
+        """
+        self._ensure_open()
+        done = self._load_imports()
+        imported = 0
+        for path in sorted(Path(state_dir).glob("scrape_batch_*.json")):
+            match = _LEGACY_BATCH_FILE.search(path.name)
+            if not match:
+                continue
+            stat = path.stat()
+            if done.get(path.name) == (stat.st_size, stat.st_mtime):
+                if delete:
+                    path.unlink()
+                continue
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    items = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Could not import {path.name}: {e}")
+                continue
+            batch_number, ts = int(match.group(1)), int(match.group(2))
+            record = {"run_id": f"legacy-{ts}", "batch_number": batch_number, "ts": float(ts),
+                      "query": None, "items": items}
+            self._write_record(record)
+            with self.imports_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"path": path.name, "size": stat.st_size, "mtime": stat.st_mtime,
+                                    "imported_at": time.time()}) + "\n")
+            imported += 1
+            if delete:
+                path.unlink()
+        return imported
+
+    def _load_imports(self):
+        """Legacy files already archived: name -> (size, mtime)"""
+        done = {}
+        if self.imports_path.exists():
+            with self.imports_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a crash
+                    done[entry["path"]] = (entry["size"], entry["mtime"])
+        return done
+
+    def stats(self):
+        self._ensure_open()
+        segments = list(self.directory.glob("segment_*.jsonl.gz"))
+        with self._lock:
+            return {
+                'directory': str(self.directory),
+                'segments': len(segments),
+                'size_bytes': sum(path.stat().st_size for path in segments if path.exists()),
+                'batches': len(self._index),
+                'runs': len({entry["run_id"] for entry in self._index}),
+                'queue_depth': self._queue.qsize(),
+                'queued': self.queued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'write_errors': self.write_errors,
+                'compression_ratio': round(self.bytes_in / self.bytes_out, 1) if self.bytes_out else None,
+                'segments_removed': self.segments_removed,
+                'max_bytes': self.max_bytes,
+                'max_age_days': round(self.max_age / 86400, 1)
+            }
+
+
+# Shared archive used by web_scraper.py and app.py
+SCRAPE_ARCHIVE = ScrapeArchive()
+atexit.register(SCRAPE_ARCHIVE.flush)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "import":
+        count = SCRAPE_ARCHIVE.import_legacy(delete="--delete" in sys.argv)
+        SCRAPE_ARCHIVE.apply_retention()
+        print(f"Archived {count} legacy batch files")
+    print(json.dumps(SCRAPE_ARCHIVE.stats(), indent=2))
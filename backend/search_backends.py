@@ -0,0 +1,345 @@
+"""
+Search Backends - Pluggable ways of running a web search
+HTTPSearchBackend fetches DuckDuckGo's HTML endpoint, Bing and the Wikipedia
+API with plain HTTP and parses them (no browser page at all);
+BrowserSearchBackend drives a pooled Chrome page (run_search_with_chrome).
+AutoSearchBackend tries the cheap HTTP path first and escalates to the
+browser when it returns too few results or the engines start blocking it.
+
+Usage:
+    from search_backends import SEARCH_BACKEND
+    results = SEARCH_BACKEND.search("who won the 2011 cricket world cup", limit=5)
+"""
+
+import html
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agent_step3 import (run_engine_search, run_search_with_chrome, _annotate_duckduckgo_result,
+                         _annotate_bing_result, _maybe_base64_decode, _record_phase)
+from browser_pool import BROWSER_POOL
+from web_scraper import make_soup, USER_AGENT
+
+# -------- CONFIG --------
+SEARCH_BACKEND_MODE = os.environ.get("NEXUS_SEARCH_BACKEND", "auto")  # auto | http | browser
+HTTP_SEARCH_TIMEOUT = float(os.environ.get("NEXUS_HTTP_SEARCH_TIMEOUT", "8"))
+# Escalate to the browser when the HTTP backend finds fewer results than this
+MIN_HTTP_RESULTS = int(os.environ.get("NEXUS_MIN_HTTP_RESULTS", "2"))
+# After the HTTP backend gets blocked (captcha/anomaly page), go straight to the browser for a while
+HTTP_BLOCK_COOLDOWN = int(os.environ.get("NEXUS_HTTP_BLOCK_COOLDOWN", "300"))
+
+DEFAULT_BASE_URLS = {
+    "duckduckgo": os.environ.get("NEXUS_DUCKDUCKGO_HTML_URL", "https://html.duckduckgo.com/html/"),
+    "bing": os.environ.get("NEXUS_BING_URL", "https://www.bing.com/search"),
+    "wikipedia": os.environ.get("NEXUS_WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+}
+
+# Markers of a bot-check page instead of results
+_BLOCK_MARKERS = ("anomaly-modal", "captcha", "unusual traffic")
+
+
+class SearchBlocked(Exception):
+    """An engine answered with a bot check instead of results"""
+
+
+class SearchBackend:
+    """
+    Interface for search backends
+    search() returns annotated result records
+    ({title, link, snippet, is_wikipedia, is_recent, is_old, ...}).
+    """
+
+    name = "base"
+
+    def search(self, query, limit=10, timings=None, cancel=None):
+        """cancel: optional threading.Event - when set, stop early with what has been found"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {'name': self.name}
+
+
+class BrowserSearchBackend(SearchBackend):
+    """
+    Full Chrome search on warm browsers from the pool
+    One lease runs the whole engine chain on one context (sequential tabs):
+    a page can only be driven by its browser's thread, and hedging engines
+    across leases would take more browsers than the pool has for a single
+    search. Hedging happens on the HTTP backend, which needs no lease.
+    """
+
+    name = "browser"
+
+    def __init__(self, pool=BROWSER_POOL):
+        self.pool = pool
+        self.searches = 0
+
+    def search(self, query, limit=10, timings=None, cancel=None):
+        self.searches += 1
+        # cancel is checked before the lease is used and between engines
+        if cancel is not None and cancel.is_set():
+            return []
+        return self.pool.run(run_search_with_chrome, query, limit=limit, timings=timings, cancel=cancel)
+
+    def stats(self):
+        return {'name': self.name, 'searches': self.searches}
+
+
+class HTTPSearchBackend(SearchBackend):
+    """
+    Browserless search: plain GETs + HTML/JSON parsing
+    base_urls overrides the engine endpoints (e.g. a local stub server in tests).
+    """
+
+    name = "http"
+
+    def __init__(self, base_urls=None, timeout=HTTP_SEARCH_TIMEOUT):
+        self.base_urls = dict(DEFAULT_BASE_URLS, **(base_urls or {}))
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'en-US,en;q=0.9'
+        })
+        self.searches = 0
+        self.blocked = 0
+
+    def search(self, query, limit=10, timings=None, cancel=None):
+        timings = {} if timings is None else timings
+        search_start = time.perf_counter()
+        self.searches += 1
+        # Hedged by default (SEARCH_HEDGED): plain requests are safe to run in parallel
+        results = run_engine_search(query, limit, {
+            "duckduckgo": lambda q, n: self._search_duckduckgo(q, n, timings),
+            "bing": lambda q, n: self._search_bing(q, n, timings),
+            "wikipedia": lambda q: self._search_wikipedia(q, timings)
+        }, backend=self.name, cancel=cancel)
+        _record_phase(timings, "http_search_total", search_start)
+        return results
+
+    def _get(self, engine, params, timings):
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self.base_urls[engine], params=params, timeout=self.timeout)
+        finally:
+            _record_phase(timings, f"{engine}_http", start)
+        # DuckDuckGo answers bots with 202 + an anomaly page
+        if response.status_code in (202, 403, 429):
+            self.blocked += 1
+            raise SearchBlocked(f"{engine} returned HTTP {response.status_code}")
+        response.raise_for_status()
+        return response
+
+    def _check_block(self, engine, text):
+        lower = text.lower()
+        if any(marker in lower for marker in _BLOCK_MARKERS):
+            self.blocked += 1
+            raise SearchBlocked(f"{engine} served a bot check")
+
+    def _search_duckduckgo(self, query, limit, timings):
+        print(f"   Searching DuckDuckGo (HTTP): {query}")
+        response = self._get("duckduckgo", {"q": query}, timings)
+        soup = make_soup(response.content)
+
+        results = []
+        items = [item for item in soup.select(".result") if "result--ad" not in (item.get("class") or [])]
+        if not items:
+            self._check_block("duckduckgo", response.text)
+
+        for item in items:
+            if len(results) >= limit:
+                break
+            title_elem = item.select_one("a.result__a, .result__title a, h2 a")
+            if not title_elem:
+                continue
+            title = title_elem.get_text().strip()
+            link = _unwrap_duckduckgo_link(title_elem.get("href", ""))
+            snippet_elem = item.select_one(".result__snippet")
+            snippet = snippet_elem.get_text().strip() if snippet_elem else ""
+
+            # Use title as snippet if no snippet found
+            if not snippet and title:
+                snippet = title
+
+            if title and link and link.startswith("http") and "duckduckgo.com" not in link:
+                results.append(_annotate_duckduckgo_result(title, link, snippet))
+                print(f"   ✓ Result {len(results)}: {title[:60]}...")
+
+        return results
+
+    def _search_bing(self, query, limit, timings):
+        print(f"   Searching Bing (HTTP): {query}")
+        response = self._get("bing", {"q": query}, timings)
+        soup = make_soup(response.content)
+
+        results = []
+        items = soup.select("li.b_algo")
+        if not items:
+            self._check_block("bing", response.text)
+
+        for item in items[:limit]:
+            title_elem = item.select_one("h2 a") or item.select_one("h2")
+            title = title_elem.get_text().strip() if title_elem else ""
+            link_elem = item.select_one("a[href]")
+            link = _unwrap_bing_link(link_elem.get("href", "") if link_elem else "")
+            snippet_elem = item.select_one("p, .b_caption p")
+            snippet = snippet_elem.get_text().strip() if snippet_elem else title
+
+            if title and link and link.startswith("http"):
+                if "bing.com" not in link and "microsoft.com" not in link:
+                    results.append(_annotate_bing_result(title, link, snippet))
+                    print(f"   ✓ Bing result {len(results)}: {title[:60]}...")
+
+        return results
+
+    def _search_wikipedia(self, query, timings):
+        # Same query cleanup as the browser path
+        wiki_query = query.replace("today", "").replace("current", "").replace("latest", "").replace("wikipedia", "").strip()
+        print(f"   Searching Wikipedia API: {wiki_query}")
+        response = self._get("wikipedia", {
+            "action": "query",
+            "list": "search",
+            "srsearch": wiki_query,
+            "srlimit": 3,
+            "format": "json"
+        }, timings)
+
+        results = []
+        for hit in response.json().get("query", {}).get("search", [])[:3]:
+            snippet = _strip_tags(hit.get("snippet", ""))
+            text = f"{hit.get('title', '')}\n{snippet}".strip()
+            page_title = hit.get("title", "").replace(" ", "_")
+            if text and len(text) > 50:
+                results.append({
+                    "title": f"Wikipedia: {query}",
+                    "link": f"https://en.wikipedia.org/wiki/{urllib.parse.quote(page_title)}",
+                    "snippet": text[:500],
+                    "is_wikipedia": True,
+                    "is_recent": False,
+                    "is_old": False
+                })
+                print(f"   ✓ Wikipedia result added: {text[:60]}...")
+
+        return results
+
+    def stats(self):
+        return {'name': self.name, 'searches': self.searches, 'blocked': self.blocked}
+
+
+class AutoSearchBackend(SearchBackend):
+    """
+    Cheap path first, browser only when needed
+    Per query: use HTTP unless it was blocked recently; escalate to the browser
+    when HTTP fails or finds fewer than min_results results.
+    """
+
+    name = "auto"
+
+    def __init__(self, http_backend, browser_backend, min_results=MIN_HTTP_RESULTS,
+                 block_cooldown=HTTP_BLOCK_COOLDOWN):
+        self.http = http_backend
+        self.browser = browser_backend
+        self.min_results = min_results
+        self.block_cooldown = block_cooldown
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.http_served = 0
+        self.escalations = 0
+        self.skipped_http = 0
+
+    def choose(self, query):
+        """Backend to try first for this query"""
+        with self._lock:
+            if time.time() < self._blocked_until:
+                self.skipped_http += 1
+                return self.browser
+        return self.http
+
+    def search(self, query, limit=10, timings=None, cancel=None):
+        timings = {} if timings is None else timings
+        if self.choose(query) is self.http:
+            blocked_before = self.http.blocked
+            try:
+                results = self.http.search(query, limit=limit, timings=timings, cancel=cancel)
+            except Exception as e:
+                print(f"   ⚠️  HTTP search failed: {e}")
+                results = []
+
+            if self.http.blocked > blocked_before:
+                print(f"   🚧 HTTP search blocked - using the browser for the next {self.block_cooldown}s")
+                with self._lock:
+                    self._blocked_until = time.time() + self.block_cooldown
+
+            if len(results) >= self.min_results:
+                with self._lock:
+                    self.http_served += 1
+                return results
+
+            if cancel is not None and cancel.is_set():
+                return results
+
+            print(f"   ⬆️  HTTP search found {len(results)} result(s) - escalating to the browser...")
+            with self._lock:
+                self.escalations += 1
+
+        return self.browser.search(query, limit=limit, timings=timings, cancel=cancel)
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'http_served': self.http_served,
+            'escalations': self.escalations,
+            'skipped_http': self.skipped_http,
+            'blocked_until': round(self._blocked_until, 1) if self._blocked_until > time.time() else None,
+            'http': self.http.stats(),
+            'browser': self.browser.stats()
+        }
+
+
+def _unwrap_duckduckgo_link(href):
+    """DuckDuckGo HTML links go through //duckduckgo.com/l/?uddg=<target>"""
+    if href.startswith("//"):
+        href = "https:" + href
+    parsed = urllib.parse.urlparse(href)
+    if "duckduckgo.com" in parsed.netloc and parsed.path.startswith("/l/"):
+        target = urllib.parse.parse_qs(parsed.query).get("uddg")
+        if target:
+            return target[0]
+    return href
+
+
+def _unwrap_bing_link(href):
+    """Bing click-tracking links carry the target base64-encoded in u=a1..."""
+    parsed = urllib.parse.urlparse(href)
+    if "bing.com" in parsed.netloc and parsed.path.startswith("/ck/"):
+        target = urllib.parse.parse_qs(parsed.query).get("u")
+        if target:
+            return _maybe_base64_decode(target[0])
+    return _maybe_base64_decode(href)
+
+
+def _strip_tags(text):
+    """Wikipedia API snippets are HTML fragments (<span class="searchmatch">)"""
+    return html.unescape(re.sub(r"<[^>]+>", "", text)).strip()
+
+
+def make_search_backend(mode=SEARCH_BACKEND_MODE):
+    """Build the backend selected by NEXUS_SEARCH_BACKEND"""
+    if mode == "http":
+        return HTTPSearchBackend()
+    if mode == "browser":
+        return BrowserSearchBackend()
+    return AutoSearchBackend(HTTPSearchBackend(), BrowserSearchBackend())
+
+
+# Shared backend used by app.py
+SEARCH_BACKEND = make_search_backend()
@@ -0,0 +1,123 @@
+"""
+HTTP cache check against a local stub server
+Serves pages with Vary, ETag, max-age, Expires and Age headers and checks
+which requests the cache answers itself, revalidates (304) or downloads
+again. No network needed; the cache lives in a temporary directory.
+
+Run: python test_http_cache.py
+"""
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from http_cache import HTTPCache
+
+ETAG = '"v1"'
+
+
+class StubPageHandler(BaseHTTPRequestHandler):
+    requests_seen = []  # (path, status)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        headers = {"Content-Type": "text/html", "ETag": ETAG}
+        if path == "/wiki/fresh":
+            # MediaWiki-style: fresh for a minute, varies on cookies and credentials
+            headers.update({"Cache-Control": "max-age=60", "Vary": "Accept-Encoding,Cookie,Authorization"})
+        elif path == "/wiki/stale":
+            headers.update({"Cache-Control": "max-age=0, must-revalidate", "Vary": "Accept-Encoding,Cookie"})
+        elif path == "/expires":
+            now = time.time()
+            headers.update({"Date": formatdate(now, usegmt=True), "Expires": formatdate(now + 60, usegmt=True)})
+        elif path == "/cdn":
+            headers.update({"Cache-Control": "max-age=60", "Age": "59"})
+        elif path == "/any":
+            headers.update({"Cache-Control": "max-age=60", "Vary": "*"})
+
+        if self.headers.get("If-None-Match") == ETAG:
+            status, body = 304, b""
+        else:
+            status, body = 200, f"<html><body>{path}</body></html>".encode()
+        StubPageHandler.requests_seen.append((path, status))
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    assert condition, label
+
+
+def test_http_cache():
+    print("🧪 HTTP cache check (stub server)\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = HTTPCache(directory=directory)
+        try:
+            # 1. Vary: Cookie - a request without cookies matches the entry stored without them
+            first = cache.get(f"{base}/wiki/fresh")
+            second = cache.get(f"{base}/wiki/fresh")
+            check("Vary: Cookie page stored, then served from the cache",
+                  first.cache_status == "miss" and second.cache_status == "hit"
+                  and second.content == first.content and second.headers.get("content-type") == "text/html")
+
+            cache.get(f"{base}/wiki/stale")
+            response = cache.get(f"{base}/wiki/stale")
+            check("Vary: Cookie page past max-age revalidated with a 304",
+                  response.cache_status == "revalidated"
+                  and StubPageHandler.requests_seen[-1] == ("/wiki/stale", 304)
+                  and b"/wiki/stale" in response.content)
+
+            # 2. A different cookie is a different variant
+            response = cache.get(f"{base}/wiki/fresh", headers={"Cookie": "session=abc"})
+            check("Vary: Cookie entry not served to a request with a cookie",
+                  response.cache_status == "miss" and StubPageHandler.requests_seen[-1] == ("/wiki/fresh", 200))
+
+            # 3. Expires-only freshness survives a 304 (Date and Expires are stored)
+            cache.get(f"{base}/expires")
+            response = cache.get(f"{base}/expires")
+            key = cache._key(f"{base}/expires")
+            check("Expires without max-age: fresh for the Expires - Date window",
+                  response.cache_status == "hit" and cache._index[key]["fresh_until"] > time.time() + 50
+                  and {"Date", "Expires"} <= set(cache._index[key]["headers"]))
+
+            # 4. Age counts against max-age
+            cache.get(f"{base}/cdn")
+            key = cache._key(f"{base}/cdn")
+            check("Age subtracted from max-age (59 of 60 seconds already used)",
+                  cache._index[key]["fresh_until"] < time.time() + 5)
+
+            # 5. Vary: * can never be reused
+            before = cache.uncacheable
+            cache.get(f"{base}/any")
+            check("Vary: * not stored", cache.uncacheable == before + 1
+                  and cache._key(f"{base}/any") not in cache._index)
+        finally:
+            server.shutdown()
+            cache.session.close()
+
+    print("\n✅ All HTTP cache checks passed")
+
+
+if __name__ == "__main__":
+    try:
+        test_http_cache()
+    except AssertionError:
+        print("\n❌ Some HTTP cache checks failed")
+        sys.exit(1)
@@ -0,0 +1,97 @@
+"""
+Differential check: fast HTML parser vs html.parser
+Runs every extractor over a fixture corpus with both parser engines and
+reports any page where the structured output differs, plus parse throughput.
+
+Run: python test_parser_parity.py [--http-cache]
+  --http-cache  also compare every page body stored in agent_state/http_cache
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+from web_scraper import Document, make_soup, run_extractors, PARSER
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "html"
+
+# Pages whose behaviour depends on the URL (Wikipedia tables)
+FIXTURE_URLS = {
+    "wikipedia_list.html": "https://en.wikipedia.org/wiki/List_of_Hindi_films_of_2014",
+    "news_article.html": "https://en.wikipedia.org/wiki/2024_Kerala_monsoon"
+}
+
+
+def load_corpus(include_http_cache=False):
+    corpus = []
+    for path in sorted(FIXTURE_DIR.glob("*.html")):
+        url = FIXTURE_URLS.get(path.name, f"https://example.com/{path.stem}")
+        corpus.append((path.name, url, path.read_bytes()))
+
+    if include_http_cache:
+        from http_cache import HTTP_CACHE
+        for key, meta in HTTP_CACHE._index.items():
+            body = HTTP_CACHE._read_body(key)
+            if body is not None:
+                corpus.append((meta["url"][:60], meta["url"], body))
+
+    return corpus
+
+
+def extract(url, body, parser):
+    start = time.perf_counter()
+    soup = make_soup(body, parser)
+    parse_time = time.perf_counter() - start
+    return run_extractors(Document(url, soup)), parse_time
+
+
+def test_parser_parity(include_http_cache=False):
+    print("🧪 Parser parity check")
+    print(f"Fast parser: {PARSER}\n")
+
+    if PARSER == "html.parser":
+        print("⚠️  lxml is not installed - nothing to compare (pip install lxml)")
+        return
+
+    corpus = load_corpus(include_http_cache)
+    mismatches = 0
+    fast_total = 0.0
+    slow_total = 0.0
+    total_bytes = 0
+
+    for name, url, body in corpus:
+        fast_data, fast_time = extract(url, body, PARSER)
+        slow_data, slow_time = extract(url, body, "html.parser")
+        fast_total += fast_time
+        slow_total += slow_time
+        total_bytes += len(body)
+
+        if fast_data == slow_data:
+            print(f"✅ {name}")
+            continue
+
+        mismatches += 1
+        print(f"❌ {name}")
+        for field in sorted(set(fast_data) | set(slow_data)):
+            if fast_data.get(field) != slow_data.get(field):
+                print(f"   {field}:")
+                print(f"     {PARSER}: {json.dumps(fast_data.get(field), ensure_ascii=False)[:200]}")
+                print(f"     html.parser: {json.dumps(slow_data.get(field), ensure_ascii=False)[:200]}")
+
+    mb = total_bytes / (1024 * 1024)
+    print(f"\n📄 Pages: {len(corpus)} ({mb:.2f} MB)")
+    if fast_total and slow_total:
+        print(f"⏱️  {PARSER}: {fast_total * 1000:.1f} ms | html.parser: {slow_total * 1000:.1f} ms "
+              f"| speedup: {slow_total / fast_total:.1f}x")
+
+    if mismatches:
+        print(f"\n❌ {mismatches} page(s) differ between parsers")
+    assert not mismatches, f"{mismatches} page(s) differ between {PARSER} and html.parser"
+    print("\n✅ Identical output on every page")
+
+
+if __name__ == "__main__":
+    try:
+        test_parser_parity(include_http_cache="--http-cache" in sys.argv)
+    except AssertionError:
+        sys.exit(1)
@@ -0,0 +1,196 @@
+"""
+Search backend check against a local stub search server
+Serves canned DuckDuckGo HTML / Bing / Wikipedia API responses from
+fixtures/search and checks the HTTP backend's parsing, the hedged engine
+chain and the auto backend's escalation to the browser. No network or
+browser needed.
+
+Run: python test_search_backends.py
+"""
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse
+
+import agent_step3
+from ttl_cache import TTLCache
+from search_backends import SearchBackend, HTTPSearchBackend, AutoSearchBackend
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "search"
+
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    # "ok", "blocked" (DuckDuckGo bot check) or "empty" (no results anywhere)
+    mode = "ok"
+    ddg_delay = 0.0  # seconds - simulates a slow DuckDuckGo
+    requests_seen = []
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        StubSearchHandler.requests_seen.append(path)
+        status = 200
+        if path == "/ddg/":
+            time.sleep(self.ddg_delay)
+            if self.mode == "blocked":
+                status, body, ctype = 202, (FIXTURE_DIR / "duckduckgo_blocked.html").read_bytes(), "text/html"
+            elif self.mode == "empty":
+                body, ctype = b"<html><body><div id='links'></div></body></html>", "text/html"
+            else:
+                body, ctype = (FIXTURE_DIR / "duckduckgo.html").read_bytes(), "text/html"
+        elif path == "/bing":
+            if self.mode == "ok":
+                body, ctype = (FIXTURE_DIR / "bing.html").read_bytes(), "text/html"
+            else:
+                body, ctype = b"<html><body><ol id='b_results'></ol></body></html>", "text/html"
+        elif path == "/w/api.php":
+            if self.mode == "ok":
+                body, ctype = (FIXTURE_DIR / "wikipedia.json").read_bytes(), "application/json"
+            else:
+                body, ctype = json.dumps({"query": {"search": []}}).encode(), "application/json"
+        else:
+            status, body, ctype = 404, b"not found", "text/plain"
+
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RecordingBrowserBackend(SearchBackend):
+    """Stands in for the Chrome backend so escalation can be observed"""
+
+    name = "browser"
+
+    def __init__(self):
+        self.queries = []
+
+    def search(self, query, limit=10, timings=None, cancel=None):
+        self.queries.append(query)
+        return [{"title": "From the browser", "link": "https://example.com/browser",
+                 "snippet": "Browser result", "is_wikipedia": False, "is_recent": False, "is_old": False}]
+
+
+def _engines(backend):
+    """Engine functions of an HTTP backend, for driving run_engine_search directly"""
+    return {
+        "duckduckgo": lambda q, n: backend._search_duckduckgo(q, n, {}),
+        "bing": lambda q, n: backend._search_bing(q, n, {}),
+        "wikipedia": lambda q: backend._search_wikipedia(q, {})
+    }
+
+
+def check(label, condition):
+    print(f"{'✅' if condition else '❌'} {label}")
+    assert condition, label
+
+
+def test_search_backends():
+    print("🧪 Search backend check (stub server)\n")
+
+    # Keep the persistent search cache out of the test (module globals restored at the end)
+    saved_globals = {"SEARCH_CACHE": agent_step3.SEARCH_CACHE, "HEDGE_DELAY_MS": agent_step3.HEDGE_DELAY_MS}
+    agent_step3.SEARCH_CACHE = TTLCache(maxsize=64, name="test_search")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    base_urls = {"duckduckgo": f"{base}/ddg/", "bing": f"{base}/bing", "wikipedia": f"{base}/w/api.php"}
+
+    try:
+        # 1. HTTP backend parses every engine
+        http = HTTPSearchBackend(base_urls=base_urls, timeout=5)
+        results = http._search_duckduckgo("cricket world cup 2011", 5, {})
+        links = [r["link"] for r in results]
+        check("DuckDuckGo: ads skipped, redirect links unwrapped",
+              links == ["https://en.wikipedia.org/wiki/2011_Cricket_World_Cup",
+                        "https://www.espncricinfo.com/series/icc-cricket-world-cup-2010-11",
+                        "https://www.icc-cricket.com/news/2011-final"])
+        check("DuckDuckGo: title used when a result has no snippet",
+              results[2]["snippet"] == results[2]["title"])
+        check("DuckDuckGo: records annotated like the browser path",
+              results[0]["is_wikipedia"] and "has_exact_date" in results[0])
+
+        results = http._search_bing("cricket world cup 2011", 5, {})
+        check("Bing: click-tracking link decoded, microsoft.com filtered",
+              [r["link"] for r in results] == ["https://www.bbc.co.uk/sport/cricket",
+                                               "https://www.thehindu.com/sport/cricket/world-cup-2011"])
+
+        results = http._search_wikipedia("2011 cricket world cup", {})
+        check("Wikipedia API: searchmatch markup stripped, article links built",
+              len(results) == 2
+              and "<span" not in results[0]["snippet"]
+              and "& India won" in results[1]["snippet"]
+              and results[0]["link"] == "https://en.wikipedia.org/wiki/2011_Cricket_World_Cup")
+
+        # 2. Hedged vs sequential engine chain
+        agent_step3.HEDGE_DELAY_MS = 200
+        engines = _engines(HTTPSearchBackend(base_urls=base_urls, timeout=5))
+        agent_step3.SEARCH_CACHE.clear()
+        seq_links = [r["link"] for r in agent_step3.run_engine_search(
+            "who won the cricket world cup 2011", 5, engines, backend="http", hedged=False)]
+        agent_step3.SEARCH_CACHE.clear()
+        hedged_links = [r["link"] for r in agent_step3.run_engine_search(
+            "who won the cricket world cup 2011", 5, engines, backend="http", hedged=True)]
+        check("Hedged: same results as the fallback chain when DuckDuckGo is fast",
+              seq_links == hedged_links and len(seq_links) == 3)
+
+        StubSearchHandler.ddg_delay = 3.0
+        agent_step3.SEARCH_CACHE.clear()
+        start = time.perf_counter()
+        results = agent_step3.run_engine_search(
+            "who won the cricket world cup 2011", 3, engines, backend="http", hedged=True)
+        elapsed = time.perf_counter() - start
+        check(f"Hedged: slow DuckDuckGo abandoned once Bing + Wikipedia meet the quota ({elapsed:.2f}s)",
+              elapsed < 2.0 and len(results) >= 3
+              and not any("espncricinfo" in r["link"] for r in results))
+        StubSearchHandler.ddg_delay = 0.0
+        agent_step3.SEARCH_CACHE.clear()
+
+        # 3. Auto backend serves from HTTP when it finds enough
+        browser = RecordingBrowserBackend()
+        auto = AutoSearchBackend(HTTPSearchBackend(base_urls=base_urls, timeout=5), browser,
+                                 min_results=2, block_cooldown=60)
+        results = auto.search("who won the cricket world cup 2011", limit=5)
+        check("Auto: enough HTTP results, browser not used",
+              len(results) >= 2 and not browser.queries and auto.http_served == 1)
+
+        # 4. Too few results -> escalate
+        StubSearchHandler.mode = "empty"
+        results = auto.search("some obscure question nobody indexed", limit=5)
+        check("Auto: no HTTP results, escalated to the browser",
+              browser.queries == ["some obscure question nobody indexed"]
+              and results[0]["link"] == "https://example.com/browser"
+              and auto.escalations == 1)
+
+        # 5. Bot check -> escalate, then skip HTTP during the cooldown
+        StubSearchHandler.mode = "blocked"
+        auto.search("blocked question", limit=5)
+        check("Auto: blocked HTTP search escalated", browser.queries[-1] == "blocked question")
+        seen_before = len(StubSearchHandler.requests_seen)
+        auto.search("next question", limit=5)
+        check("Auto: HTTP skipped while blocked",
+              len(StubSearchHandler.requests_seen) == seen_before
+              and browser.queries[-1] == "next question"
+              and auto.skipped_http == 1)
+    finally:
+        server.shutdown()
+        StubSearchHandler.mode, StubSearchHandler.ddg_delay = "ok", 0.0
+        for name, value in saved_globals.items():
+            setattr(agent_step3, name, value)
+
+    print("\n✅ All search backend checks passed")
+
+
+if __name__ == "__main__":
+    try:
+        test_search_backends()
+    except AssertionError:
+        print("\n❌ Some search backend checks failed")
+        sys.exit(1)
@@ -0,0 +1,187 @@
+"""
+TTL Cache - Small thread-safe LRU cache with per-entry expiry
+Used to skip repeat Mistral generations / browser searches for questions we
+answered recently. Optionally persisted to a JSON file so it survives restarts.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Seconds between writes of a persistent cache (changes in between are batched)
+SAVE_INTERVAL = float(os.environ.get("NEXUS_CACHE_SAVE_INTERVAL", "5"))
+
+# Leading filler that does not change what is being asked
+_FILLER_PREFIX = re.compile(
+    r'^(?:(?:please|hey|hi|ok|okay)\s+)*(?:(?:can|could|would)\s+you\s+)?(?:(?:please|tell\s+me|show\s+me)\s+)*',
+    re.I
+)
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so near-identical phrasings share one cache key"""
+    q = question.lower().strip()
+    q = re.sub(r'[^\w\s]', ' ', q)
+    q = ' '.join(q.split())
+    q = _FILLER_PREFIX.sub('', q)
+    return q.strip()
+
+
+# Words too common to say anything about a question
+_STOPWORDS = frozenset("""
+a an the is are was were be been am do does did of in on at to for from by with about and or
+what who whom whose which when where why how can could would should will shall may might must
+i me my you your he she it its we our they their this that these those there here please tell
+give show explain describe much many some any one than then not no yes
+""".split())
+_WORD_PATTERN = re.compile(r"[a-z][a-z0-9']{2,}")
+
+
+def question_terms(question: str):
+    """Content words of a question (lowercased, stopwords removed, de-duplicated)"""
+    seen = []
+    for word in _WORD_PATTERN.findall(question.lower()):
+        if word not in _STOPWORDS and word not in seen:
+            seen.append(word)
+    return seen
+
+
+class TTLCache:
+    """
+    LRU cache with a size bound and a TTL per entry
+
+    Entries expire at their own deadline (so short-lived "weather today" answers
+    and long-lived factual answers can share one cache); when full, the least
+    recently used entry is evicted.
+
+    With a path, values must be JSON-serializable; the file is loaded on start
+    and rewritten (atomically) in the background at most every save_interval
+    seconds while there are changes, and once more at exit - never on the
+    caller's thread.
+    """
+
+    def __init__(self, maxsize=256, default_ttl=3600, name="cache", path=None, save_interval=SAVE_INTERVAL):
+        self.maxsize = max(1, maxsize)
+        self.default_ttl = default_ttl
+        self.name = name
+        self.path = Path(path) if path else None
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer at a time, snapshots in order
+        self.save_interval = save_interval
+        self._dirty = False
+        self._saver = None  # Pending save timer
+        self.saves = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if self.path:
+            self._load()
+            atexit.register(self.flush)
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Could not load {self.name} cache: {e}")
+            return
+        now = time.time()
+        for key, expires_at, value in entries[-self.maxsize:]:
+            if expires_at > now:
+                self._data[key] = (expires_at, value)
+
+    def _changed_locked(self):
+        """Schedule a background save (one pending timer batches every change until it fires)"""
+        if not self.path:
+            return
+        self._dirty = True
+        if self._saver is None:
+            self._saver = threading.Timer(self.save_interval, self.flush)
+            self._saver.daemon = True
+            self._saver.start()
+
+    def flush(self):
+        """Write pending changes to the file now (runs from the save timer and at exit)"""
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                self._saver = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Written in LRU order so a reload keeps recency
+                entries = [[key, expires_at, value] for key, (expires_at, value) in self._data.items()]
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            try:
+                with tmp_path.open("w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self.saves += 1
+            except Exception as e:
+                print(f"⚠️  Could not save {self.name} cache: {e}")
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            self._changed_locked()
+
+    def delete(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._changed_locked()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._changed_locked()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'persistent': self.path is not None,
+            'saves': self.saves
+        }
@@ -3,19 +3,399 @@ Web Scraper Module - Extract structured product data from websites
 Batch processing: Scrape 5 products at a time, store and display progressively
 """
 
-import requests
 from bs4 import BeautifulSoup
 import json
 import re
 from urllib.parse import urljoin, urlparse
+import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Disk-backed HTTP cache with ETag/Last-Modified revalidation
+from http_cache import HTTP_CACHE
+
+# Compressed write-behind archive for scraped batches
+from scrape_archive import SCRAPE_ARCHIVE
+
+# Local full-text index that /ask answers from before searching
+from knowledge_index import KNOWLEDGE_INDEX
+
 # Storage - Use absolute path relative to this script
 SCRIPT_DIR = Path(__file__).resolve().parent
 SCRAPER_DIR = SCRIPT_DIR / "agent_state"
 SCRAPER_DIR.mkdir(parents=True, exist_ok=True)
 
+# HTML parser engine: "auto" (lxml when installed), "lxml" or "html.parser"
+HTML_PARSER = os.environ.get("NEXUS_HTML_PARSER", "auto")
+
+# Concurrent fetching - bounded overall, polite per host
+FETCH_WORKERS = int(os.environ.get("NEXUS_FETCH_WORKERS", "8"))
+PER_HOST_CONCURRENCY = int(os.environ.get("NEXUS_FETCH_PER_HOST", "2"))
+PER_HOST_DELAY = float(os.environ.get("NEXUS_FETCH_HOST_DELAY", "0.5"))  # Seconds between request starts on one host
+
+
+def _pick_parser(preferred):
+    if preferred in ("auto", "lxml"):
+        try:
+            import lxml  # noqa: F401 - only checking availability
+            return "lxml"
+        except ImportError:
+            if preferred == "lxml":
+                print("⚠️  lxml not installed, falling back to html.parser")
+    return "html.parser"
+
+
+PARSER = _pick_parser(HTML_PARSER)
+
+
+def make_soup(content, parser=None):
+    """
+    Parse HTML with the fast engine, falling back to Python's html.parser
+    if the fast parser is unavailable or chokes on the document
+    """
+    parser = parser or PARSER
+    if parser != "html.parser":
+        try:
+            return BeautifulSoup(content, parser)
+        except Exception as e:
+            print(f"⚠️  {parser} failed ({e}), retrying with html.parser")
+    return BeautifulSoup(content, 'html.parser')
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+# -------- Parse-once document pipeline --------
+class Document:
+    """A page fetched and parsed once, shared by every extractor"""
+
+    def __init__(self, url, soup):
+        self.url = url
+        self.soup = soup
+        self._index = None
+
+    @property
+    def is_wikipedia(self):
+        return 'wikipedia.org' in self.url.lower()
+
+    @property
+    def index(self):
+        """Class/itemprop/meta lookup index, built on first use"""
+        if self._index is None:
+            self._index = ElementIndex(self.soup)
+        return self._index
+
+
+class ElementIndex:
+    """
+    One pass over the tree mapping class tokens, itemprop values and meta
+    name/property values to the elements that carry them (in document order)
+
+    Lookups return the same element soup.find() would: the first match in
+    document order. Regex lookups scan the (small) set of distinct keys rather
+    than every node, and are memoized per pattern.
+    """
+
+    def __init__(self, soup):
+        self.by_class = {}
+        self.by_itemprop = {}
+        self.meta_by_name = {}
+        self.meta_by_property = {}
+        self._regex_cache = {}
+
+        for position, element in enumerate(soup.find_all(True)):
+            entry = (position, element)
+            classes = element.get('class')
+            if classes:
+                if isinstance(classes, str):
+                    classes = classes.split()
+                # bs4 matches class regexes against each token and the joined string
+                keys = set(classes)
+                keys.add(' '.join(classes))
+                for key in keys:
+                    self.by_class.setdefault(key, []).append(entry)
+            itemprop = element.get('itemprop')
+            if itemprop is not None:
+                self.by_itemprop.setdefault(itemprop, []).append(entry)
+            if element.name == 'meta':
+                name = element.get('name')
+                if name is not None:
+                    self.meta_by_name.setdefault(name, []).append(entry)
+                prop = element.get('property')
+                if prop is not None:
+                    self.meta_by_property.setdefault(prop, []).append(entry)
+
+    def _matching_entries(self, table, table_name, pattern):
+        """All entries whose key matches a regex, memoized per table + pattern"""
+        cache_key = (table_name, pattern)
+        if cache_key not in self._regex_cache:
+            regex = re.compile(pattern, re.I)
+            entries = []
+            for key, key_entries in table.items():
+                if regex.search(key):
+                    entries.extend(key_entries)
+            entries.sort(key=lambda entry: entry[0])
+            self._regex_cache[cache_key] = entries
+        return self._regex_cache[cache_key]
+
+    @staticmethod
+    def _first(entries, tags=None):
+        for _, element in entries:
+            if tags is None or element.name in tags:
+                return element
+        return None
+
+    def find_by_class(self, pattern, tags):
+        """First element of one of `tags` whose class matches regex `pattern` (case-insensitive)"""
+        return self._first(self._matching_entries(self.by_class, 'class', pattern), tags)
+
+    def find_by_itemprop(self, value, tags):
+        return self._first(self.by_itemprop.get(value, []), tags)
+
+    def find_meta(self, attr, value=None, pattern=None):
+        """First <meta> whose name/property equals value or matches regex pattern"""
+        table = self.meta_by_name if attr == 'name' else self.meta_by_property
+        if pattern is not None:
+            return self._first(self._matching_entries(table, attr, pattern))
+        return self._first(table.get(value, []))
+
+
+def fetch_document(url, timeout=10):
+    """Download (through the HTTP cache) and parse a page"""
+    headers = {
+        'User-Agent': USER_AGENT
+    }
+
+    response = HTTP_CACHE.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+
+    return Document(url, make_soup(response.content))
+
+
+# Extractor registry: name -> function(document) returning the fields it fills in
+EXTRACTORS = {}
+
+
+def register_extractor(name):
+    """Decorator to add an extractor to the pipeline"""
+    def decorator(func):
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+
+def resolve_extractors(names=None, url=""):
+    """
+    Pick the extractors to run
+    None = the default set (tables only for Wikipedia pages).
+    Raises ValueError for unknown extractor names.
+    """
+    if names is None:
+        return [name for name in EXTRACTORS
+                if name != 'tables' or 'wikipedia.org' in url.lower()]
+    unknown = [name for name in names if name not in EXTRACTORS]
+    if unknown:
+        raise ValueError(f"Unknown extractors: {', '.join(unknown)} (available: {', '.join(EXTRACTORS)})")
+    return list(names)
+
+
+def _empty_structured_data(url):
+    return {
+        "url": url,
+        "title": "",
+        "meta_description": "",
+        "headings": {
+            "h1": [],
+            "h2": [],
+            "h3": []
+        },
+        "links": [],
+        "paragraphs": [],
+        "json_ld": [],
+        "product_info": {},
+        "images": [],
+        "price": None,
+        "rating": None
+    }
+
+
+@register_extractor('metadata')
+def _extract_metadata(doc):
+    soup = doc.soup
+    fields = {}
+
+    # Title
+    title_tag = soup.find('title')
+    if title_tag:
+        fields["title"] = title_tag.get_text().strip()
+
+    # Meta description
+    meta_desc = doc.index.find_meta('name', 'description')
+    if not meta_desc:
+        meta_desc = doc.index.find_meta('property', 'og:description')
+    if meta_desc:
+        fields["meta_description"] = meta_desc.get('content', '').strip()
+
+    return fields
+
+
+@register_extractor('headings')
+def _extract_headings(doc):
+    headings = {"h1": [], "h2": [], "h3": []}
+    for heading in doc.soup.find_all(['h1', 'h2', 'h3']):
+        text = heading.get_text().strip()
+        if text:
+            headings[heading.name].append(text)
+    return {"headings": headings}
+
+
+@register_extractor('links')
+def _extract_links(doc):
+    # Links (top 10 most relevant)
+    links = []
+    for a in doc.soup.find_all('a', href=True):
+        if len(links) >= 10:
+            break
+        href = a.get('href', '')
+        text = a.get_text().strip()
+
+        # Make absolute URL
+        if href and not href.startswith('javascript:') and not href.startswith('#'):
+            full_url = urljoin(doc.url, href)
+            if text and full_url:
+                links.append({
+                    "text": text[:100],  # Limit text length
+                    "href": full_url
+                })
+    return {"links": links}
+
+
+@register_extractor('paragraphs')
+def _extract_paragraphs(doc):
+    # Paragraphs (first 5)
+    paragraphs = []
+    for p in doc.soup.find_all('p'):
+        if len(paragraphs) >= 5:
+            break
+        text = p.get_text().strip()
+        if text and len(text) > 20:  # Only meaningful paragraphs
+            paragraphs.append(text[:300])  # Limit length
+    return {"paragraphs": paragraphs}
+
+
+@register_extractor('json_ld')
+def _extract_json_ld(doc):
+    # JSON-LD structured data
+    json_ld = []
+    for script in doc.soup.find_all('script', type='application/ld+json'):
+        try:
+            json_ld.append(json.loads(script.string))
+        except:
+            continue
+    return {"json_ld": json_ld}
+
+
+@register_extractor('product')
+def _extract_product(doc):
+    return {"product_info": extract_product_info(doc.soup, doc.index)}
+
+
+@register_extractor('images')
+def _extract_images(doc):
+    # Images (product images)
+    images = []
+    for img in doc.soup.find_all('img')[:5]:
+        src = img.get('src') or img.get('data-src')
+        if src:
+            images.append({
+                "src": urljoin(doc.url, src),
+                "alt": img.get('alt', '')
+            })
+    return {"images": images}
+
+
+@register_extractor('price')
+def _extract_price(doc):
+    # Price extraction (multiple patterns)
+    return {"price": extract_price(doc.soup, doc.index)}
+
+
+@register_extractor('rating')
+def _extract_rating(doc):
+    return {"rating": extract_rating(doc.soup, doc.index)}
+
+
+@register_extractor('tables')
+def _extract_tables(doc):
+    # WIKIPEDIA TABLES - Extract structured data as key-value pairs
+    if doc.is_wikipedia:
+        print(f"📊 Wikipedia detected - extracting tables...")
+    return {"wikipedia_tables": extract_tables_from_soup(doc.soup)}
+
+
+def extract_tables_from_soup(soup):
+    """
+    Turn wikitable/sortable/infobox tables into lists of row dicts
+    (header text -> cell text, reference marks like [1] removed)
+    """
+    tables_data = []
+
+    # Find all tables
+    tables = soup.find_all('table', class_=['wikitable', 'sortable', 'infobox'])
+
+    for table_idx, table in enumerate(tables):
+        # Get table caption/title
+        caption = table.find('caption')
+        table_title = caption.get_text().strip() if caption else f"Table {table_idx + 1}"
+
+        # Find headers
+        headers_row = table.find('tr')
+        if not headers_row:
+            continue
+
+        headers = []
+        for th in headers_row.find_all(['th', 'td']):
+            header_text = th.get_text().strip()
+            # Clean up references like [1], [2]
+            header_text = re.sub(r'\[\d+\]', '', header_text)
+            if header_text:
+                headers.append(header_text)
+
+        if not headers:
+            continue
+
+        # Extract rows
+        rows_data = []
+        for row in table.find_all('tr')[1:]:  # Skip header row
+            cells = row.find_all(['td', 'th'])
+            if not cells:
+                continue
+
+            row_dict = {}
+            for idx, cell in enumerate(cells):
+                if idx < len(headers):
+                    cell_text = cell.get_text().strip()
+                    # Clean up references like [1], [2]
+                    cell_text = re.sub(r'\[\d+\]', '', cell_text)
+                    # Clean up newlines
+                    cell_text = ' '.join(cell_text.split())
+                    row_dict[headers[idx]] = cell_text
+
+            if row_dict:
+                rows_data.append(row_dict)
+
+        if rows_data:
+            tables_data.append({
+                "table_title": table_title,
+                "row_count": len(rows_data),
+                "columns": headers,
+                "data": rows_data
+            })
+
+    return tables_data
+
 
 def extract_wikipedia_tables(url, timeout=10):
     """
@@ -24,221 +404,48 @@ def extract_wikipedia_tables(url, timeout=10):
     Returns list of tables with clean data
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        tables_data = []
-        
-        # Find all tables
-        tables = soup.find_all('table', class_=['wikitable', 'sortable', 'infobox'])
-        
-        for table_idx, table in enumerate(tables):
-            # Get table caption/title
-            caption = table.find('caption')
-            table_title = caption.get_text().strip() if caption else f"Table {table_idx + 1}"
-            
-            # Find headers
-            headers_row = table.find('tr')
-            if not headers_row:
-                continue
-                
-            headers = []
-            for th in headers_row.find_all(['th', 'td']):
-                header_text = th.get_text().strip()
-                # Clean up references like [1], [2]
-                header_text = re.sub(r'\[\d+\]', '', header_text)
-                if header_text:
-                    headers.append(header_text)
-            
-            if not headers:
-                continue
-            
-            # Extract rows
-            rows_data = []
-            for row in table.find_all('tr')[1:]:  # Skip header row
-                cells = row.find_all(['td', 'th'])
-                if not cells:
-                    continue
-                
-                row_dict = {}
-                for idx, cell in enumerate(cells):
-                    if idx < len(headers):
-                        cell_text = cell.get_text().strip()
-                        # Clean up references like [1], [2]
-                        cell_text = re.sub(r'\[\d+\]', '', cell_text)
-                        # Clean up newlines
-                        cell_text = ' '.join(cell_text.split())
-                        row_dict[headers[idx]] = cell_text
-                
-                if row_dict:
-                    rows_data.append(row_dict)
-            
-            if rows_data:
-                tables_data.append({
-                    "table_title": table_title,
-                    "row_count": len(rows_data),
-                    "columns": headers,
-                    "data": rows_data
-                })
-        
-        return tables_data
-        
+        return extract_tables_from_soup(fetch_document(url, timeout).soup)
     except Exception as e:
         print(f"❌ Error extracting Wikipedia tables: {e}")
         return []
 
 
-def extract_structured_data(url, timeout=10):
+def run_extractors(doc, extractors=None):
+    """Run the selected extractors over one parsed document"""
+    data = _empty_structured_data(doc.url)
+    for name in resolve_extractors(extractors, doc.url):
+        try:
+            data.update(EXTRACTORS[name](doc))
+        except Exception as e:
+            print(f"⚠️  Extractor '{name}' failed on {doc.url}: {e}")
+    return data
+
+
+def extract_structured_data(url, timeout=10, extractors=None):
     """
     Extract structured JSON data from a webpage
     Similar to the example format you provided
+
+    The page is downloaded and parsed once; `extractors` picks which parts to
+    extract (see EXTRACTORS), default is everything.
     """
+    selected = resolve_extractors(extractors, url)
+    
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract basic metadata
-        data = {
-            "url": url,
-            "title": "",
-            "meta_description": "",
-            "headings": {
-                "h1": [],
-                "h2": [],
-                "h3": []
-            },
-            "links": [],
-            "paragraphs": [],
-            "json_ld": [],
-            "product_info": {},
-            "images": [],
-            "price": None,
-            "rating": None
-        }
-        
-        # Title
-        title_tag = soup.find('title')
-        if title_tag:
-            data["title"] = title_tag.get_text().strip()
-        
-        # Meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if not meta_desc:
-            meta_desc = soup.find('meta', attrs={'property': 'og:description'})
-        if meta_desc:
-            data["meta_description"] = meta_desc.get('content', '').strip()
-        
-        # Headings
-        for h1 in soup.find_all('h1'):
-            text = h1.get_text().strip()
-            if text:
-                data["headings"]["h1"].append(text)
-        
-        for h2 in soup.find_all('h2'):
-            text = h2.get_text().strip()
-            if text:
-                data["headings"]["h2"].append(text)
-        
-        for h3 in soup.find_all('h3'):
-            text = h3.get_text().strip()
-            if text:
-                data["headings"]["h3"].append(text)
-        
-        # Links (top 10 most relevant)
-        link_count = 0
-        for a in soup.find_all('a', href=True):
-            if link_count >= 10:
-                break
-            href = a.get('href', '')
-            text = a.get_text().strip()
-            
-            # Make absolute URL
-            if href and not href.startswith('javascript:') and not href.startswith('#'):
-                full_url = urljoin(url, href)
-                if text and full_url:
-                    data["links"].append({
-                        "text": text[:100],  # Limit text length
-                        "href": full_url
-                    })
-                    link_count += 1
-        
-        # Paragraphs (first 5)
-        para_count = 0
-        for p in soup.find_all('p'):
-            if para_count >= 5:
-                break
-            text = p.get_text().strip()
-            if text and len(text) > 20:  # Only meaningful paragraphs
-                data["paragraphs"].append(text[:300])  # Limit length
-                para_count += 1
-        
-        # JSON-LD structured data
-        for script in soup.find_all('script', type='application/ld+json'):
-            try:
-                json_data = json.loads(script.string)
-                data["json_ld"].append(json_data)
-            except:
-                continue
-        
-        # Product-specific extraction
-        data["product_info"] = extract_product_info(soup)
-        
-        # Images (product images)
-        for img in soup.find_all('img')[:5]:
-            src = img.get('src') or img.get('data-src')
-            if src:
-                full_img_url = urljoin(url, src)
-                alt = img.get('alt', '')
-                data["images"].append({
-                    "src": full_img_url,
-                    "alt": alt
-                })
-        
-        # Price extraction (multiple patterns)
-        data["price"] = extract_price(soup)
-        
-        # Rating extraction
-        data["rating"] = extract_rating(soup)
-        
-        # WIKIPEDIA TABLES - Extract structured data as key-value pairs
-        if 'wikipedia.org' in url.lower():
-            print(f"📊 Wikipedia detected - extracting tables...")
-            data["wikipedia_tables"] = extract_wikipedia_tables(url, timeout)
-        
-        return data
-        
+        doc = fetch_document(url, timeout)
+        return run_extractors(doc, selected)
+
     except Exception as e:
         print(f"Error scraping {url}: {e}")
-        return {
-            "url": url,
-            "error": str(e),
-            "title": "Error loading page",
-            "meta_description": "",
-            "headings": {"h1": [], "h2": [], "h3": []},
-            "links": [],
-            "paragraphs": [],
-            "json_ld": [],
-            "product_info": {},
-            "images": [],
-            "price": None,
-            "rating": None
-        }
-
-
-def extract_product_info(soup):
+        data = _empty_structured_data(url)
+        data["error"] = str(e)
+        data["title"] = "Error loading page"
+        return data
+
+
+def extract_product_info(soup, index=None):
     """Extract product-specific information"""
+    index = index or ElementIndex(soup)
     product_info = {}
     
     # Common product info patterns
@@ -254,16 +461,16 @@ def extract_product_info(soup):
     for key, keywords in patterns.items():
         for keyword in keywords:
             # Try to find in meta tags
-            meta = soup.find('meta', attrs={'name': re.compile(keyword, re.I)})
+            meta = index.find_meta('name', pattern=keyword)
             if not meta:
-                meta = soup.find('meta', attrs={'property': re.compile(keyword, re.I)})
+                meta = index.find_meta('property', pattern=keyword)
             
             if meta:
                 product_info[key] = meta.get('content', '')
                 break
             
             # Try to find in common product info sections
-            elem = soup.find(['span', 'div', 'p'], class_=re.compile(keyword, re.I))
+            elem = index.find_by_class(keyword, ('span', 'div', 'p'))
             if elem:
                 product_info[key] = elem.get_text().strip()[:100]
                 break
@@ -271,18 +478,21 @@ def extract_product_info(soup):
     return product_info
 
 
-def extract_price(soup):
+def extract_price(soup, index=None):
     """Extract price from page"""
+    index = index or ElementIndex(soup)
+    price_tags = ('span', 'div', 'p', 'strong')
+    
     # Common price patterns
-    price_patterns = [
-        {'class': re.compile(r'price', re.I)},
-        {'itemprop': 'price'},
-        {'class': re.compile(r'cost', re.I)},
-        {'class': re.compile(r'amount', re.I)}
+    price_lookups = [
+        lambda: index.find_by_class(r'price', price_tags),
+        lambda: index.find_by_itemprop('price', price_tags),
+        lambda: index.find_by_class(r'cost', price_tags),
+        lambda: index.find_by_class(r'amount', price_tags)
     ]
     
-    for pattern in price_patterns:
-        price_elem = soup.find(['span', 'div', 'p', 'strong'], pattern)
+    for lookup in price_lookups:
+        price_elem = lookup()
         if price_elem:
             price_text = price_elem.get_text().strip()
             # Extract numeric price
@@ -291,24 +501,27 @@ def extract_price(soup):
                 return price_match.group(0)
     
     # Try meta tags
-    meta_price = soup.find('meta', attrs={'property': 'og:price:amount'})
+    meta_price = index.find_meta('property', 'og:price:amount')
     if meta_price:
         return meta_price.get('content', '')
     
     return None
 
 
-def extract_rating(soup):
+def extract_rating(soup, index=None):
     """Extract rating from page"""
+    index = index or ElementIndex(soup)
+    rating_tags = ('span', 'div', 'p')
+    
     # Common rating patterns
-    rating_patterns = [
-        {'itemprop': 'ratingValue'},
-        {'class': re.compile(r'rating', re.I)},
-        {'class': re.compile(r'stars', re.I)}
+    rating_lookups = [
+        lambda: index.find_by_itemprop('ratingValue', rating_tags),
+        lambda: index.find_by_class(r'rating', rating_tags),
+        lambda: index.find_by_class(r'stars', rating_tags)
     ]
     
-    for pattern in rating_patterns:
-        rating_elem = soup.find(['span', 'div', 'p'], pattern)
+    for lookup in rating_lookups:
+        rating_elem = lookup()
         if rating_elem:
             rating_text = rating_elem.get_text().strip()
             # Extract numeric rating
@@ -319,62 +532,135 @@ def extract_rating(soup):
     return None
 
 
-def scrape_search_results(search_results, batch_size=5):
+class HostPoliteness:
+    """
+    Per-host concurrency limit + minimum spacing between requests to the same host
+    Requests to unrelated hosts never wait on each other.
+    """
+    
+    def __init__(self, per_host=PER_HOST_CONCURRENCY, delay=PER_HOST_DELAY):
+        self.per_host = max(1, per_host)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+    
+    def _host(self, url):
+        return urlparse(url).netloc.lower()
+    
+    def acquire(self, url):
+        host = self._host(url)
+        with self._lock:
+            sem = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        sem.acquire()
+        # Reserve the next start slot for this host, then sleep outside the lock
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start_at + self.delay
+        if start_at > now:
+            time.sleep(start_at - now)
+        return host
+    
+    def release(self, host):
+        self._semaphores[host].release()
+
+
+POLITENESS = HostPoliteness()
+
+
+def _polite_extract(url, extractors=None):
+    """Fetch + extract one URL while holding its host's politeness slot"""
+    host = POLITENESS.acquire(url)
+    try:
+        return extract_structured_data(url, extractors=extractors)
+    finally:
+        POLITENESS.release(host)
+
+
+def scrape_search_results(search_results, batch_size=5, max_workers=FETCH_WORKERS, extractors=None,
+                          run_id=None, query=None):
     """
     Scrape websites from search results in batches
     
+    Pages are fetched concurrently (bounded by max_workers, polite per host) with
+    one batch of lookahead, but batches are yielded in order and item_number is
+    assigned from the input position, so output is deterministic.
+    
     Args:
         search_results: List of search results from DuckDuckGo/Bing
         batch_size: Number of sites to scrape per batch (default: 5)
+        max_workers: Maximum pages fetched at the same time
+        extractors: Extractor names to run per page (default: all, see EXTRACTORS)
+        run_id: Archive run id for the batches (default: generated)
+        query: User query, stored with the archived batches
     
     Returns:
         Generator yielding batches of scraped data
     """
+    run_id = run_id or f"scrape-{int(time.time() * 1000)}"
     total_results = len(search_results)
+    batch_starts = list(range(0, total_results, batch_size))
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="scrape")
     
-    for batch_start in range(0, total_results, batch_size):
-        batch_end = min(batch_start + batch_size, total_results)
-        batch = search_results[batch_start:batch_end]
-        
-        batch_data = []
-        
-        print(f"\n📦 Processing batch {batch_start//batch_size + 1} (items {batch_start+1}-{batch_end})...")
+    def submit_batch(batch_start):
+        for idx in range(batch_start, min(batch_start + batch_size, total_results)):
+            url = search_results[idx].get('link', '')
+            if url:
+                futures[idx] = executor.submit(_polite_extract, url, extractors)
+    
+    try:
+        if batch_starts:
+            submit_batch(batch_starts[0])
         
-        for idx, result in enumerate(batch):
-            url = result.get('link', '')
-            if not url:
-                continue
+        for position, batch_start in enumerate(batch_starts):
+            batch_end = min(batch_start + batch_size, total_results)
+            batch = search_results[batch_start:batch_end]
             
-            print(f"   🌐 Scraping {idx+1}/{len(batch)}: {result.get('title', 'Unknown')[:50]}...")
+            # Keep the next batch fetching while this one is finalised
+            if position + 1 < len(batch_starts):
+                submit_batch(batch_starts[position + 1])
             
-            # Extract structured data
-            structured_data = extract_structured_data(url)
+            batch_data = []
             
-            # Add search result context
-            structured_data['search_snippet'] = result.get('snippet', '')
-            structured_data['search_title'] = result.get('title', '')
-            structured_data['batch_number'] = batch_start // batch_size + 1
-            structured_data['item_number'] = batch_start + idx + 1
+            print(f"\n📦 Processing batch {batch_start//batch_size + 1} (items {batch_start+1}-{batch_end})...")
             
-            batch_data.append(structured_data)
+            for idx, result in enumerate(batch):
+                future = futures.pop(batch_start + idx, None)
+                if future is None:
+                    continue
+                
+                print(f"   🌐 Scraping {idx+1}/{len(batch)}: {result.get('title', 'Unknown')[:50]}...")
+                
+                # Extract structured data
+                structured_data = future.result()
+                
+                # Add search result context
+                structured_data['search_snippet'] = result.get('snippet', '')
+                structured_data['search_title'] = result.get('title', '')
+                structured_data['batch_number'] = batch_start // batch_size + 1
+                structured_data['item_number'] = batch_start + idx + 1
+                
+                batch_data.append(structured_data)
             
-            # Be polite - small delay between requests
-            time.sleep(0.5)
-        
-        # Save this batch
-        batch_filename = SCRAPER_DIR / f"scrape_batch_{batch_start//batch_size + 1}_{int(time.time())}.json"
-        with open(batch_filename, 'w', encoding='utf-8') as f:
-            json.dump(batch_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"   ✅ Batch {batch_start//batch_size + 1} complete! Saved to {batch_filename.name}")
-        
-        # Yield this batch for progressive updates
-        yield {
-            'batch_number': batch_start // batch_size + 1,
-            'total_batches': (total_results + batch_size - 1) // batch_size,
-            'items': batch_data,
-            'progress': f"{batch_end}/{total_results}"
-        }
+            # Save this batch (compressed, written in the background)
+            SCRAPE_ARCHIVE.archive_batch(run_id, batch_start // batch_size + 1, batch_data, query=query)
+            KNOWLEDGE_INDEX.add_pages(batch_data)
+            
+            print(f"   ✅ Batch {batch_start//batch_size + 1} complete! Archived under {run_id}")
+            
+            # Yield this batch for progressive updates
+            yield {
+                'run_id': run_id,
+                'batch_number': batch_start // batch_size + 1,
+                'total_batches': (total_results + batch_size - 1) // batch_size,
+                'items': batch_data,
+                'progress': f"{batch_end}/{total_results}"
+            }
+    finally:
+        # Consumer may stop early (e.g. client disconnect) - drop queued fetches
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 def scrape_products_progressive(query, search_function, limit=20, batch_size=5):
@@ -403,7 +689,7 @@ def scrape_products_progressive(query, search_function, limit=20, batch_size=5):
     print(f"✅ Found {len(search_results)} search results")
     
     # Scrape in batches
-    for batch_result in scrape_search_results(search_results, batch_size):
+    for batch_result in scrape_search_results(search_results, batch_size, query=query):
         yield batch_result
     
     print(f"\n🎉 All batches complete!")
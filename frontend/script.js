@@ -72,18 +72,50 @@ async function sendMessage() {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ question: message }),
+                body: JSON.stringify({ question: message, stream: true }),  // Tokens + stages as Server-Sent Events
                 signal: controller.signal
             });
             
-            clearTimeout(timeoutId);
-            
             if (!response.ok) {
+                clearTimeout(timeoutId);
                 const errorData = await response.json();
                 throw new Error(errorData.message || `Server error: ${response.status}`);
             }
             
-            const data = await response.json();
+            // Render Mistral's tokens as they arrive; the final answer replaces them
+            let data = null;
+            let streamingView = null;
+            try {
+                await readSSEStream(response, (event, payload) => {
+                    if (event === 'stage') {
+                        updateThinkingMessage(thinkingId, payload.message);
+                    } else if (event === 'token') {
+                        if (!streamingView) {
+                            streamingView = startStreamingMessage();
+                            document.getElementById(thinkingId).style.display = 'none';
+                        }
+                        appendStreamingText(streamingView, payload.text);
+                    } else if (event === 'reset') {
+                        // Mistral deferred to the web - drop its partial answer, show progress again
+                        if (streamingView) {
+                            streamingView.element.remove();
+                            streamingView = null;
+                        }
+                        document.getElementById(thinkingId).style.display = '';
+                    } else if (event === 'answer') {
+                        data = payload;
+                    }
+                });
+            } finally {
+                clearTimeout(timeoutId);
+                if (streamingView) {
+                    streamingView.element.remove();
+                }
+            }
+            
+            if (!data) {
+                throw new Error('The answer stream ended unexpectedly');
+            }
             
             // Remove thinking message
             removeThinkingMessage(thinkingId);
@@ -147,6 +179,9 @@ function addMessage(role, content, data = null) {
         if (data.method === 'web') {
             statusBadges += `<div class="status-badge searching">🌐 Web Search</div>`;
         }
+        if (data.method === 'knowledge') {
+            statusBadges += `<div class="status-badge success">📚 Local Knowledge</div>`;
+        }
         if (data.method === 'ollama') {
             statusBadges += `<div class="status-badge success">🧠 Mistral AI</div>`;
         }
@@ -312,7 +347,7 @@ function addThinkingMessage() {
         </div>
         <div class="message-content">
             <div class="thinking">
-                🧠 Thinking
+                <span class="thinking-text">🧠 Thinking</span>
                 <div class="thinking-dots">
                     <span></span>
                     <span></span>
@@ -328,6 +363,37 @@ function addThinkingMessage() {
     return thinkingId;
 }
 
+// Start an assistant message that fills in while tokens stream
+function startStreamingMessage() {
+    const messagesDiv = document.getElementById('messages');
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message assistant';
+    
+    const time = new Date().toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+    messageDiv.innerHTML = `
+        <div class="message-header">
+            <div class="message-avatar">N</div>
+            <div class="message-author">Nexus AI</div>
+            <div class="message-time">${time}</div>
+        </div>
+        <div class="message-content">
+            <p class="streaming-text"></p>
+        </div>
+    `;
+    
+    messagesDiv.appendChild(messageDiv);
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+    
+    return { element: messageDiv, textEl: messageDiv.querySelector('.streaming-text') };
+}
+
+// Append streamed tokens (plain text until the final answer is formatted)
+function appendStreamingText(view, text) {
+    view.textEl.textContent += text;
+    const messagesDiv = document.getElementById('messages');
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+}
+
 // Remove Thinking Message
 function removeThinkingMessage(thinkingId) {
     const thinkingDiv = document.getElementById(thinkingId);
@@ -472,8 +538,9 @@ function detectProductQuery(message) {
     return productKeywords.some(keyword => messageLower.includes(keyword));
 }
 
-// Handle product search in chat
+// Handle product search in chat (streams NDJSON batches as they are scraped)
 async function handleProductSearch(query, thinkingId) {
+    let view = null;
     try {
         // Update thinking message
         updateThinkingMessage(thinkingId, '🔍 Searching Wikipedia and web for ALL data...');
@@ -486,7 +553,8 @@ async function handleProductSearch(query, thinkingId) {
             body: JSON.stringify({ 
                 query, 
                 limit: 50,  // Get MORE results - 50 pages to extract ALL data
-                batch_size: 10  // Larger batches for faster loading
+                batch_size: 10,  // Larger batches for faster loading
+                stream: true  // Receive each batch as soon as it is scraped
             })
         });
 
@@ -495,25 +563,26 @@ async function handleProductSearch(query, thinkingId) {
             throw new Error(errorData.error || 'Product search failed');
         }
 
-        const data = await response.json();
+        await readNDJSONStream(response, event => {
+            if (event.type === 'search_complete') {
+                updateThinkingMessage(thinkingId, `📦 Found ${event.total_items} pages - scraping in ${event.total_batches} batches...`);
+            } else if (event.type === 'batch') {
+                // Show products from the first batch right away
+                if (!view) {
+                    removeThinkingMessage(thinkingId);
+                    view = startProductsInChat(query);
+                }
+                appendProductsToChat(view, event.items);
+            } else if (event.type === 'error') {
+                throw new Error(event.error || 'Product search failed');
+            }
+        });
 
-        if (!data.success || !data.batches || data.batches.length === 0) {
+        if (!view || view.products.length === 0) {
             throw new Error('No products found');
         }
 
-        // Collect all products
-        const allProducts = [];
-        data.batches.forEach(batch => {
-            batch.items.forEach(item => {
-                allProducts.push(item);
-            });
-        });
-
-        // Remove thinking message
-        removeThinkingMessage(thinkingId);
-
-        // Display products in chat
-        displayProductsInChat(allProducts, query);
+        finishProductsInChat(view);
 
         // Save to history
         saveChatToHistory(query);
@@ -521,20 +590,111 @@ async function handleProductSearch(query, thinkingId) {
     } catch (error) {
         console.error('Product search error:', error);
         removeThinkingMessage(thinkingId);
+        if (view) {
+            finishProductsInChat(view);
+        }
         addMessage('assistant', `❌ Sorry, couldn't find products: ${error.message}`);
     }
 }
 
+// Read a newline-delimited JSON response body, calling onEvent for each line as it arrives
+async function readNDJSONStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (value) {
+            buffer += decoder.decode(value, { stream: true });
+        }
+        if (done) {
+            buffer += decoder.decode();
+        }
+        
+        let newlineIndex;
+        while ((newlineIndex = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newlineIndex).trim();
+            buffer = buffer.slice(newlineIndex + 1);
+            if (line) {
+                onEvent(JSON.parse(line));
+            }
+        }
+        
+        if (done) {
+            if (buffer.trim()) {
+                onEvent(JSON.parse(buffer));
+            }
+            break;
+        }
+    }
+}
+
+// Read a Server-Sent Events response body, calling onEvent(event, data) for each event as it arrives
+async function readSSEStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    const dispatch = block => {
+        let event = 'message';
+        const dataLines = [];
+        for (const line of block.split('\n')) {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        }
+        if (dataLines.length > 0) {
+            onEvent(event, JSON.parse(dataLines.join('\n')));
+        }
+    };
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (value) {
+            buffer += decoder.decode(value, { stream: true });
+        }
+        if (done) {
+            buffer += decoder.decode();
+        }
+        buffer = buffer.replace(/\r\n/g, '\n');
+        
+        let separatorIndex;
+        while ((separatorIndex = buffer.indexOf('\n\n')) >= 0) {
+            const block = buffer.slice(0, separatorIndex);
+            buffer = buffer.slice(separatorIndex + 2);
+            dispatch(block);
+        }
+        
+        if (done) {
+            if (buffer.trim()) {
+                dispatch(buffer);
+            }
+            break;
+        }
+    }
+}
+
 // Display products as chat messages
 function displayProductsInChat(products, query) {
+    const view = startProductsInChat(query);
+    appendProductsToChat(view, products);
+    finishProductsInChat(view);
+}
+
+// Add the intro message and set up product storage for incremental rendering
+function startProductsInChat(query) {
     const messagesDiv = document.getElementById('messages');
+    const countId = 'product-count-' + Date.now();
     
     // Add intro message with download button
     const introHtml = `
         <div class="message assistant-message">
             <div class="message-content">
                 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 12px;">
-                    <p style="margin: 0;">I found <strong>${products.length} best products</strong> for "<strong>${query}</strong>". Here are the top picks:</p>
+                    <p style="margin: 0;">I found <strong id="${countId}">0 best products</strong> for "<strong>${query}</strong>". Here are the top picks:</p>
                     <button onclick="downloadProductsJSON()" style="background: linear-gradient(135deg, #10b981 0%, #059669 100%); color: white; border: none; padding: 8px 16px; border-radius: 8px; font-weight: 600; cursor: pointer; font-size: 13px; display: flex; align-items: center; gap: 6px; transition: transform 0.2s;" onmouseover="this.style.transform='scale(1.05)'" onmouseout="this.style.transform='scale(1)'">
                         📥 Download JSON
                     </button>
@@ -547,32 +707,56 @@ function displayProductsInChat(products, query) {
     // Store products globally for download
     window.currentProducts = {
         query: query,
-        total_results: products.length,
+        total_results: 0,
         timestamp: new Date().toISOString(),
-        products: products
+        products: []
     };
     
-    // Count Wikipedia tables across all products
-    let totalTables = 0;
-    let totalTableRows = 0;
+    return {
+        countId: countId,
+        products: window.currentProducts.products,
+        totalTables: 0,
+        totalTableRows: 0
+    };
+}
+
+// Append a batch of product cards to an in-progress product view
+function appendProductsToChat(view, products) {
+    const messagesDiv = document.getElementById('messages');
+    
     products.forEach(product => {
+        view.products.push(product);
+        
+        // Count Wikipedia tables across all products
         if (product.wikipedia_tables && product.wikipedia_tables.length > 0) {
-            totalTables += product.wikipedia_tables.length;
+            view.totalTables += product.wikipedia_tables.length;
             product.wikipedia_tables.forEach(table => {
-                totalTableRows += table.row_count || 0;
+                view.totalTableRows += table.row_count || 0;
             });
         }
-    });
-
-    // Display each product as a card
-    products.forEach((product, index) => {
-        const productHtml = createProductCard(product, index + 1);
+        
+        // Display each product as a card
+        const productHtml = createProductCard(product, view.products.length);
         messagesDiv.insertAdjacentHTML('beforeend', productHtml);
     });
+    
+    window.currentProducts.total_results = view.products.length;
+    const countEl = document.getElementById(view.countId);
+    if (countEl) {
+        countEl.textContent = `${view.products.length} best products`;
+    }
 
+    // Scroll to bottom
+    messagesDiv.scrollTop = messagesDiv.scrollHeight;
+}
+
+// Add the source footer once all batches have arrived
+function finishProductsInChat(view) {
+    const messagesDiv = document.getElementById('messages');
+    
     // Add source footer with Wikipedia table count
-    const wikipediaInfo = totalTables > 0 
-        ? `<br>📊 <strong>Wikipedia Data:</strong> ${totalTables} tables extracted with ${totalTableRows} total entries!`
+    const wikipediaInfo = view.totalTables > 0 
+        ? `<br>📊 <strong>Wikipedia Data:</strong> ${view.totalTables} tables extracted with ${view.totalTableRows} total entries!`
         : '';
     
     const footerHtml = `
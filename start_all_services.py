@@ -11,6 +11,9 @@ import sys
 import os
 from pathlib import Path
 
+OLLAMA_MODEL = os.environ.get("NEXUS_OLLAMA_MODEL", "mistral")
+OLLAMA_KEEP_ALIVE = os.environ.get("NEXUS_OLLAMA_KEEP_ALIVE", "30m")
+
 def check_port(port):
     """Check if a port is in use"""
     import socket
@@ -51,6 +54,23 @@ def start_ollama():
         print(f"   ❌ Error starting Ollama: {e}")
         return False
 
+def warm_up_model():
+    """Load the model into memory now so the first question doesn't pay for it"""
+    print(f"\n🔥 Loading {OLLAMA_MODEL} (keep_alive {OLLAMA_KEEP_ALIVE})...")
+    keep_alive = int(OLLAMA_KEEP_ALIVE) if OLLAMA_KEEP_ALIVE.lstrip('-').isdigit() else OLLAMA_KEEP_ALIVE
+    try:
+        start = time.time()
+        response = requests.post('http://localhost:11434/api/generate',
+                                 json={'model': OLLAMA_MODEL, 'prompt': '', 'keep_alive': keep_alive},
+                                 timeout=120)
+        if response.status_code == 200:
+            print(f"   ✅ {OLLAMA_MODEL} loaded in {time.time() - start:.1f}s")
+            return True
+        print(f"   ⚠️  Could not load {OLLAMA_MODEL}: HTTP {response.status_code} (ollama pull {OLLAMA_MODEL}?)")
+    except Exception as e:
+        print(f"   ⚠️  Could not load {OLLAMA_MODEL}: {e}")
+    return False
+
 def start_backend():
     """Start Flask backend"""
     print("\n🔧 Starting Backend...")
@@ -112,6 +132,8 @@ def main():
     
     # Start all services
     ollama_ok = start_ollama()
+    if ollama_ok:
+        warm_up_model()  # Not fatal: the backend retries the warm-up
     backend_ok = start_backend()
     frontend_ok = start_frontend()
     